@@ -3,13 +3,19 @@ FastAPI Backend Service for SHAKTI-AI
 This service acts as a bridge between the Next.js frontend and the existing Python backend.
 """
 
-from fastapi import FastAPI, HTTPException, UploadFile, File
+import time
+
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, UploadFile, File, Request, Response
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 import sys
 import os
+import asyncio
 import tempfile
 from datetime import datetime
 import io
@@ -32,6 +38,13 @@ logger = logging.getLogger(__name__)
 # Add the parent directory to Python path to import from core
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from utils import lazy_loader
+from database.async_wishes_db import AsyncWishesDatabase
+from database.errors import VaultError, VaultUnavailableError
+from database.pagination import MAX_PAGE_SIZE
+from database.encryption import start_decrypt_metrics
+from utils.email_outbox import EmailOutbox, outbox_settings_from_env
+
 try:
     from utils.email_service import email_service
     logger.info("Successfully imported email service")
@@ -39,33 +52,53 @@ except ImportError as e:
     logger.error(f"Failed to import email service: {e}")
     email_service = None
 
-try:
-    from core.crew import ask_shakti_ai
-    logger.info("Successfully imported ask_shakti_ai")
-except ImportError as e:
-    logger.error(f"Failed to import ask_shakti_ai: {e}")
-    ask_shakti_ai = None
-
-try:
-    from core.get_voice_input import get_voice_input
-    logger.info("Successfully imported voice input functionality")
-except ImportError as e:
-    logger.error(f"Failed to import voice input: {e}")
-    get_voice_input = None
-
-try:
-    from database.db_config import WishesDatabase
-    logger.info("Successfully imported WishesDatabase")
-except ImportError as e:
-    logger.error(f"Failed to import WishesDatabase: {e}")
-    WishesDatabase = None
-
-try:
-    import speech_recognition as sr
-    logger.info("Successfully imported speech_recognition")
-except ImportError as e:
-    logger.error(f"Failed to import speech_recognition: {e}")
-    sr = None
+# Heavy components (models, indexes, database, speech) load on first use or
+# during the background warm-up, so importing this module stays fast
+def _load_shakti_ai():
+    from core.crew import get_shakti_ai
+    return get_shakti_ai()
+
+def _warm_up_retrieval():
+    shakti = shakti_ai.get()
+    if not shakti or not shakti.retriever:
+        raise RuntimeError("knowledge base not available")
+    # Run a dummy query through each index to load the encoder and page in the indexes
+    shakti.retriever.warm_up()
+    return shakti.retriever.get_index_status()
+
+def _load_speech_recognition():
+    import speech_recognition
+    return speech_recognition
+
+shakti_ai = lazy_loader.register("shakti_ai", _load_shakti_ai)
+retrieval_warm_up = lazy_loader.register("retrieval_warm_up", _warm_up_retrieval)
+speech_recognition_module = lazy_loader.register("speech_recognition", _load_speech_recognition)
+
+# The vault database is async (asyncpg) so wish requests never block the event loop;
+# its pool is created on the event loop on first use
+wishes_db = AsyncWishesDatabase()
+
+def deliver_share_email(message):
+    """Send a queued share email; raises unless the SMTP server accepted it."""
+    email_service.deliver_wish_share_email(
+        wish_content=message["wish_content"],
+        recipient_email=message["recipient"],
+        sender_name=message["sender_name"],
+        wish_title=message["wish_title"]
+    )
+
+async def record_email_status(message, status, error=None):
+    """Record the outcome of a queued share email in the sharing history."""
+    notes = f"Shared by {message['sender_name']}; {error}" if error else None
+    found = await wishes_db.update_sharing_status(message["wish_id"], message["recipient"],
+                                                  datetime.fromisoformat(message["shared_at"]), status, notes)
+    if not found:
+        raise LookupError(f"No sharing history for wish {message['wish_id']} "
+                          f"shared with {message['recipient']} at {message['shared_at']}")
+
+# Share emails go through a durable outbox, so share requests never wait on the mail provider
+email_outbox = EmailOutbox(deliver_share_email, record_email_status, cipher=wishes_db.cipher,
+                           **outbox_settings_from_env()) if email_service else None
 
 app = FastAPI(title="SHAKTI-AI Backend Service", version="1.0.0")
 
@@ -78,6 +111,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def measure_decryption(request, call_next):
+    """Report the time spent decrypting wish content in each request."""
+    metrics = start_decrypt_metrics()
+    response = await call_next(request)
+    if metrics["rows"]:
+        response.headers["Server-Timing"] = f'decrypt;dur={metrics["seconds"] * 1000:.2f};desc="{metrics["rows"]} rows"'
+        logger.debug(f"{request.url.path}: decrypted {metrics['rows']} rows in {metrics['seconds'] * 1000:.2f}ms")
+    return response
+
 # Pydantic models
 class ChatRequest(BaseModel):
     message: str
@@ -112,15 +155,47 @@ class TTSRequest(BaseModel):
     text: str
     voice: Optional[str] = "default"
 
-# Initialize database
-try:
-    wishes_db = WishesDatabase()
-    # Initialize the database tables
-    wishes_db.init_database()
-    logger.info("Wishes database initialized successfully")
-except Exception as e:
-    logger.warning(f"Could not initialize wishes database: {e}")
-    wishes_db = None
+async def require_wishes_db():
+    """Get the wishes database, or fail the request with 503."""
+    if not await wishes_db.connect():
+        raise HTTPException(status_code=503, detail="Wishes database not available")
+    return wishes_db
+
+@app.exception_handler(VaultUnavailableError)
+async def vault_unavailable_handler(request: Request, exc: VaultUnavailableError):
+    """The database is unreachable; clients may retry."""
+    return JSONResponse(status_code=503, content={"detail": "Wishes database not available"},
+                        headers={"Retry-After": "5"})
+
+@app.exception_handler(VaultError)
+async def vault_error_handler(request: Request, exc: VaultError):
+    """A vault query failed (already logged by the data layer)."""
+    return JSONResponse(status_code=500, content={"detail": f"Wishes database error while trying to {exc.operation}"})
+
+@app.on_event("startup")
+async def start_warm_up():
+    """Log the import time and load heavy components in the background."""
+    logger.info(f"Backend service imported in {_import_seconds:.2f}s")
+    if os.getenv("WARMUP_ON_STARTUP", "true").lower() in ("1", "true", "yes"):
+        lazy_loader.warm_up()
+        asyncio.create_task(wishes_db.connect())
+
+@app.on_event("startup")
+async def start_email_outbox():
+    """Send share emails left in the outbox by earlier runs and new ones as they are queued."""
+    if email_outbox is not None:
+        email_outbox.start()
+
+@app.on_event("shutdown")
+async def stop_email_outbox():
+    """Stop the outbox sender; unsent emails stay queued for the next start."""
+    if email_outbox is not None:
+        await email_outbox.close()
+
+@app.on_event("shutdown")
+async def close_database_pool():
+    """Close pooled database connections."""
+    await wishes_db.close()
 
 @app.get("/")
 async def root():
@@ -130,6 +205,68 @@ async def root():
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness: the process is up and serving requests."""
+    return {"status": "alive", "timestamp": datetime.now().isoformat()}
+
+def _collect_readiness():
+    """Gather the readiness state of each component (may block on the database)."""
+    from knowledge_base.encoders import get_loaded_encoders
+    
+    # Components that failed (e.g. the retrieval service was down) load again after a backoff
+    lazy_loader.retry_failed()
+    
+    shakti = shakti_ai.get() if shakti_ai.loaded else None
+    retriever = shakti.retriever if shakti else None
+    
+    components = {
+        "agents": {"state": shakti_ai.state, "error": shakti_ai.error},
+        "encoder": {
+            "loaded": bool(get_loaded_encoders()) or bool(retriever and retriever.is_remote),
+            "encoders": get_loaded_encoders(),
+            "retrieval_service": retriever.client.base_url if retriever and retriever.is_remote else None
+        },
+        "indexes": retriever.get_index_status() if retriever else {},
+        "warm_up": retrieval_warm_up.get_status(),
+        "llm": shakti.llm.get_circuit_state() if shakti else {"state": "not loaded"}
+    }
+    
+    indexes = components["indexes"]
+    ready = (
+        shakti is not None
+        and components["encoder"]["loaded"]
+        and bool(indexes)
+        and all(index["warmed_up"] for index in indexes.values())
+    )
+    
+    return ready, components
+
+@app.get("/health/ready")
+async def readiness_check(response: Response):
+    """
+    Readiness: models and indexes are loaded and warmed up.
+    
+    Returns 503 until the agent system is warm. A down database or open LLM
+    circuit is reported as degraded but does not take the instance out of rotation.
+    """
+    ready, components = await run_in_threadpool(_collect_readiness)
+    components["database"] = {"connected": await wishes_db.ping(), "pool": wishes_db.get_pool_status()}
+    degraded = not components["database"]["connected"] or components["llm"]["state"] != "closed"
+    
+    if not ready:
+        response.status_code = 503
+        status = "starting"
+    else:
+        status = "degraded" if degraded else "ready"
+    
+    return {"status": status, "timestamp": datetime.now().isoformat(), "components": components}
+
+@app.get("/health/startup")
+async def startup_report():
+    """Report import time and the load state and time of each heavy component."""
+    return lazy_loader.startup_report(_import_seconds)
+
 # Agent endpoints
 @app.get("/api/agents/list")
 async def get_agents():
@@ -172,11 +309,14 @@ async def get_agents():
 async def chat_with_agent(request: ChatRequest):
     """Chat with a specific AI agent."""
     try:
-        if not ask_shakti_ai:
+        # Loading the agents and answering both block, so keep them off the
+        # event loop or every other request (including the health checks) waits
+        shakti = await run_in_threadpool(shakti_ai.get)
+        if not shakti:
             raise HTTPException(status_code=503, detail="AI agent system not available")
         
         # Call the existing SHAKTI-AI system with a single agent
-        response = ask_shakti_ai(request.message, [request.agent_type])
+        response = await run_in_threadpool(shakti.process_query, request.message, [request.agent_type])
         
         # Get agent name
         agent_names = {
@@ -202,53 +342,77 @@ async def chat_with_agent(request: ChatRequest):
         raise HTTPException(status_code=500, detail=f"Failed to process chat: {str(e)}")
 
 # Wishes Vault endpoints
+def _format_wish(wish):
+    """Transform a stored wish to match the expected frontend format."""
+    formatted_wish = {
+        "id": wish["id"],
+        "title": wish.get("contact_name", "Untitled Wish"),  # Use contact_name as title fallback
+        "category": "personal",  # Default category since it's not stored
+        "priority": "medium",    # Default priority since it's not stored
+        "created_at": wish["created_at"].isoformat() if wish["created_at"] else None,
+        "updated_at": wish["updated_at"].isoformat() if wish["updated_at"] else None,
+        "contact_name": wish.get("contact_name"),
+        "contact_email": wish.get("contact_email"),
+        "contact_phone": wish.get("contact_phone"),
+        "contact_relationship": wish.get("contact_relationship"),
+        "sharing_preferences": wish.get("sharing_preferences", {})
+    }
+    if "content" in wish:
+        formatted_wish["content"] = wish["content"]
+    return formatted_wish
+
 @app.get("/api/wishes/list")
-async def get_wishes():
-    """Get all wishes from the vault."""
-    if not wishes_db:
-        raise HTTPException(status_code=503, detail="Wishes database not available")
+async def get_wishes(page_size: int = MAX_PAGE_SIZE, cursor: Optional[str] = None, include_content: bool = True):
+    """
+    Get a page of wishes from the vault, newest first.
+    
+    Pass the returned next_cursor to get the following page. With
+    include_content=false only titles and metadata are returned and nothing
+    is decrypted; fetch a single wish's content from /api/wishes/{wish_id}.
+    """
+    wishes_db = await require_wishes_db()
     
     try:
         # Use a default user_id for now (in production, this would come from authentication)
         user_id = "default_user"
-        wishes = wishes_db.get_wishes(user_id, limit=100)
-        
-        # Transform the wishes to match the expected frontend format
-        formatted_wishes = []
-        for wish in wishes:
-            formatted_wish = {
-                "id": wish["id"],
-                "title": wish.get("contact_name", "Untitled Wish"),  # Use contact_name as title fallback
-                "content": wish["content"],
-                "category": "personal",  # Default category since it's not stored
-                "priority": "medium",    # Default priority since it's not stored
-                "created_at": wish["created_at"].isoformat() if wish["created_at"] else None,
-                "updated_at": wish["updated_at"].isoformat() if wish["updated_at"] else None,
-                "contact_name": wish.get("contact_name"),
-                "contact_email": wish.get("contact_email"),
-                "contact_phone": wish.get("contact_phone"),
-                "contact_relationship": wish.get("contact_relationship"),
-                "sharing_preferences": wish.get("sharing_preferences", {})
-            }
-            formatted_wishes.append(formatted_wish)
-            
-        return {"wishes": formatted_wishes}
+        page = await wishes_db.list_wishes(
+            user_id, page_size=page_size, cursor=cursor, include_content=include_content
+        )
+        
+        return {
+            "wishes": [_format_wish(wish) for wish in page["wishes"]],
+            "next_cursor": page["next_cursor"]
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (HTTPException, VaultError):
+        raise
     except Exception as e:
         logger.error(f"Error in get_wishes: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch wishes: {str(e)}")
 
+@app.get("/api/wishes/{wish_id}")
+async def get_wish(wish_id: int):
+    """Get one wish, including its content."""
+    wishes_db = await require_wishes_db()
+    
+    # Use a default user_id for now (in production, this would come from authentication)
+    wish = await wishes_db.get_wish_by_id(wish_id, "default_user")
+    if not wish:
+        raise HTTPException(status_code=404, detail="Wish not found")
+    return {"wish": _format_wish(wish)}
+
 @app.post("/api/wishes/create")
 async def create_wish(request: WishRequest):
     """Create a new wish in the vault."""
-    if not wishes_db:
-        raise HTTPException(status_code=503, detail="Wishes database not available")
+    wishes_db = await require_wishes_db()
     
     try:
         # Use a default user_id for now (in production, this would come from authentication)
         user_id = "default_user"
         
         # Save the wish using the actual database interface
-        wish_id = wishes_db.save_wish(
+        wish_id = await wishes_db.save_wish(
             user_id=user_id,
             content=f"Title: {request.title}\n\nContent: {request.content}",
             contact_name=request.title,  # Use title as contact_name for display
@@ -263,6 +427,8 @@ async def create_wish(request: WishRequest):
             return {"success": True, "wish_id": wish_id, "message": "Wish created successfully"}
         else:
             raise HTTPException(status_code=500, detail="Failed to create wish")
+    except (HTTPException, VaultError):
+        raise
     except Exception as e:
         logger.error(f"Error in create_wish: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to create wish: {str(e)}")
@@ -270,8 +436,7 @@ async def create_wish(request: WishRequest):
 @app.put("/api/wishes/{wish_id}")
 async def update_wish(wish_id: int, request: WishUpdateRequest):
     """Update an existing wish."""
-    if not wishes_db:
-        raise HTTPException(status_code=503, detail="Wishes database not available")
+    wishes_db = await require_wishes_db()
     
     try:
         # Use a default user_id for now (in production, this would come from authentication)
@@ -291,7 +456,7 @@ async def update_wish(wish_id: int, request: WishUpdateRequest):
         if request.reminder_date:
             sharing_preferences["reminder_date"] = request.reminder_date
         
-        success = wishes_db.update_wish(
+        success = await wishes_db.update_wish(
             wish_id=wish_id,
             user_id=user_id,
             content=content,
@@ -303,6 +468,8 @@ async def update_wish(wish_id: int, request: WishUpdateRequest):
             return {"success": True, "message": "Wish updated successfully"}
         else:
             raise HTTPException(status_code=404, detail="Wish not found")
+    except (HTTPException, VaultError):
+        raise
     except Exception as e:
         logger.error(f"Error in update_wish: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to update wish: {str(e)}")
@@ -310,40 +477,38 @@ async def update_wish(wish_id: int, request: WishUpdateRequest):
 @app.delete("/api/wishes/{wish_id}")
 async def delete_wish(wish_id: int):
     """Delete a wish from the vault."""
-    if not wishes_db:
-        raise HTTPException(status_code=503, detail="Wishes database not available")
+    wishes_db = await require_wishes_db()
     
     try:
         # Use a default user_id for now (in production, this would come from authentication)
         user_id = "default_user"
         
-        success = wishes_db.delete_wish(wish_id, user_id)
+        success = await wishes_db.delete_wish(wish_id, user_id)
         
         if success:
             return {"success": True, "message": "Wish deleted successfully"}
         else:
             raise HTTPException(status_code=404, detail="Wish not found")
+    except (HTTPException, VaultError):
+        raise
     except Exception as e:
         logger.error(f"Error in delete_wish: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to delete wish: {str(e)}")
 
 @app.post("/api/wishes/share")
 async def share_wish(request: ShareWishRequest):
-    """Share a wish via email or WhatsApp."""
-    if not wishes_db:
-        raise HTTPException(status_code=503, detail="Wishes database not available")
+    """
+    Share a wish via email or WhatsApp.
+
+    Emails are queued in the outbox and sent in the background; the share is
+    logged with status 'queued' and updated to 'sent' or 'failed' later.
+    """
+    wishes_db = await require_wishes_db()
     
     try:
         # Get the wish to share
         user_id = "default_user"
-        wishes = wishes_db.get_wishes(user_id, limit=100)
-        
-        # Find the specific wish
-        wish_to_share = None
-        for wish in wishes:
-            if wish["id"] == request.wish_id:
-                wish_to_share = wish
-                break
+        wish_to_share = await wishes_db.get_wish_by_id(request.wish_id, user_id)
         
         if not wish_to_share:
             raise HTTPException(status_code=404, detail="Wish not found")
@@ -354,19 +519,19 @@ async def share_wish(request: ShareWishRequest):
         
         success = False
         share_url = None
+        status = 'sent'
+        shared_at = datetime.now()
         
         if request.method == "email":
             # Validate email
             if not validate_email(request.recipient):
                 raise HTTPException(status_code=400, detail="Invalid email address")
+            if email_outbox is None or not email_service.is_configured():
+                raise HTTPException(status_code=503, detail="Email sending is not configured")
             
-            # Send email
-            success = send_email_share(
-                wish_content=full_content,
-                recipient_email=request.recipient,
-                sender_name=request.sender_name,
-                wish_title=wish_title
-            )
+            # Sent in the background by the outbox
+            status = 'queued'
+            success = True
             
         elif request.method == "whatsapp":
             # Generate WhatsApp URL
@@ -380,18 +545,39 @@ async def share_wish(request: ShareWishRequest):
             raise HTTPException(status_code=400, detail="Invalid sharing method. Use 'email' or 'whatsapp'")
         
         if success:
-            # Log the sharing activity
-            wishes_db.log_sharing(
+            # Log the sharing activity. A queued email's row is written before queuing, not
+            # behind: the outbox may run in another worker and must find the row to update
+            await wishes_db.log_sharing(
                 wish_id=request.wish_id,
                 shared_with=request.recipient,
                 sharing_method=request.method,
-                status='sent',
-                notes=f"Shared by {request.sender_name}"
+                status=status,
+                notes=f"Shared by {request.sender_name}",
+                user_id=user_id,
+                shared_at=shared_at,
+                immediate=status == 'queued'
             )
             
+            if status == 'queued':
+                message = {
+                    "wish_id": request.wish_id,
+                    "recipient": request.recipient,
+                    "sender_name": request.sender_name,
+                    "wish_title": wish_title,
+                    "wish_content": full_content,
+                    "shared_at": shared_at.isoformat()
+                }
+                try:
+                    await email_outbox.enqueue(message)
+                except Exception:
+                    await record_email_status(message, 'failed', "could not be queued")
+                    raise
+            
             response_data = {
                 "success": True, 
-                "message": f"Wish shared successfully via {request.method}"
+                "status": status,
+                "message": (f"Wish queued for delivery via {request.method}" if status == 'queued'
+                            else f"Wish shared successfully via {request.method}")
             }
             
             # Include WhatsApp URL if applicable
@@ -402,8 +588,8 @@ async def share_wish(request: ShareWishRequest):
         else:
             raise HTTPException(status_code=400, detail="Failed to share wish")
             
-    except HTTPException:
-        # Re-raise HTTP exceptions
+    except (HTTPException, VaultError):
+        # Re-raise HTTP and database errors
         raise
     except Exception as e:
         logger.error(f"Error in share_wish: {e}")
@@ -444,6 +630,10 @@ async def speech_to_text(audio: UploadFile = File(...)):
         if len(content) == 0:
             return {"text": "", "success": False, "error": "Audio file is empty. Please try recording again."}
         
+        sr = speech_recognition_module.get()
+        if not sr:
+            return {"text": "", "success": False, "error": "Speech recognition not available on this server."}
+        
         # Use the same approach as the original Streamlit app
         recognizer = sr.Recognizer()
         
@@ -627,7 +817,9 @@ async def test_email_configuration():
             "message": "SMTP configuration test completed",
             "smtp_host": email_service.smtp_host,
             "smtp_port": email_service.smtp_port,
-            "smtp_user": email_service.smtp_user if email_service.smtp_user else "Not configured"
+            "smtp_user": email_service.smtp_user if email_service.smtp_user else "Not configured",
+            "smtp_pool": email_service.get_pool_status(),
+            "outbox": await email_outbox.get_status() if email_outbox else None
         }
     except Exception as e:
         logger.error(f"Error testing email configuration: {e}")
@@ -659,7 +851,8 @@ async def send_wish_via_email(recipient: str, wish_id: int, sender_name: str):
     """Send a wish to the recipient via email."""
     try:
         # Fetch the wish details from the database
-        wish = wishes_db.get_wish_by_id(wish_id)
+        wishes_db = await require_wishes_db()
+        wish = await wishes_db.get_wish_by_id(wish_id, "default_user")
         
         if not wish:
             raise HTTPException(status_code=404, detail="Wish not found")
@@ -667,7 +860,7 @@ async def send_wish_via_email(recipient: str, wish_id: int, sender_name: str):
         # Prepare the email content
         subject = f"Wish Shared with You - ID: {wish_id}"
         body = f"Hello,\n\nYou have received a new wish from {sender_name}.\n\n"
-        body += f"Title: {wish['title']}\n\n"
+        body += f"Title: {wish.get('contact_name') or 'Untitled Wish'}\n\n"
         body += f"Content: {wish['content']}\n\n"
         body += "Best regards,\nSHAKTI-AI"
         
@@ -692,6 +885,8 @@ async def send_wish_via_email(recipient: str, wish_id: int, sender_name: str):
         
         logger.info(f"Wish {wish_id} shared via email to {recipient}")
         
+    except (HTTPException, VaultError):
+        raise
     except Exception as e:
         logger.error(f"Error in send_wish_via_email: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to send wish via email: {str(e)}")
@@ -700,14 +895,15 @@ async def send_wish_via_whatsapp(recipient: str, wish_id: int, sender_name: str)
     """Send a wish to the recipient via WhatsApp."""
     try:
         # Fetch the wish details from the database
-        wish = wishes_db.get_wish_by_id(wish_id)
+        wishes_db = await require_wishes_db()
+        wish = await wishes_db.get_wish_by_id(wish_id, "default_user")
         
         if not wish:
             raise HTTPException(status_code=404, detail="Wish not found")
         
         # Prepare the WhatsApp message
         message = f"Hello, you have received a new wish from {sender_name}.\n\n"
-        message += f"*Title:* {wish['title']}\n\n"
+        message += f"*Title:* {wish.get('contact_name') or 'Untitled Wish'}\n\n"
         message += f"*Content:* {wish['content']}"
         
         # Encode the message for URL
@@ -721,6 +917,8 @@ async def send_wish_via_whatsapp(recipient: str, wish_id: int, sender_name: str)
         
         logger.info(f"Wish {wish_id} shared via WhatsApp to {recipient}")
         
+    except (HTTPException, VaultError):
+        raise
     except Exception as e:
         logger.error(f"Error in send_wish_via_whatsapp: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to send wish via WhatsApp: {str(e)}")
@@ -744,24 +942,6 @@ def format_phone_for_whatsapp(phone):
     
     return phone if len(phone) >= 10 else None
 
-def send_email_share(wish_content, recipient_email, sender_name="SHAKTI-AI User", wish_title="My Wish"):
-    """Send wish via email using the email service."""
-    try:
-        if email_service:
-            return email_service.send_wish_share_email(
-                wish_content=wish_content,
-                recipient_email=recipient_email,
-                sender_name=sender_name,
-                wish_title=wish_title
-            )
-        else:
-            logger.error("Email service not available")
-            return False
-        
-    except Exception as e:
-        logger.error(f"Email sharing failed: {e}")
-        return False
-
 def generate_whatsapp_share_url(wish_content, phone_number, sender_name="SHAKTI-AI User"):
     """Generate WhatsApp sharing URL."""
     try:
@@ -793,6 +973,8 @@ SHAKTI-AI: For every woman, every phase, every fight.
         logger.error(f"WhatsApp URL generation failed: {e}")
         return None
 
+_import_seconds = time.perf_counter() - _import_started
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
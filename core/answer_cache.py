@@ -0,0 +1,204 @@
+"""
+Semantic answer cache for near-duplicate questions.
+
+Many questions differ only in wording ("is spotting normal in early
+pregnancy" / "is spotting in early pregnancy normal"). Each one costs a full
+retrieval plus one to six Gemini calls, so finished answers are cached and
+served again when a new query embedding is close enough to a cached one for
+the same agents and age group.
+"""
+
+import os
+import time
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import List, Dict, Optional
+
+
+def age_bucket(age: Optional[int]) -> str:
+    """
+    Map an age to the group used for tone adaptation in answers.
+
+    Args:
+        age: User's age, if given
+
+    Returns:
+        Age group label
+    """
+    if age is None:
+        return "any"
+    if age < 13:
+        return "child"
+    if age < 18:
+        return "teen"
+    if age < 30:
+        return "young_adult"
+    if age < 45:
+        return "adult"
+    if age < 60:
+        return "midlife"
+    return "senior"
+
+
+class SemanticAnswerCache:
+    """LRU + TTL cache of final answers, matched by query embedding similarity."""
+
+    def __init__(self, similarity_threshold: float = 0.93, ttl_seconds: float = 3600,
+                 max_entries: int = 512):
+        """
+        Initialize the answer cache.
+
+        Args:
+            similarity_threshold: Minimum cosine similarity for a hit
+            ttl_seconds: Lifetime of a cached answer
+            max_entries: Maximum number of cached answers before LRU eviction
+        """
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.kb_version = None
+
+        self._entries = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0
+        }
+
+    @staticmethod
+    def make_key(agent_types: List[str], age: Optional[int]) -> tuple:
+        """Build the exact-match part of the cache key."""
+        return tuple(sorted(set(agent_types))), age_bucket(age)
+
+    def _check_version(self, kb_version: Optional[str]):
+        """Drop every entry when the knowledge base version changes (lock held)."""
+        if kb_version != self.kb_version:
+            if self._entries:
+                self.stats['invalidations'] += 1
+            self._entries.clear()
+            self.kb_version = kb_version
+
+    def lookup(self, agent_types: List[str], age: Optional[int], query_embedding: np.ndarray,
+               kb_version: Optional[str] = None) -> Optional[Dict[str, any]]:
+        """
+        Find a cached answer for a semantically equivalent query.
+
+        Args:
+            agent_types: Agents the query is sent to
+            age: User's age, if given
+            query_embedding: Normalized query embedding of shape (dimension,)
+            kb_version: Version of the knowledge base the answer must come from
+
+        Returns:
+            Cached entry with 'response', 'sources' and 'similarity', or None
+        """
+        key = self.make_key(agent_types, age)
+        now = time.time()
+
+        with self._lock:
+            self._check_version(kb_version)
+
+            expired = [entry_id for entry_id, entry in self._entries.items()
+                       if now - entry['created_at'] > self.ttl_seconds]
+            for entry_id in expired:
+                del self._entries[entry_id]
+            self.stats['expirations'] += len(expired)
+
+            candidates = [(entry_id, entry) for entry_id, entry in self._entries.items() if entry['key'] == key]
+            if not candidates:
+                self.stats['misses'] += 1
+                return None
+
+            embeddings = np.stack([entry['embedding'] for _, entry in candidates])
+            similarities = embeddings @ query_embedding
+            best = int(np.argmax(similarities))
+
+            if similarities[best] < self.similarity_threshold:
+                self.stats['misses'] += 1
+                return None
+
+            entry_id, entry = candidates[best]
+            self._entries.move_to_end(entry_id)
+            self.stats['hits'] += 1
+
+            return {
+                'response': entry['response'],
+                'sources': entry['sources'],
+                'similarity': float(similarities[best])
+            }
+
+    def store(self, agent_types: List[str], age: Optional[int], query_embedding: np.ndarray,
+              response: str, sources: List[Dict], kb_version: Optional[str] = None):
+        """
+        Cache a finished answer.
+
+        Args:
+            agent_types: Agents the query was sent to
+            age: User's age, if given
+            query_embedding: Normalized query embedding of shape (dimension,)
+            response: Final formatted response
+            sources: Source citations used in the response
+            kb_version: Version of the knowledge base the answer came from
+        """
+        with self._lock:
+            self._check_version(kb_version)
+
+            self._entries[self._next_id] = {
+                'key': self.make_key(agent_types, age),
+                'embedding': np.asarray(query_embedding, dtype='float32'),
+                'response': response,
+                'sources': sources,
+                'created_at': time.time()
+            }
+            self._next_id += 1
+            self.stats['stores'] += 1
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def invalidate(self):
+        """Drop every cached answer."""
+        with self._lock:
+            if self._entries:
+                self.stats['invalidations'] += 1
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, any]:
+        """
+        Get cache hit/miss metrics.
+
+        Returns:
+            Dictionary with cache counters, size and hit rate
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self._entries)
+
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['kb_version'] = self.kb_version
+        return stats
+
+
+def answer_cache_from_env() -> Optional[SemanticAnswerCache]:
+    """
+    Create an answer cache from environment configuration.
+
+    Returns:
+        SemanticAnswerCache unless ANSWER_CACHE_ENABLED is false
+    """
+    if os.getenv('ANSWER_CACHE_ENABLED', 'true').lower() not in ('1', 'true', 'yes'):
+        return None
+
+    return SemanticAnswerCache(
+        similarity_threshold=float(os.getenv('ANSWER_CACHE_THRESHOLD', '0.93')),
+        ttl_seconds=float(os.getenv('ANSWER_CACHE_TTL_SECONDS', '3600')),
+        max_entries=int(os.getenv('ANSWER_CACHE_MAX_ENTRIES', '512'))
+    )
@@ -2,9 +2,24 @@
 Direct approach for SHAKTI-AI system with PDF knowledge base integration.
 """
 
+import os
+import threading
 from typing import Dict, List, Optional
-from core.llm import GeminiLLM
-from knowledge_base.retriever import KnowledgeRetriever
+from core.llm import GeminiLLM, ERROR_RESPONSE
+from knowledge_base.retriever import get_shared_retriever
+from knowledge_base.reranker import reranker_from_env
+from knowledge_base.context_packer import ContextPacker, get_token_counter
+from core.answer_cache import answer_cache_from_env
+from core.router import router_from_env
+
+# Knowledge base name for each agent type
+AGENT_KB_NAMES = {
+    "maternal": "maaya",
+    "reproductive": "gynika",
+    "mental": "meher",
+    "legal": "nyaya",
+    "feminist": "vaanya"
+}
 
 class ShaktiAI:
     """SHAKTI-AI implementation with PDF knowledge base support."""
@@ -14,46 +29,86 @@ class ShaktiAI:
         
         # Initialize knowledge retriever
         try:
-            self.retriever = KnowledgeRetriever()
-            print(f"📚 Knowledge base loaded for agents: {', '.join(self.retriever.get_available_agents())}")
+            self.retriever = get_shared_retriever()
+            if not self.retriever.is_remote and self.retriever.reranker is None:
+                self.retriever.set_reranker(reranker_from_env())
         except Exception as e:
             print(f"⚠️ Knowledge base not available: {e}")
             self.retriever = None
         
+        if self.retriever is not None:
+            try:
+                print(f"📚 Knowledge base loaded for agents: {', '.join(self.retriever.get_available_agents())}")
+            except Exception as e:
+                # Remote retriever: the service is asked again on the next query
+                print(f"⚠️ Retrieval service not reachable yet: {e}")
+        
         self.agent_info = {
             "maternal": {
                 "name": "Maaya",
                 "role": "Maternal Health Nurse",
                 "expertise": "pregnancy, childbirth, and baby care",
-                "specialties": ["pregnancy", "prenatal care", "childbirth", "postpartum", "breastfeeding", "infant care"]
+                "specialties": ["pregnancy", "prenatal care", "childbirth", "postpartum", "breastfeeding", "infant care"],
+                "context_token_budget": 900
             },
             "reproductive": {
                 "name": "Gynika",
                 "role": "Reproductive Health Advisor",
                 "expertise": "menstruation, puberty, and contraception",
-                "specialties": ["menstruation", "puberty", "contraception", "fertility", "reproductive health", "sexual health"]
+                "specialties": ["menstruation", "puberty", "contraception", "fertility", "reproductive health", "sexual health"],
+                "context_token_budget": 900
             },
             "mental": {
                 "name": "Meher",
                 "role": "Mental Health Counselor",
                 "expertise": "trauma, anxiety, and abuse recovery",
-                "specialties": ["anxiety", "depression", "trauma", "PTSD", "domestic violence", "mental wellness"]
+                "specialties": ["anxiety", "depression", "trauma", "PTSD", "domestic violence", "mental wellness"],
+                "context_token_budget": 700
             },
             "legal": {
                 "name": "Nyaya",
                 "role": "Legal Rights Advisor",
                 "expertise": "Indian laws related to women's rights",
-                "specialties": ["women's rights", "family law", "workplace harassment", "domestic violence law", "property rights"]
+                "specialties": ["women's rights", "family law", "workplace harassment", "domestic violence law", "property rights"],
+                "context_token_budget": 1200
             },
             "feminist": {
                 "name": "Vaanya",
                 "role": "Feminist Health Educator",
                 "expertise": "menopause, hormonal health, and women's empowerment",
-                "specialties": ["menopause", "hormonal health", "women's empowerment", "body autonomy", "health advocacy"]
+                "specialties": ["menopause", "hormonal health", "women's empowerment", "body autonomy", "health advocacy"],
+                "context_token_budget": 900
             }
         }
+        
+        self.context_packer = ContextPacker(get_token_counter(self.llm.model_name))
+        self.answer_cache = answer_cache_from_env() if self.retriever else None
+        
+        self.router = None
+        self._router_retry = False
+        self._init_router()
+    
+    def _init_router(self):
+        """Create the query router; retried on later queries if the retrieval service was not reachable."""
+        try:
+            self.router = router_from_env(self.retriever, self.agent_info, AGENT_KB_NAMES)
+            self._router_retry = False
+        except Exception as e:
+            print(f"⚠️ Query router not available: {e}")
+            self._router_retry = self.retriever is not None and self.retriever.is_remote
+    
+    def get_context_token_budget(self, agent_type: str) -> int:
+        """
+        Get the knowledge context token budget for an agent.
+        
+        CONTEXT_TOKEN_BUDGET_<AGENT_TYPE> overrides a single agent and
+        CONTEXT_TOKEN_BUDGET overrides all of them.
+        """
+        default_budget = self.agent_info[agent_type]["context_token_budget"]
+        budget = os.getenv(f"CONTEXT_TOKEN_BUDGET_{agent_type.upper()}", os.getenv("CONTEXT_TOKEN_BUDGET"))
+        return int(budget) if budget else default_budget
     
-    def get_relevant_knowledge(self, agent_type: str, query: str) -> tuple[str, List[Dict]]:
+    def get_relevant_knowledge(self, agent_type: str, query: str) -> tuple[str, List[Dict], int]:
         """
         Retrieve relevant knowledge from the agent's knowledge base.
         
@@ -62,56 +117,50 @@ class ShaktiAI:
             query: User query
             
         Returns:
-            Tuple of (context_string, detailed_source_citations)
+            Tuple of (context_string, detailed_source_citations, context_tokens)
         """
-        # Map agent types to knowledge base names
-        agent_mapping = {
-            "maternal": "maaya",
-            "reproductive": "gynika", 
-            "mental": "meher",
-            "legal": "nyaya",
-            "feminist": "vaanya"
-        }
-        
-        kb_agent_name = agent_mapping.get(agent_type)
+        kb_agent_name = AGENT_KB_NAMES.get(agent_type)
         
-        if not self.retriever or not kb_agent_name or kb_agent_name not in self.retriever.get_available_agents():
-            return "", []
+        if not self.retriever or not kb_agent_name:
+            return "", [], 0
         
         try:
+            if kb_agent_name not in self.retriever.get_available_agents():
+                return "", [], 0
+            
             # Retrieve relevant chunks
             retrieved_chunks = self.retriever.retrieve_for_agent(kb_agent_name, query, top_k=4, min_similarity=0.2)
             
             if not retrieved_chunks:
-                return "", []
+                return "", [], 0
             
-            # Format context with more detailed information
-            context_parts = []
-            for i, chunk in enumerate(retrieved_chunks):
+            # Fit the best chunks into the agent's token budget
+            def reference_header(position: int, chunk: Dict) -> str:
                 doc_title = chunk.get('doc_title', 'Unknown')
-                chunk_text = chunk.get('text', '')
                 relevance = chunk.get('similarity', 0)
-                
-                context_part = f"[Reference {i+1} from '{doc_title}' (Relevance: {relevance:.2f})]:\n{chunk_text}"
-                context_parts.append(context_part)
+                return f"[Reference {position} from '{doc_title}' (Relevance: {relevance:.2f})]:\n"
             
-            context = "\n\n---\n\n".join(context_parts)
+            packed = self.context_packer.pack(
+                retrieved_chunks,
+                self.get_context_token_budget(agent_type),
+                format_header=reference_header
+            )
             
-            # Get detailed source citations with enhanced metadata
-            sources = self.retriever.get_enhanced_source_citations(retrieved_chunks)
+            # Cite only what made it into the prompt
+            sources = self.retriever.get_enhanced_source_citations(packed['chunks'])
             
-            return context, sources
+            return packed['context'], sources, packed['tokens_used']
             
         except Exception as e:
             print(f"Error retrieving knowledge for {agent_type}: {e}")
-            return "", []
+            return "", [], 0
     
     def get_agent_response(self, agent_type: str, query: str, age: Optional[int] = None) -> Dict[str, any]:
         """Get a response from a specific agent with knowledge base integration."""
         agent_info = self.agent_info[agent_type]
         
         # Get relevant knowledge from knowledge base
-        knowledge_context, sources = self.get_relevant_knowledge(agent_type, query)
+        knowledge_context, sources, context_tokens = self.get_relevant_knowledge(agent_type, query)
         
         
         # Add knowledge base context if available
@@ -175,15 +224,68 @@ class ShaktiAI:
             "agent_role": agent_info["role"],
             "response": response_text,
             "sources": sources,
-            "has_knowledge_base": bool(knowledge_context)
+            "has_knowledge_base": bool(knowledge_context),
+            "context_tokens": context_tokens
         }
     
-    def process_query(self, query: str, agent_types: Optional[List[str]] = None, age: Optional[int] = None) -> str:
-        """Process a query through one or more agents."""
-        # Use all agents if none specified
+    def answer_query(self, query: str, agent_types: Optional[List[str]] = None, age: Optional[int] = None) -> Dict[str, any]:
+        """
+        Answer a query, serving near-duplicate questions from the answer cache.
+        
+        Args:
+            query: The user's question
+            agent_types: Agent types to consult; routed by the query if empty
+            age: User's age, if given
+            
+        Returns:
+            Dictionary with the formatted 'response', its 'sources', whether it was
+            'cached' and the 'routing' decision (None when agents were given)
+        """
+        query_embedding = None
+        routing = None
+        
+        # Route to the most relevant agents if none specified
         if not agent_types or len(agent_types) == 0:
             agent_types = list(self.agent_info.keys())
-            
+            if self.router is None and self._router_retry:
+                self._init_router()
+            if self.router is not None:
+                try:
+                    query_embedding = self.retriever.encode_query(query)[0]
+                    routing = self.router.route(query, query_embedding)
+                    agent_types = routing["agents"]
+                except Exception as e:
+                    print(f"Query routing failed, using all agents: {e}")
+        agent_types = [agent_type for agent_type in agent_types if agent_type in self.agent_info]
+        
+        kb_version = None
+        if self.answer_cache is not None:
+            try:
+                if query_embedding is None:
+                    query_embedding = self.retriever.encode_query(query)[0]
+                kb_version = self.retriever.get_kb_version()
+                cached = self.answer_cache.lookup(agent_types, age, query_embedding, kb_version)
+                if cached:
+                    return {"response": cached["response"], "sources": cached["sources"], "cached": True, "routing": routing}
+            except Exception as e:
+                print(f"Answer cache unavailable: {e}")
+                query_embedding = None
+        
+        formatted_response, all_sources, responses = self._answer_with_agents(query, agent_types, age)
+        
+        # Never cache answers that contain a failed LLM call
+        llm_failed = any(resp["response"] == ERROR_RESPONSE for resp in responses)
+        if self.answer_cache is not None and query_embedding is not None and responses and not llm_failed:
+            self.answer_cache.store(agent_types, age, query_embedding, formatted_response, all_sources, kb_version)
+        
+        return {"response": formatted_response, "sources": all_sources, "cached": False, "routing": routing}
+    
+    def process_query(self, query: str, agent_types: Optional[List[str]] = None, age: Optional[int] = None) -> str:
+        """Process a query through one or more agents."""
+        return self.answer_query(query, agent_types, age)["response"]
+    
+    def _answer_with_agents(self, query: str, agent_types: List[str], age: Optional[int] = None) -> tuple[str, List[Dict], List[Dict]]:
+        """Run the query through each agent and format the combined response."""
         # Get responses from each selected agent
         responses = []
         all_sources = []
@@ -253,8 +355,8 @@ class ShaktiAI:
                     else:
                         page_str = "(Page Unknown)"
                     formatted_response += f"— {doc}, {page_str}\n"
-
-
+            
+            return formatted_response, all_sources, responses
             
         # Otherwise, synthesize the responses
         synthesis_prompt = f"""The following experts have provided responses to this query:
@@ -340,7 +442,23 @@ and ensure the response is culturally sensitive and appropriate. Structure the r
             formatted_response += f"### {kb_indicator} {agent_resp['agent_name']} - {agent_resp['agent_role']}\n\n"
             formatted_response += f"{agent_resp['response']}\n\n"
             
-        return formatted_response
+        return formatted_response, all_sources, responses
+
+_shakti_instance = None
+_shakti_lock = threading.Lock()
+
+def get_shakti_ai() -> ShaktiAI:
+    """
+    Get the process-wide SHAKTI-AI instance, creating it on first use.
+    
+    Sharing one instance keeps the knowledge base, encoder and answer cache
+    loaded across requests instead of rebuilding them for every query.
+    """
+    global _shakti_instance
+    with _shakti_lock:
+        if _shakti_instance is None:
+            _shakti_instance = ShaktiAI()
+    return _shakti_instance
 
 def ask_shakti_ai(query: str, agent_types: List[str] = None, age: Optional[int] = None) -> str:
     """
@@ -351,5 +469,5 @@ def ask_shakti_ai(query: str, agent_types: List[str] = None, age: Optional[int]
         agent_types: Optional list of agent types to use. If None, all agents will be used.
                     Options: "maternal", "reproductive", "mental", "legal", "feminist"
     """
-    shakti = ShaktiAI()
+    shakti = get_shakti_ai()
     return shakti.process_query(query, agent_types, age)
@@ -4,10 +4,14 @@ from langchain_core.language_models.llms import LLM
 from typing import Any, Dict, List, Optional
 from pydantic import Field, PrivateAttr
 import google.generativeai as genai
+from utils.circuit_breaker import CircuitBreaker
 
 # Load environment variables
 load_dotenv()
 
+# Returned instead of raising when the Gemini call fails
+ERROR_RESPONSE = "I apologize, but I encountered an error processing your request."
+
 class GeminiLLM(LLM):
     """Implementation of Google's Gemini 2.0 Flash API."""
     
@@ -18,15 +22,27 @@ class GeminiLLM(LLM):
     
     # Define a private attribute for the model
     _model: Any = PrivateAttr(default=None)
+    _circuit: Any = PrivateAttr(default=None)
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         # Initialize the Gemini API
         genai.configure(api_key=self.api_key)
         self._model = genai.GenerativeModel(model_name=self.model_name)
+        
+        # Stop calling Gemini for a while after repeated failures
+        self._circuit = CircuitBreaker(
+            "gemini",
+            failure_threshold=int(os.getenv("LLM_CIRCUIT_FAILURES", "5")),
+            reset_timeout=float(os.getenv("LLM_CIRCUIT_RESET_SECONDS", "30"))
+        )
     
     def _call(self, prompt: str, stop: Optional[List[str]] = None) -> str:
         """Execute the LLM call."""
+        if not self._circuit.allow():
+            print("Gemini circuit open; skipping call")
+            return ERROR_RESPONSE
+        
         try:
             response = self._model.generate_content(
                 prompt,
@@ -36,10 +52,17 @@ class GeminiLLM(LLM):
                     "top_p": 0.95,
                 }
             )
-            return response.text
+            text = response.text
+            self._circuit.record_success()
+            return text
         except Exception as e:
+            self._circuit.record_failure()
             print(f"Error calling Gemini: {e}")
-            return "I apologize, but I encountered an error processing your request."
+            return ERROR_RESPONSE
+    
+    def get_circuit_state(self) -> Dict[str, Any]:
+        """Return the state of the Gemini circuit breaker."""
+        return self._circuit.get_state()
     
     @property
     def _llm_type(self) -> str:
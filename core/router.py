@@ -0,0 +1,166 @@
+"""
+Query router for picking the most relevant agents for an untargeted query.
+
+When the user does not choose experts, sending the query to all five agents
+costs five retrievals, five LLM calls and a synthesis call. The router
+compares the query embedding with each agent's knowledge base centroid and
+specialty phrases, and only falls back to all agents when it is unsure.
+"""
+
+import os
+import numpy as np
+from typing import Dict, Optional
+
+
+class AgentRouter:
+    """Routes queries to agents by embedding similarity."""
+
+    def __init__(self, retriever, agent_info: Dict[str, Dict], kb_names: Dict[str, str],
+                 max_agents: int = 3, min_confidence: float = 0.6, min_score: float = 0.15,
+                 coverage: float = 0.8, temperature: float = 0.05, specialty_weight: float = 0.5,
+                 keyword_boost: float = 0.1):
+        """
+        Initialize the router and precompute agent embeddings.
+
+        Args:
+            retriever: KnowledgeRetriever with the agent stores and encoder
+            agent_info: Agent descriptions with 'specialties' and 'expertise'
+            kb_names: Mapping from agent type to knowledge base name
+            max_agents: Maximum number of agents to route to
+            min_confidence: Minimum probability mass of the chosen agents
+            min_score: Minimum raw score of the best agent
+            coverage: Probability mass at which to stop adding agents
+            temperature: Softmax temperature turning scores into probabilities
+            specialty_weight: Weight of specialty similarity versus centroid similarity
+            keyword_boost: Score added when a specialty appears verbatim in the query
+        """
+        self.retriever = retriever
+        self.agent_types = list(agent_info.keys())
+        self.max_agents = max_agents
+        self.min_confidence = min_confidence
+        self.min_score = min_score
+        self.coverage = coverage
+        self.temperature = temperature
+        self.specialty_weight = specialty_weight
+        self.keyword_boost = keyword_boost
+
+        self.specialties = {
+            agent_type: [specialty.lower() for specialty in info.get('specialties', [])]
+            for agent_type, info in agent_info.items()
+        }
+
+        # Knowledge base centroids, for agents that have a knowledge base
+        self.centroids = {}
+        for agent_type in self.agent_types:
+            if agent_type in kb_names:
+                centroid = retriever.get_agent_centroid(kb_names[agent_type])
+                if centroid is not None:
+                    self.centroids[agent_type] = centroid
+
+        # Specialty phrases and expertise, embedded in one batch
+        phrases, owners = [], []
+        for agent_type, info in agent_info.items():
+            for phrase in info.get('specialties', []) + [info.get('expertise', '')]:
+                if phrase:
+                    phrases.append(phrase)
+                    owners.append(agent_type)
+
+        embeddings = retriever.encode_texts(phrases)
+        self.specialty_embeddings = {
+            agent_type: embeddings[[i for i, owner in enumerate(owners) if owner == agent_type]]
+            for agent_type in self.agent_types
+        }
+
+    def score(self, query: str, query_embedding: np.ndarray) -> Dict[str, float]:
+        """
+        Score every agent for a query.
+
+        Args:
+            query: Raw user query
+            query_embedding: Normalized query embedding of shape (dimension,)
+
+        Returns:
+            Dictionary mapping agent type to score
+        """
+        query_lower = query.lower()
+        scores = {}
+
+        for agent_type in self.agent_types:
+            specialty_embeddings = self.specialty_embeddings[agent_type]
+            specialty_score = float((specialty_embeddings @ query_embedding).max()) if len(specialty_embeddings) else 0.0
+
+            if agent_type in self.centroids:
+                centroid_score = float(self.centroids[agent_type] @ query_embedding)
+                agent_score = (1 - self.specialty_weight) * centroid_score + self.specialty_weight * specialty_score
+            else:
+                agent_score = specialty_score
+
+            if any(specialty in query_lower for specialty in self.specialties[agent_type]):
+                agent_score += self.keyword_boost
+
+            scores[agent_type] = agent_score
+
+        return scores
+
+    def route(self, query: str, query_embedding: np.ndarray) -> Dict[str, any]:
+        """
+        Pick the one to three agents most relevant to a query.
+
+        Agents are added in order of probability until they cover
+        ``coverage`` of the probability mass. If the chosen agents still
+        cover less than ``min_confidence``, or even the best agent scores
+        below ``min_score``, every agent is used.
+
+        Args:
+            query: Raw user query
+            query_embedding: Normalized query embedding of shape (dimension,)
+
+        Returns:
+            Dictionary with 'agents', per-agent 'scores' and 'probabilities',
+            'confidence' and whether it used the 'fallback'
+        """
+        scores = self.score(query, query_embedding)
+        ranked = sorted(scores, key=scores.get, reverse=True)
+
+        values = np.array([scores[agent_type] for agent_type in ranked])
+        exp = np.exp((values - values.max()) / self.temperature)
+        probabilities = dict(zip(ranked, (exp / exp.sum()).tolist()))
+
+        agents = []
+        confidence = 0.0
+        for agent_type in ranked[:self.max_agents]:
+            agents.append(agent_type)
+            confidence += probabilities[agent_type]
+            if confidence >= self.coverage:
+                break
+
+        fallback = confidence < self.min_confidence or scores[ranked[0]] < self.min_score
+
+        return {
+            'agents': list(self.agent_types) if fallback else agents,
+            'scores': scores,
+            'probabilities': probabilities,
+            'confidence': confidence,
+            'fallback': fallback
+        }
+
+
+def router_from_env(retriever, agent_info: Dict[str, Dict], kb_names: Dict[str, str]) -> Optional[AgentRouter]:
+    """
+    Create an agent router from environment configuration.
+
+    Returns:
+        AgentRouter unless ROUTER_ENABLED is false or no knowledge base is loaded
+    """
+    if os.getenv('ROUTER_ENABLED', 'true').lower() not in ('1', 'true', 'yes'):
+        return None
+    if retriever is None or not retriever.get_available_agents():
+        return None
+
+    return AgentRouter(
+        retriever,
+        agent_info,
+        kb_names,
+        max_agents=int(os.getenv('ROUTER_MAX_AGENTS', '3')),
+        min_confidence=float(os.getenv('ROUTER_MIN_CONFIDENCE', '0.6'))
+    )
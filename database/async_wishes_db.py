@@ -0,0 +1,480 @@
+"""
+Async data access for the Wishes Vault, for the FastAPI endpoints.
+
+Mirrors the WishesDatabase API (database/db_config.py) on top of an asyncpg
+connection pool, so vault requests never block the event loop. Content is
+encrypted with the same Fernet key as the sync layer, so both read each
+other's rows. Failures are logged and raised as database.errors.VaultError
+subclasses.
+"""
+
+import os
+import json
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+from database.settings import DB_CONFIG, DB_BACKEND, SQLITE_PATH
+from database.errors import VaultUnavailableError, VaultError, vault_error, is_row_error
+from database.encryption import WishCipher, LazyWish
+from database.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, encode_cursor, decode_cursor
+from database.sharing_history_writer import (
+    SHARING_HISTORY_COLUMNS, AsyncSharingHistoryWriter, make_entry, writer_settings_from_env,
+    missing_owner_ids, fill_owners
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _rows_affected(status: str) -> int:
+    """Parse the row count from a command status such as 'UPDATE 1'."""
+    try:
+        return int(status.split()[-1])
+    except (AttributeError, IndexError, ValueError):
+        return 0
+
+
+class AsyncWishesDatabase:
+    """Async Wishes Vault storage backed by an asyncpg pool."""
+
+    def __init__(self, pool=None, cipher: Optional[WishCipher] = None, connect_kwargs: Optional[Dict] = None,
+                 backend: Optional[str] = None):
+        """
+        Initialize the database.
+
+        Args:
+            pool: asyncpg-compatible pool to use (default: created on first use)
+            cipher: Encryption for wish content (default: the vault key)
+            connect_kwargs: Connection settings (default: DB_CONFIG)
+            backend: 'postgres' or 'sqlite' (default: DB_BACKEND; see sqlite_backend.py)
+        """
+        self.cipher = cipher or WishCipher()
+        self.connect_kwargs = dict(connect_kwargs or DB_CONFIG)
+        self.backend = backend or DB_BACKEND
+        self._pool = pool
+        self._lock = None
+        self._history_writer = None
+        self._history_settings = writer_settings_from_env()
+
+    async def connect(self) -> bool:
+        """
+        Create the connection pool and tables on first use.
+
+        Pool size and lifetime follow DB_POOL_MIN, DB_POOL_MAX and
+        DB_POOL_MAX_LIFETIME, as for the sync pool.
+
+        Returns:
+            True if the database is available
+        """
+        if self._pool is not None:
+            return True
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._pool is None:
+                try:
+                    if self.backend == 'sqlite':
+                        from database.sqlite_backend import AsyncSQLitePool
+
+                        self._pool = AsyncSQLitePool(SQLITE_PATH)
+                        return True
+
+                    import asyncpg
+
+                    pool = await asyncpg.create_pool(
+                        host=self.connect_kwargs['host'],
+                        port=int(self.connect_kwargs['port']),
+                        database=self.connect_kwargs['database'],
+                        user=self.connect_kwargs['user'],
+                        password=self.connect_kwargs['password'],
+                        min_size=int(os.getenv('DB_POOL_MIN', '1')),
+                        max_size=int(os.getenv('DB_POOL_MAX', '10')),
+                        max_inactive_connection_lifetime=float(os.getenv('DB_POOL_MAX_LIFETIME', '1800')),
+                        timeout=float(os.getenv('DB_CONNECT_TIMEOUT', '5'))
+                    )
+                except Exception as e:
+                    logger.error(f"Database connection failed: {e}")
+                    return False
+
+                self._pool = pool
+                try:
+                    await self.init_database()
+                except VaultError:
+                    logger.warning("Could not initialize wishes database tables")
+        return True
+
+    async def close(self):
+        """Flush queued sharing history and close the connection pool."""
+        if self._history_writer is not None:
+            await self._history_writer.close()
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    @asynccontextmanager
+    async def connection(self):
+        """Acquire a pooled connection inside a transaction (committed on success, rolled back on error)."""
+        if not await self.connect():
+            raise VaultUnavailableError("Database not available", "connect")
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                yield conn
+
+    async def ping(self) -> bool:
+        """Check that the database accepts connections."""
+        try:
+            async with self.connection() as conn:
+                await asyncio.wait_for(conn.fetchval("SELECT 1;"), timeout=3)
+            return True
+        except Exception as e:
+            logger.warning(f"Database ping failed: {e}")
+            return False
+
+    def get_pool_status(self) -> Optional[Dict[str, Any]]:
+        """Get connection pool usage, or None before the pool is created."""
+        if self._pool is None:
+            return None
+        size, idle = self._pool.get_size(), self._pool.get_idle_size()
+        return {
+            'idle': idle,
+            'in_use': size - idle,
+            'min_size': self._pool.get_min_size(),
+            'max_size': self._pool.get_max_size()
+        }
+
+    def _wish_from_row(self, row) -> Dict[str, Any]:
+        """Turn a wishes row into the dictionary the sync layer returns (content decrypted on access)."""
+        wish = dict(row)
+        preferences = wish.get('sharing_preferences')
+        if isinstance(preferences, str):
+            preferences = json.loads(preferences)
+        wish['sharing_preferences'] = preferences if isinstance(preferences, dict) else {}
+        return LazyWish(wish, self.cipher) if 'encrypted_content' in wish else wish
+
+    async def init_database(self) -> bool:
+        """Initialize database tables."""
+        if self.backend == 'sqlite':
+            # Tables are created when the SQLite pool opens its file
+            return True
+        try:
+            async with self.connection() as conn:
+                await conn.execute("""
+                    CREATE TABLE IF NOT EXISTS wishes (
+                        id SERIAL PRIMARY KEY,
+                        user_id VARCHAR(255) NOT NULL,
+                        encrypted_content BYTEA NOT NULL,
+                        contact_name VARCHAR(255),
+                        contact_email VARCHAR(255),
+                        contact_phone VARCHAR(20),
+                        contact_relationship VARCHAR(100),
+                        sharing_preferences JSONB,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        is_active BOOLEAN DEFAULT TRUE
+                    );
+                """)
+                await conn.execute("""
+                    CREATE TABLE IF NOT EXISTS sharing_history (
+                        id SERIAL PRIMARY KEY,
+                        wish_id INTEGER REFERENCES wishes(id),
+                        shared_with VARCHAR(255) NOT NULL,
+                        sharing_method VARCHAR(50) NOT NULL,
+                        shared_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        status VARCHAR(50) DEFAULT 'sent',
+                        notes TEXT,
+                        user_id VARCHAR(255)
+                    );
+                """)
+                # Tables created before sharing history recorded the owner get the column once
+                has_user_id = await conn.fetchval("""
+                    SELECT 1 FROM information_schema.columns
+                    WHERE table_schema = current_schema() AND table_name = 'sharing_history'
+                      AND column_name = 'user_id';
+                """)
+                if not has_user_id:
+                    await conn.execute("ALTER TABLE sharing_history ADD COLUMN user_id VARCHAR(255);")
+                    await conn.execute("""
+                        UPDATE sharing_history sh SET user_id = w.user_id
+                        FROM wishes w WHERE sh.wish_id = w.id;
+                    """)
+                await conn.execute("CREATE INDEX IF NOT EXISTS idx_wishes_user_id ON wishes(user_id);")
+                await conn.execute("CREATE INDEX IF NOT EXISTS idx_wishes_created_at ON wishes(created_at);")
+                await conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_wishes_user_active_created
+                    ON wishes(user_id, is_active, created_at DESC, id DESC);
+                """)
+                await conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_sharing_history_user_shared
+                    ON sharing_history(user_id, shared_at DESC);
+                """)
+                await conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_sharing_history_wish_shared
+                    ON sharing_history(wish_id, shared_at DESC);
+                """)
+                # Covered by idx_sharing_history_wish_shared
+                await conn.execute("DROP INDEX IF EXISTS idx_sharing_history_wish_id;")
+            return True
+        except Exception as e:
+            raise vault_error(e, "initialize database", logger) from e
+
+    async def save_wish(self, user_id, content, contact_name=None, contact_email=None,
+                        contact_phone=None, contact_relationship=None, sharing_preferences=None):
+        """Save a wish to the database."""
+        try:
+            encrypted_content = self.cipher.encrypt(content)
+            async with self.connection() as conn:
+                return await conn.fetchval("""
+                    INSERT INTO wishes (user_id, encrypted_content, contact_name, contact_email,
+                                        contact_phone, contact_relationship, sharing_preferences)
+                    VALUES ($1, $2, $3, $4, $5, $6, $7)
+                    RETURNING id;
+                """, user_id, encrypted_content, contact_name, contact_email,
+                    contact_phone, contact_relationship,
+                    json.dumps(sharing_preferences) if sharing_preferences else None)
+        except Exception as e:
+            raise vault_error(e, "save wish", logger, user_id=user_id) from e
+
+    async def get_wishes(self, user_id, limit=10) -> List[Dict[str, Any]]:
+        """Get wishes for a user."""
+        try:
+            async with self.connection() as conn:
+                rows = await conn.fetch("""
+                    SELECT id, encrypted_content, contact_name, contact_email, contact_phone,
+                           contact_relationship, sharing_preferences, created_at, updated_at
+                    FROM wishes
+                    WHERE user_id = $1 AND is_active = TRUE
+                    ORDER BY created_at DESC
+                    LIMIT $2;
+                """, user_id, limit)
+            return [self._wish_from_row(row) for row in rows]
+        except Exception as e:
+            raise vault_error(e, "get wishes", logger, user_id=user_id) from e
+
+    async def list_wishes(self, user_id, page_size=DEFAULT_PAGE_SIZE, cursor=None,
+                          include_content=False) -> Dict[str, Any]:
+        """
+        List one page of a user's wishes, newest first.
+
+        Args:
+            user_id: Owner of the wishes
+            page_size: Wishes per page (at most MAX_PAGE_SIZE)
+            cursor: next_cursor of the previous page, or None for the first page
+            include_content: Read and decrypt the content; otherwise only titles and metadata
+
+        Returns:
+            Dictionary with 'wishes' and 'next_cursor' (None on the last page)
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+        columns = """id, contact_name, contact_email, contact_phone, contact_relationship,
+                     sharing_preferences, created_at, updated_at"""
+        if include_content:
+            columns += ", encrypted_content"
+
+        conditions, values = ["user_id = $1", "is_active = TRUE"], [user_id]
+        if cursor:
+            created_at, wish_id = decode_cursor(cursor)
+            conditions.append("(created_at, id) < ($2, $3)")
+            values.extend([created_at, wish_id])
+        # One extra row tells whether another page follows
+        values.append(page_size + 1)
+
+        try:
+            async with self.connection() as conn:
+                rows = await conn.fetch(f"""
+                    SELECT {columns}
+                    FROM wishes
+                    WHERE {' AND '.join(conditions)}
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT ${len(values)};
+                """, *values)
+        except Exception as e:
+            raise vault_error(e, "list wishes", logger, user_id=user_id) from e
+
+        wishes = [self._wish_from_row(row) for row in rows[:page_size]]
+        if include_content:
+            LazyWish.load_all(wishes)
+        next_cursor = None
+        if len(rows) > page_size:
+            next_cursor = encode_cursor(wishes[-1]['created_at'], wishes[-1]['id'])
+        return {'wishes': wishes, 'next_cursor': next_cursor}
+
+    async def get_wish_by_id(self, wish_id, user_id) -> Optional[Dict[str, Any]]:
+        """Get one active wish of a user by id, or None if it does not exist."""
+        try:
+            async with self.connection() as conn:
+                # Primary key lookup: only the requested row is read and decrypted
+                row = await conn.fetchrow("""
+                    SELECT id, encrypted_content, contact_name, contact_email, contact_phone,
+                           contact_relationship, sharing_preferences, created_at, updated_at
+                    FROM wishes
+                    WHERE id = $1 AND user_id = $2 AND is_active = TRUE;
+                """, wish_id, user_id)
+            return self._wish_from_row(row) if row else None
+        except Exception as e:
+            raise vault_error(e, "get wish", logger, user_id=user_id, wish_id=wish_id) from e
+
+    async def update_wish(self, wish_id, user_id, content=None, contact_name=None,
+                          contact_email=None, contact_phone=None, contact_relationship=None,
+                          sharing_preferences=None):
+        """Update a wish."""
+        try:
+            updates = {}
+            if content is not None:
+                updates['encrypted_content'] = self.cipher.encrypt(content)
+            if contact_name is not None:
+                updates['contact_name'] = contact_name
+            if contact_email is not None:
+                updates['contact_email'] = contact_email
+            if contact_phone is not None:
+                updates['contact_phone'] = contact_phone
+            if contact_relationship is not None:
+                updates['contact_relationship'] = contact_relationship
+            if sharing_preferences is not None:
+                updates['sharing_preferences'] = json.dumps(sharing_preferences)
+
+            update_fields = [f"{column} = ${position}" for position, column in enumerate(updates, start=1)]
+            update_fields.append("updated_at = CURRENT_TIMESTAMP")
+            values = list(updates.values()) + [wish_id, user_id]
+
+            async with self.connection() as conn:
+                status = await conn.execute(f"""
+                    UPDATE wishes
+                    SET {', '.join(update_fields)}
+                    WHERE id = ${len(values) - 1} AND user_id = ${len(values)};
+                """, *values)
+            return _rows_affected(status) > 0
+        except Exception as e:
+            raise vault_error(e, "update wish", logger, user_id=user_id, wish_id=wish_id) from e
+
+    async def delete_wish(self, wish_id, user_id):
+        """Soft delete a wish."""
+        try:
+            async with self.connection() as conn:
+                status = await conn.execute("""
+                    UPDATE wishes
+                    SET is_active = FALSE, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = $1 AND user_id = $2;
+                """, wish_id, user_id)
+            return _rows_affected(status) > 0
+        except Exception as e:
+            raise vault_error(e, "delete wish", logger, user_id=user_id, wish_id=wish_id) from e
+
+    @property
+    def history_writer(self) -> Optional[AsyncSharingHistoryWriter]:
+        """Write-behind queue for sharing history, or None when disabled (see sharing_history_writer.py)."""
+        if self._history_writer is None and self._history_settings is not None:
+            self._history_writer = AsyncSharingHistoryWriter(self.log_sharing_batch, **self._history_settings)
+        return self._history_writer
+
+    async def log_sharing(self, wish_id, shared_with, sharing_method, status='sent', notes=None, user_id=None,
+                          shared_at=None, immediate=False):
+        """
+        Log sharing activity (queued and written in the background unless write-behind is disabled).
+
+        Pass the wish owner's user_id when it is known; otherwise it is looked up from the wish.
+        Pass shared_at (default: now) to find the row again with update_sharing_status().
+        Pass immediate=True to write the row before returning, e.g. when another
+        process will update it.
+        """
+        try:
+            writer = None if immediate else self.history_writer
+            if writer is not None:
+                writer.log(wish_id, shared_with, sharing_method, status, notes, user_id, shared_at)
+            else:
+                await self.log_sharing_batch([make_entry(wish_id, shared_with, sharing_method, status, notes,
+                                                         shared_at, user_id)])
+            return True
+        except Exception as e:
+            raise vault_error(e, "log sharing", logger, wish_id=wish_id) from e
+
+    async def update_sharing_status(self, wish_id, shared_with, shared_at, status, notes=None) -> bool:
+        """
+        Set the status of a logged share, e.g. once a queued email was sent.
+
+        Args:
+            wish_id: Shared wish
+            shared_with: Recipient the share was logged with
+            shared_at: Share time passed to log_sharing()
+            status: New status
+            notes: New notes (default: keep the current ones)
+
+        Returns:
+            True if the share was found
+        """
+        try:
+            # The row may still be waiting in the write-behind queue
+            if self._history_writer is not None:
+                await self._history_writer.flush()
+            async with self.connection() as conn:
+                # Found through idx_sharing_history_wish_shared
+                result = await conn.execute("""
+                    UPDATE sharing_history
+                    SET status = $1, notes = COALESCE($2, notes)
+                    WHERE wish_id = $3 AND shared_at = $4 AND shared_with = $5;
+                """, status, notes, wish_id, shared_at, shared_with)
+            return _rows_affected(result) > 0
+        except Exception as e:
+            raise vault_error(e, "update sharing status", logger, wish_id=wish_id) from e
+
+    async def log_sharing_batch(self, entries: List[tuple]):
+        """
+        Insert sharing-history rows with one COPY.
+
+        Rows the database rejects for their data (an unknown wish id, a
+        value too long for its column) are skipped so they cannot block the
+        rest. Raises if the database is unreachable.
+
+        Args:
+            entries: Rows in SHARING_HISTORY_COLUMNS order
+        """
+        missing = missing_owner_ids(entries)
+        if missing:
+            async with self.connection() as conn:
+                rows = await conn.fetch("SELECT id, user_id FROM wishes WHERE id = ANY($1::int[]);", missing)
+            entries = fill_owners(entries, {row['id']: row['user_id'] for row in rows})
+
+        try:
+            async with self.connection() as conn:
+                await conn.copy_records_to_table('sharing_history', records=entries,
+                                                 columns=list(SHARING_HISTORY_COLUMNS))
+        except Exception as e:
+            if not is_row_error(e):
+                raise
+            placeholders = ', '.join(f"${position}" for position in range(1, len(SHARING_HISTORY_COLUMNS) + 1))
+            async with self.connection() as conn:
+                for entry in entries:
+                    try:
+                        async with conn.transaction():
+                            await conn.execute(f"""
+                                INSERT INTO sharing_history ({', '.join(SHARING_HISTORY_COLUMNS)})
+                                VALUES ({placeholders});
+                            """, *entry)
+                    except Exception as row_error:
+                        if not is_row_error(row_error):
+                            raise
+                        logger.warning(f"Dropping sharing history row for wish {entry[0]}: {row_error}")
+
+    async def get_sharing_history(self, user_id, limit=20) -> List[Dict[str, Any]]:
+        """Get sharing history for a user."""
+        try:
+            # Include shares still waiting in the write-behind queue
+            if self._history_writer is not None:
+                await self._history_writer.flush()
+            async with self.connection() as conn:
+                # Newest rows come from idx_sharing_history_user_shared; only they are joined
+                rows = await conn.fetch("""
+                    SELECT sh.*, w.contact_name, w.created_at as wish_created_at
+                    FROM sharing_history sh
+                    JOIN wishes w ON sh.wish_id = w.id
+                    WHERE sh.user_id = $1
+                    ORDER BY sh.shared_at DESC
+                    LIMIT $2;
+                """, user_id, limit)
+            return [dict(row) for row in rows]
+        except Exception as e:
+            raise vault_error(e, "get sharing history", logger, user_id=user_id) from e
@@ -0,0 +1,315 @@
+"""
+Thread-safe PostgreSQL connection pool for the Wishes Vault.
+
+Connections are reused across operations instead of paying a TCP and auth
+handshake per query. On checkout a connection that has been idle for a
+while is health-checked with ``SELECT 1``; connections older than
+``max_lifetime`` are replaced. ``connection()`` commits on success and
+rolls back on error.
+"""
+
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+try:
+    from database.errors import VaultUnavailableError
+except ImportError:
+    # Imported as a top-level module from inside database/
+    from errors import VaultUnavailableError
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(VaultUnavailableError):
+    """Raised when no connection becomes available in time."""
+
+
+class _PooledConnection:
+    """A connection with the bookkeeping the pool needs."""
+
+    __slots__ = ('conn', 'created_at', 'last_used')
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class ConnectionPool:
+    """Bounded pool of database connections."""
+
+    def __init__(self, connect_kwargs: Dict[str, Any], min_size: int = 1, max_size: int = 10,
+                 max_lifetime: float = 1800.0, health_check_after: float = 5.0,
+                 checkout_timeout: float = 10.0, connect: Optional[Callable] = None):
+        """
+        Initialize the pool.
+
+        Args:
+            connect_kwargs: Keyword arguments for the connect function (DB_CONFIG)
+            min_size: Connections opened up front and kept idle
+            max_size: Most connections open at once
+            max_lifetime: Seconds after which a connection is closed and replaced
+            health_check_after: Idle seconds after which a checkout runs SELECT 1
+            checkout_timeout: Seconds to wait for a free connection
+            connect: Function opening a connection (default: psycopg2.connect)
+        """
+        if connect is None:
+            import psycopg2
+            connect = psycopg2.connect
+
+        self.connect_kwargs = dict(connect_kwargs)
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.max_lifetime = max_lifetime
+        self.health_check_after = health_check_after
+        self.checkout_timeout = checkout_timeout
+        self._connect = connect
+
+        self._idle = []
+        self._checked_out = {}
+        self._in_use = 0
+        self._pid = os.getpid()
+        self._closed = False
+        self._condition = threading.Condition()
+        self.stats = {'opened': 0, 'reused': 0, 'discarded': 0, 'failed_checks': 0, 'timeouts': 0}
+
+        try:
+            self._fill()
+        except Exception as e:
+            # The database may come up later; connections are then opened on demand
+            logger.warning(f"Could not open initial pool connections: {e}")
+
+    def _open(self) -> _PooledConnection:
+        conn = self._connect(**self.connect_kwargs)
+        with self._condition:
+            self.stats['opened'] += 1
+        return _PooledConnection(conn)
+
+    def _fill(self):
+        """Open connections until min_size are idle or in use."""
+        while True:
+            with self._condition:
+                if self._closed or len(self._idle) + self._in_use >= self.min_size:
+                    return
+                self._in_use += 1
+            try:
+                pooled = self._open()
+            except Exception:
+                with self._condition:
+                    self._in_use -= 1
+                    self._condition.notify()
+                raise
+            with self._condition:
+                self._in_use -= 1
+                self._idle.append(pooled)
+                self._condition.notify()
+
+    def _discard(self, pooled: _PooledConnection):
+        try:
+            pooled.conn.close()
+        except Exception:
+            pass
+        with self._condition:
+            self.stats['discarded'] += 1
+
+    def _is_usable(self, pooled: _PooledConnection) -> bool:
+        """Check age, closed state and (after idling) a round trip."""
+        if getattr(pooled.conn, 'closed', 0):
+            return False
+        now = time.monotonic()
+        if self.max_lifetime and now - pooled.created_at > self.max_lifetime:
+            return False
+        if now - pooled.last_used >= self.health_check_after:
+            try:
+                cursor = pooled.conn.cursor()
+                cursor.execute("SELECT 1;")
+                cursor.fetchone()
+                cursor.close()
+                pooled.conn.rollback()
+            except Exception:
+                with self._condition:
+                    self.stats['failed_checks'] += 1
+                return False
+        return True
+
+    def _check_fork(self):
+        """Drop connections inherited from a parent process; sockets cannot be shared."""
+        if os.getpid() != self._pid:
+            with self._condition:
+                if os.getpid() != self._pid:
+                    self._pid = os.getpid()
+                    self._idle = []
+                    self._checked_out = {}
+                    self._in_use = 0
+
+    def getconn(self, timeout: Optional[float] = None):
+        """
+        Check out a healthy connection.
+
+        Args:
+            timeout: Seconds to wait for a free connection (default: checkout_timeout)
+
+        Returns:
+            Open database connection; return it with putconn()
+        """
+        self._check_fork()
+        timeout = self.checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            with self._condition:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                while not self._idle and self._in_use >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.stats['timeouts'] += 1
+                        raise PoolTimeoutError(f"No database connection available within {timeout}s")
+                    self._condition.wait(remaining)
+                pooled = self._idle.pop() if self._idle else None
+                self._in_use += 1
+
+            if pooled is None:
+                try:
+                    pooled = self._open()
+                except Exception:
+                    self._release_slot()
+                    raise
+                return self._hand_out(pooled)
+
+            if self._is_usable(pooled):
+                with self._condition:
+                    self.stats['reused'] += 1
+                return self._hand_out(pooled)
+
+            # Stale or broken: drop it and try again with the next one
+            self._discard(pooled)
+            self._release_slot()
+
+    def _hand_out(self, pooled: _PooledConnection):
+        with self._condition:
+            self._checked_out[id(pooled.conn)] = pooled
+        return pooled.conn
+
+    def _release_slot(self):
+        with self._condition:
+            self._in_use -= 1
+            self._condition.notify()
+
+    def putconn(self, conn, discard: bool = False):
+        """
+        Return a connection to the pool.
+
+        Args:
+            conn: Connection from getconn()
+            discard: Close the connection instead of reusing it
+        """
+        with self._condition:
+            pooled = self._checked_out.pop(id(conn), None)
+        if pooled is None:
+            # Checked out before a fork, or not ours
+            try:
+                conn.close()
+            except Exception:
+                pass
+            return
+
+        if not discard and not getattr(conn, 'closed', 0):
+            try:
+                # Never hand out a connection in the middle of a transaction
+                conn.rollback()
+            except Exception:
+                discard = True
+
+        if discard or getattr(conn, 'closed', 0) or self._closed:
+            self._discard(pooled)
+            self._release_slot()
+            return
+
+        pooled.last_used = time.monotonic()
+        with self._condition:
+            self._in_use -= 1
+            self._idle.append(pooled)
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """
+        Check out a connection for one unit of work.
+
+        Commits when the block finishes and rolls back if it raises. A
+        connection that fails during the block is closed rather than reused.
+
+        Args:
+            timeout: Seconds to wait for a free connection (default: checkout_timeout)
+
+        Yields:
+            Open database connection
+        """
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            broken = False
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+            self.putconn(conn, discard=broken or bool(getattr(conn, 'closed', 0)))
+            raise
+        else:
+            self.putconn(conn)
+
+    def closeall(self):
+        """Close idle connections and refuse further checkouts."""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._condition.notify_all()
+        for pooled in idle:
+            self._discard(pooled)
+
+    def get_status(self) -> Dict[str, Any]:
+        """
+        Get pool size and usage statistics.
+
+        Returns:
+            Dictionary with idle/in-use counts, limits and counters
+        """
+        with self._condition:
+            return dict(
+                self.stats,
+                idle=len(self._idle),
+                in_use=self._in_use,
+                min_size=self.min_size,
+                max_size=self.max_size,
+                closed=self._closed
+            )
+
+
+def pool_from_env(connect_kwargs: Dict[str, Any], connect: Optional[Callable] = None) -> ConnectionPool:
+    """
+    Create a pool configured by DB_POOL_MIN, DB_POOL_MAX, DB_POOL_MAX_LIFETIME,
+    DB_POOL_HEALTH_CHECK_AFTER and DB_POOL_TIMEOUT.
+
+    Args:
+        connect_kwargs: Keyword arguments for the connect function (DB_CONFIG)
+        connect: Function opening a connection (default: psycopg2.connect)
+
+    Returns:
+        ConnectionPool
+    """
+    return ConnectionPool(
+        connect_kwargs,
+        min_size=int(os.getenv('DB_POOL_MIN', '1')),
+        max_size=int(os.getenv('DB_POOL_MAX', '10')),
+        max_lifetime=float(os.getenv('DB_POOL_MAX_LIFETIME', '1800')),
+        health_check_after=float(os.getenv('DB_POOL_HEALTH_CHECK_AFTER', '5')),
+        checkout_timeout=float(os.getenv('DB_POOL_TIMEOUT', '10')),
+        connect=connect
+    )
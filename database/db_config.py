@@ -1,180 +1,257 @@
 """
 PostgreSQL Database Configuration for SHAKTI-AI Wishes Vault
+
+Failures are logged and raised as database.errors.VaultError subclasses;
+showing them to the user is up to the caller (see wishes_vault_db.py).
 """
 
 import os
-import psycopg2
-from psycopg2.extras import RealDictCursor
-import streamlit as st
-from cryptography.fernet import Fernet
+import logging
+from psycopg2.extras import RealDictCursor, execute_values
 import json
+import threading
 from datetime import datetime
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+try:
+    from database.settings import DB_CONFIG, DB_BACKEND, SQLITE_PATH
+    from database import sqlite_backend
+    from database.errors import vault_error, is_row_error
+    from database.encryption import WishCipher, LazyWish
+    from database.connection_pool import pool_from_env
+    from database.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, encode_cursor, decode_cursor
+    from database.sharing_history_writer import (
+        SHARING_HISTORY_COLUMNS, SharingHistoryWriter, make_entry, writer_settings_from_env,
+        missing_owner_ids, fill_owners
+    )
+    from database.wish_cache import cache_from_env
+except ImportError:
+    # Imported as a top-level module from inside database/
+    from settings import DB_CONFIG, DB_BACKEND, SQLITE_PATH
+    import sqlite_backend
+    from errors import vault_error, is_row_error
+    from encryption import WishCipher, LazyWish
+    from connection_pool import pool_from_env
+    from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, encode_cursor, decode_cursor
+    from sharing_history_writer import (
+        SHARING_HISTORY_COLUMNS, SharingHistoryWriter, make_entry, writer_settings_from_env,
+        missing_owner_ids, fill_owners
+    )
+    from wish_cache import cache_from_env
 
-# Database configuration
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'database': os.getenv('DB_NAME', 'shakti_ai_db'),
-    'user': os.getenv('DB_USER', 'postgres'),
-    'password': os.getenv('DB_PASSWORD', 'password'),
-    'port': os.getenv('DB_PORT', '5432')
-}
+logger = logging.getLogger(__name__)
 
 class WishesDatabase:
-    def __init__(self):
-        self.encryption_key = self._get_or_create_encryption_key()
-        self.fernet = Fernet(self.encryption_key)
-        
-    def _get_or_create_encryption_key(self):
-        """Get or create encryption key for wishes."""
-        key_file = os.path.join(os.path.dirname(__file__), 'db_wishes.key')
-        if os.path.exists(key_file):
-            with open(key_file, 'rb') as f:
-                key = f.read()
-        else:
-            key = Fernet.generate_key()
-            with open(key_file, 'wb') as f:
-                f.write(key)
-        return key
+    def __init__(self, pool=None, cache=None, backend=None):
+        self.cipher = WishCipher()
+        self.encryption_key = self.cipher.key
+        self.fernet = self.cipher.fernet
+        # 'postgres' or 'sqlite' (see sqlite_backend.py)
+        self.backend = backend or DB_BACKEND
+        self._pool = pool
+        self._pool_lock = threading.Lock()
+        self._history_writer = None
+        self._initialized = False
+        # Read-through cache of decrypted wishes (see wish_cache.py); None when disabled
+        self.cache = cache if cache is not None else cache_from_env()
     
     def _encrypt_data(self, data):
         """Encrypt sensitive data."""
-        if isinstance(data, str):
-            data = data.encode()
-        return self.fernet.encrypt(data)
+        return self.cipher.encrypt(data)
     
     def _decrypt_data(self, encrypted_data):
         """Decrypt sensitive data."""
-        if encrypted_data is None:
-            return None
-        try:
-            if isinstance(encrypted_data, memoryview):
-                encrypted_data = bytes(encrypted_data)
-            return self.fernet.decrypt(encrypted_data).decode()
-        except Exception:
-            return None
+        return self.cipher.decrypt(encrypted_data)
+    
+    @property
+    def pool(self):
+        """Connection pool, created on first use (see database/connection_pool.py)."""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    if self.backend == 'sqlite':
+                        self._pool = pool_from_env({'path': SQLITE_PATH}, connect=sqlite_backend.connect)
+                    else:
+                        self._pool = pool_from_env(
+                            dict(DB_CONFIG, connect_timeout=int(os.getenv('DB_CONNECT_TIMEOUT', '5')))
+                        )
+        return self._pool
+    
+    def connection(self, timeout=None):
+        """Check out a pooled connection; commits on success, rolls back on error."""
+        return self.pool.connection(timeout)
     
-    def get_connection(self):
-        """Get database connection."""
+    def ping(self):
+        """Check that the database accepts connections."""
         try:
-            conn = psycopg2.connect(**DB_CONFIG)
-            return conn
+            with self.connection(timeout=3) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1;")
+                cursor.close()
+            return True
         except Exception as e:
-            if hasattr(st, 'error'):
-                st.error(f"Database connection failed: {e}")
-            else:
-                print(f"Database connection failed: {e}")
-            return None
+            logger.warning(f"Database ping failed: {e}")
+            return False
+    
+    def get_pool_status(self):
+        """Get connection pool usage, or None before the pool is created."""
+        return self._pool.get_status() if self._pool is not None else None
+    
+    @property
+    def history_writer(self):
+        """Write-behind queue for sharing history, or None when disabled (see sharing_history_writer.py)."""
+        if self._history_writer is None:
+            settings = writer_settings_from_env()
+            if settings is None:
+                return None
+            with self._pool_lock:
+                if self._history_writer is None:
+                    self._history_writer = SharingHistoryWriter(self.log_sharing_batch, **settings)
+        return self._history_writer
+    
+    def close(self):
+        """Flush queued sharing history and close pooled connections."""
+        if self._history_writer is not None:
+            self._history_writer.close()
+        if self._pool is not None:
+            self._pool.closeall()
     
     def init_database(self):
-        """Initialize database tables."""
+        """Initialize database tables (once per process)."""
+        if self._initialized:
+            return True
         try:
-            conn = self.get_connection()
-            if not conn:
-                return False
+            if self.backend == 'sqlite':
+                # Tables are created when a SQLite connection is opened
+                with self.connection():
+                    pass
+                self._initialized = True
+                return True
+            
+            with self.connection() as conn:
+                cursor = conn.cursor()
                 
-            cursor = conn.cursor()
-            
-            # Create wishes table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS wishes (
-                    id SERIAL PRIMARY KEY,
-                    user_id VARCHAR(255) NOT NULL,
-                    encrypted_content BYTEA NOT NULL,
-                    contact_name VARCHAR(255),
-                    contact_email VARCHAR(255),
-                    contact_phone VARCHAR(20),
-                    contact_relationship VARCHAR(100),
-                    sharing_preferences JSONB,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    is_active BOOLEAN DEFAULT TRUE
-                );
-            """)
-            
-            # Create sharing_history table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS sharing_history (
-                    id SERIAL PRIMARY KEY,
-                    wish_id INTEGER REFERENCES wishes(id),
-                    shared_with VARCHAR(255) NOT NULL,
-                    sharing_method VARCHAR(50) NOT NULL,
-                    shared_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    status VARCHAR(50) DEFAULT 'sent',
-                    notes TEXT
-                );
-            """)
-            
-            # Create indexes
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_wishes_user_id ON wishes(user_id);")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_wishes_created_at ON wishes(created_at);")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_sharing_history_wish_id ON sharing_history(wish_id);")
-            
-            conn.commit()
-            cursor.close()
-            conn.close()
+                # Create wishes table
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS wishes (
+                        id SERIAL PRIMARY KEY,
+                        user_id VARCHAR(255) NOT NULL,
+                        encrypted_content BYTEA NOT NULL,
+                        contact_name VARCHAR(255),
+                        contact_email VARCHAR(255),
+                        contact_phone VARCHAR(20),
+                        contact_relationship VARCHAR(100),
+                        sharing_preferences JSONB,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        is_active BOOLEAN DEFAULT TRUE
+                    );
+                """)
+                
+                # Create sharing_history table
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS sharing_history (
+                        id SERIAL PRIMARY KEY,
+                        wish_id INTEGER REFERENCES wishes(id),
+                        shared_with VARCHAR(255) NOT NULL,
+                        sharing_method VARCHAR(50) NOT NULL,
+                        shared_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        status VARCHAR(50) DEFAULT 'sent',
+                        notes TEXT,
+                        user_id VARCHAR(255)
+                    );
+                """)
+                
+                # Tables created before sharing history recorded the owner get the column once
+                cursor.execute("""
+                    SELECT 1 FROM information_schema.columns
+                    WHERE table_schema = current_schema() AND table_name = 'sharing_history'
+                      AND column_name = 'user_id';
+                """)
+                if cursor.fetchone() is None:
+                    cursor.execute("ALTER TABLE sharing_history ADD COLUMN user_id VARCHAR(255);")
+                    cursor.execute("""
+                        UPDATE sharing_history sh SET user_id = w.user_id
+                        FROM wishes w WHERE sh.wish_id = w.id;
+                    """)
+                
+                # Create indexes
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_wishes_user_id ON wishes(user_id);")
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_wishes_created_at ON wishes(created_at);")
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_wishes_user_active_created
+                    ON wishes(user_id, is_active, created_at DESC, id DESC);
+                """)
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_sharing_history_user_shared
+                    ON sharing_history(user_id, shared_at DESC);
+                """)
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_sharing_history_wish_shared
+                    ON sharing_history(wish_id, shared_at DESC);
+                """)
+                # Covered by idx_sharing_history_wish_shared
+                cursor.execute("DROP INDEX IF EXISTS idx_sharing_history_wish_id;")
+                
+                cursor.close()
+            self._initialized = True
             return True
             
         except Exception as e:
-            st.error(f"Database initialization failed: {e}")
-            return False
+            raise vault_error(e, "initialize database", logger) from e
     
     def save_wish(self, user_id, content, contact_name=None, contact_email=None, 
                   contact_phone=None, contact_relationship=None, sharing_preferences=None):
         """Save a wish to the database."""
         try:
-            conn = self.get_connection()
-            if not conn:
-                return False
-            
-            cursor = conn.cursor()
             encrypted_content = self._encrypt_data(content)
             
-            cursor.execute("""
-                INSERT INTO wishes (user_id, encrypted_content, contact_name, contact_email, 
-                                  contact_phone, contact_relationship, sharing_preferences)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-                RETURNING id;
-            """, (user_id, encrypted_content, contact_name, contact_email, 
-                  contact_phone, contact_relationship, json.dumps(sharing_preferences) if sharing_preferences else None))
-            
-            wish_id = cursor.fetchone()[0]
-            conn.commit()
-            cursor.close()
-            conn.close()
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO wishes (user_id, encrypted_content, contact_name, contact_email, 
+                                      contact_phone, contact_relationship, sharing_preferences)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                    RETURNING id;
+                """, (user_id, encrypted_content, contact_name, contact_email, 
+                      contact_phone, contact_relationship, json.dumps(sharing_preferences) if sharing_preferences else None))
+                
+                wish_id = cursor.fetchone()[0]
+                cursor.close()
+            self._invalidate(user_id)
             return wish_id
             
         except Exception as e:
-            st.error(f"Failed to save wish: {e}")
-            return False
+            raise vault_error(e, "save wish", logger, user_id=user_id) from e
+    
+    def _invalidate(self, user_id):
+        """Drop a user's cached reads after writing one of their wishes."""
+        if self.cache is not None:
+            self.cache.invalidate(user_id)
     
     def get_wishes(self, user_id, limit=10):
-        """Get wishes for a user."""
+        """Get wishes for a user (served from the cache when it is enabled)."""
+        if self.cache is not None:
+            cached = self.cache.get(user_id, ('wishes', limit))
+            if cached is not None:
+                return cached
+            token = self.cache.token()
+        
         try:
-            conn = self.get_connection()
-            if not conn:
-                return []
-            
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            cursor.execute("""
-                SELECT id, encrypted_content, contact_name, contact_email, contact_phone,
-                       contact_relationship, sharing_preferences, created_at, updated_at
-                FROM wishes 
-                WHERE user_id = %s AND is_active = TRUE
-                ORDER BY created_at DESC
-                LIMIT %s;
-            """, (user_id, limit))
-            
-            wishes = cursor.fetchall()
-            cursor.close()
-            conn.close()
+            with self.connection() as conn:
+                cursor = conn.cursor(cursor_factory=RealDictCursor)
+                cursor.execute("""
+                    SELECT id, encrypted_content, contact_name, contact_email, contact_phone,
+                           contact_relationship, sharing_preferences, created_at, updated_at
+                    FROM wishes 
+                    WHERE user_id = %s AND is_active = TRUE
+                    ORDER BY created_at DESC
+                    LIMIT %s;
+                """, (user_id, limit))
+                
+                wishes = cursor.fetchall()
+                cursor.close()
             
-            # Decrypt content
             for wish in wishes:
-                wish['content'] = self._decrypt_data(wish['encrypted_content'])
                 # Handle sharing_preferences JSON properly
                 if wish['sharing_preferences']:
                     if isinstance(wish['sharing_preferences'], str):
@@ -186,25 +263,122 @@ class WishesDatabase:
                         wish['sharing_preferences'] = {}
                 else:
                     wish['sharing_preferences'] = {}
-                del wish['encrypted_content']  # Remove encrypted data from response
             
+            # Content is decrypted only when a caller reads it
+            wishes = [LazyWish(wish, self.cipher) for wish in wishes]
+            if self.cache is not None:
+                # The cache holds decrypted copies; decrypt them in one batch
+                LazyWish.load_all(wishes)
+                self.cache.put(user_id, ('wishes', limit), wishes, token)
             return wishes
             
         except Exception as e:
-            st.error(f"Failed to get wishes: {e}")
-            return []
+            raise vault_error(e, "get wishes", logger, user_id=user_id) from e
+    
+    def list_wishes(self, user_id, page_size=DEFAULT_PAGE_SIZE, cursor=None, include_content=False):
+        """
+        List one page of a user's wishes, newest first.
+        
+        Args:
+            user_id: Owner of the wishes
+            page_size: Wishes per page (at most MAX_PAGE_SIZE)
+            cursor: next_cursor of the previous page, or None for the first page
+            include_content: Read and decrypt the content; otherwise only titles and metadata
+        
+        Returns:
+            Dictionary with 'wishes' and 'next_cursor' (None on the last page)
+        
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+        columns = """id, contact_name, contact_email, contact_phone, contact_relationship,
+                     sharing_preferences, created_at, updated_at"""
+        if include_content:
+            columns += ", encrypted_content"
+        
+        conditions, values = ["user_id = %s", "is_active = TRUE"], [user_id]
+        if cursor:
+            created_at, wish_id = decode_cursor(cursor)
+            conditions.append("(created_at, id) < (%s, %s)")
+            values.extend([created_at, wish_id])
+        # One extra row tells whether another page follows
+        values.append(page_size + 1)
+        
+        try:
+            with self.connection() as conn:
+                db_cursor = conn.cursor(cursor_factory=RealDictCursor)
+                db_cursor.execute(f"""
+                    SELECT {columns}
+                    FROM wishes 
+                    WHERE {' AND '.join(conditions)}
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT %s;
+                """, values)
+                
+                rows = db_cursor.fetchall()
+                db_cursor.close()
+        except Exception as e:
+            raise vault_error(e, "list wishes", logger, user_id=user_id) from e
+        
+        wishes = rows[:page_size]
+        for wish in wishes:
+            if isinstance(wish['sharing_preferences'], str):
+                wish['sharing_preferences'] = json.loads(wish['sharing_preferences'])
+            elif not isinstance(wish['sharing_preferences'], dict):
+                wish['sharing_preferences'] = {}
+        if include_content:
+            wishes = [LazyWish(wish, self.cipher) for wish in wishes]
+            LazyWish.load_all(wishes)
+        
+        next_cursor = None
+        if len(rows) > page_size:
+            next_cursor = encode_cursor(wishes[-1]['created_at'], wishes[-1]['id'])
+        return {'wishes': wishes, 'next_cursor': next_cursor}
+    
+    def get_wish_by_id(self, wish_id, user_id):
+        """Get one active wish of a user by id, or None if it does not exist."""
+        if self.cache is not None:
+            cached = self.cache.get(user_id, ('wish', wish_id))
+            if cached is not None:
+                return cached
+            token = self.cache.token()
+        
+        try:
+            with self.connection() as conn:
+                cursor = conn.cursor(cursor_factory=RealDictCursor)
+                # Primary key lookup: only the requested row is read and decrypted
+                cursor.execute("""
+                    SELECT id, encrypted_content, contact_name, contact_email, contact_phone,
+                           contact_relationship, sharing_preferences, created_at, updated_at
+                    FROM wishes 
+                    WHERE id = %s AND user_id = %s AND is_active = TRUE;
+                """, (wish_id, user_id))
+                
+                wish = cursor.fetchone()
+                cursor.close()
+            
+            if not wish:
+                return None
+            
+            if isinstance(wish['sharing_preferences'], str):
+                wish['sharing_preferences'] = json.loads(wish['sharing_preferences'])
+            elif not isinstance(wish['sharing_preferences'], dict):
+                wish['sharing_preferences'] = {}
+            
+            wish = LazyWish(wish, self.cipher)
+            if self.cache is not None:
+                self.cache.put(user_id, ('wish', wish_id), wish, token)
+            return wish
+            
+        except Exception as e:
+            raise vault_error(e, "get wish", logger, user_id=user_id, wish_id=wish_id) from e
     
     def update_wish(self, wish_id, user_id, content=None, contact_name=None, 
                    contact_email=None, contact_phone=None, contact_relationship=None,
                    sharing_preferences=None):
         """Update a wish."""
         try:
-            conn = self.get_connection()
-            if not conn:
-                return False
-            
-            cursor = conn.cursor()
-            
             # Build dynamic update query
             update_fields = []
             update_values = []
@@ -242,91 +416,128 @@ class WishesDatabase:
                 WHERE id = %s AND user_id = %s;
             """
             
-            cursor.execute(query, update_values)
-            rows_affected = cursor.rowcount
-            conn.commit()
-            cursor.close()
-            conn.close()
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, update_values)
+                rows_affected = cursor.rowcount
+                cursor.close()
             
+            self._invalidate(user_id)
             return rows_affected > 0
             
         except Exception as e:
-            st.error(f"Failed to update wish: {e}")
-            return False
+            raise vault_error(e, "update wish", logger, user_id=user_id, wish_id=wish_id) from e
     
     def delete_wish(self, wish_id, user_id):
         """Soft delete a wish."""
         try:
-            conn = self.get_connection()
-            if not conn:
-                return False
-            
-            cursor = conn.cursor()
-            cursor.execute("""
-                UPDATE wishes 
-                SET is_active = FALSE, updated_at = CURRENT_TIMESTAMP
-                WHERE id = %s AND user_id = %s;
-            """, (wish_id, user_id))
-            
-            rows_affected = cursor.rowcount
-            conn.commit()
-            cursor.close()
-            conn.close()
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    UPDATE wishes 
+                    SET is_active = FALSE, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = %s AND user_id = %s;
+                """, (wish_id, user_id))
+                
+                rows_affected = cursor.rowcount
+                cursor.close()
             
+            self._invalidate(user_id)
             return rows_affected > 0
             
         except Exception as e:
-            st.error(f"Failed to delete wish: {e}")
-            return False
+            raise vault_error(e, "delete wish", logger, user_id=user_id, wish_id=wish_id) from e
     
-    def log_sharing(self, wish_id, shared_with, sharing_method, status='sent', notes=None):
-        """Log sharing activity."""
+    def log_sharing(self, wish_id, shared_with, sharing_method, status='sent', notes=None, user_id=None):
+        """
+        Log sharing activity (queued and written in the background unless write-behind is disabled).
+        
+        Pass the wish owner's user_id when it is known; otherwise it is looked up from the wish.
+        """
         try:
-            conn = self.get_connection()
-            if not conn:
-                return False
-            
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO sharing_history (wish_id, shared_with, sharing_method, status, notes)
-                VALUES (%s, %s, %s, %s, %s);
-            """, (wish_id, shared_with, sharing_method, status, notes))
-            
-            conn.commit()
-            cursor.close()
-            conn.close()
+            writer = self.history_writer
+            if writer is not None:
+                writer.log(wish_id, shared_with, sharing_method, status, notes, user_id)
+            else:
+                self.log_sharing_batch([make_entry(wish_id, shared_with, sharing_method, status, notes,
+                                                   user_id=user_id)])
             return True
             
         except Exception as e:
-            st.error(f"Failed to log sharing: {e}")
-            return False
+            raise vault_error(e, "log sharing", logger, wish_id=wish_id) from e
+    
+    def log_sharing_batch(self, entries):
+        """
+        Insert sharing-history rows in one statement.
+        
+        Rows the database rejects for their data (an unknown wish id, a
+        value too long for its column) are skipped so they cannot block the
+        rest. Raises if the database is unreachable.
+        
+        Args:
+            entries: Rows in SHARING_HISTORY_COLUMNS order
+        """
+        query = f"INSERT INTO sharing_history ({', '.join(SHARING_HISTORY_COLUMNS)}) VALUES %s"
+        try:
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                missing = missing_owner_ids(entries)
+                if missing:
+                    cursor.execute("SELECT id, user_id FROM wishes WHERE id IN %s;", (tuple(missing),))
+                    entries = fill_owners(entries, dict(cursor.fetchall()))
+                self._insert_history(cursor, query, entries)
+                cursor.close()
+        except Exception as e:
+            if not is_row_error(e):
+                raise
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                for entry in entries:
+                    cursor.execute("SAVEPOINT sharing_row;")
+                    try:
+                        self._insert_history(cursor, query, [entry])
+                        cursor.execute("RELEASE SAVEPOINT sharing_row;")
+                    except Exception as row_error:
+                        if not is_row_error(row_error):
+                            raise
+                        cursor.execute("ROLLBACK TO SAVEPOINT sharing_row;")
+                        logger.warning(f"Dropping sharing history row for wish {entry[0]}: {row_error}")
+                cursor.close()
+    
+    def _insert_history(self, cursor, query, entries):
+        """Run a multi-row sharing-history INSERT (VALUES %s) on either backend."""
+        if self.backend == 'sqlite':
+            row = ', '.join(['%s'] * len(SHARING_HISTORY_COLUMNS))
+            cursor.executemany(query.replace('VALUES %s', f'VALUES ({row})'), entries)
+        else:
+            execute_values(cursor, query, entries)
     
     def get_sharing_history(self, user_id, limit=20):
         """Get sharing history for a user."""
         try:
-            conn = self.get_connection()
-            if not conn:
-                return []
-            
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            cursor.execute("""
-                SELECT sh.*, w.contact_name, w.created_at as wish_created_at
-                FROM sharing_history sh
-                JOIN wishes w ON sh.wish_id = w.id
-                WHERE w.user_id = %s
-                ORDER BY sh.shared_at DESC
-                LIMIT %s;
-            """, (user_id, limit))
-            
-            history = cursor.fetchall()
-            cursor.close()
-            conn.close()
+            # Include shares still waiting in the write-behind queue
+            if self._history_writer is not None:
+                self._history_writer.flush()
+            
+            with self.connection() as conn:
+                cursor = conn.cursor(cursor_factory=RealDictCursor)
+                # Newest rows come from idx_sharing_history_user_shared; only they are joined
+                cursor.execute("""
+                    SELECT sh.*, w.contact_name, w.created_at as wish_created_at
+                    FROM sharing_history sh
+                    JOIN wishes w ON sh.wish_id = w.id
+                    WHERE sh.user_id = %s
+                    ORDER BY sh.shared_at DESC
+                    LIMIT %s;
+                """, (user_id, limit))
+                
+                history = cursor.fetchall()
+                cursor.close()
             
             return history
             
         except Exception as e:
-            st.error(f"Failed to get sharing history: {e}")
-            return []
+            raise vault_error(e, "get sharing history", logger, user_id=user_id) from e
 
 # Global database instance
 wishes_db = WishesDatabase()
@@ -0,0 +1,234 @@
+"""
+Fernet encryption of wish content, shared by the sync and async vault layers.
+
+Wish rows come back as LazyWish dictionaries whose content is decrypted
+only when it is read, so listings that show titles never pay for Fernet.
+Decryption time is counted per request (start_decrypt_metrics).
+"""
+
+import os
+import time
+import threading
+from contextvars import ContextVar
+from concurrent.futures import ThreadPoolExecutor
+from cryptography.fernet import Fernet
+
+KEY_FILE = os.path.join(os.path.dirname(__file__), 'db_wishes.key')
+
+# Decryption counters of the current request, if it is being measured
+_decrypt_metrics = ContextVar('decrypt_metrics', default=None)
+
+
+def get_or_create_encryption_key(key_file=KEY_FILE):
+    """Get or create encryption key for wishes."""
+    if os.path.exists(key_file):
+        with open(key_file, 'rb') as f:
+            key = f.read()
+    else:
+        key = Fernet.generate_key()
+        with open(key_file, 'wb') as f:
+            f.write(key)
+    return key
+
+
+def start_decrypt_metrics():
+    """
+    Start counting decryptions in the current context (one request).
+
+    Returns:
+        Dictionary with 'rows' and 'seconds', updated as decryption happens
+    """
+    metrics = {'rows': 0, 'seconds': 0.0}
+    _decrypt_metrics.set(metrics)
+    return metrics
+
+
+def get_decrypt_metrics():
+    """Get the current context's decryption counters, or None if not measured."""
+    return _decrypt_metrics.get()
+
+
+def _record_decrypt(rows, seconds):
+    metrics = _decrypt_metrics.get()
+    if metrics is not None:
+        metrics['rows'] += rows
+        metrics['seconds'] += seconds
+
+
+class WishCipher:
+    """Encrypts and decrypts wish content with the vault's Fernet key."""
+
+    def __init__(self, key=None, threads=None, parallel_min=None):
+        """
+        Initialize the cipher.
+
+        Args:
+            key: Fernet key (default: the vault key file)
+            threads: Threads for batch decryption; 0 or 1 decrypts serially (default: DECRYPT_THREADS)
+            parallel_min: Smallest batch worth the thread pool (default: DECRYPT_PARALLEL_MIN)
+        """
+        self.key = key or get_or_create_encryption_key()
+        self.fernet = Fernet(self.key)
+        self.threads = int(os.getenv('DECRYPT_THREADS', '0')) if threads is None else threads
+        self.parallel_min = int(os.getenv('DECRYPT_PARALLEL_MIN', '256')) if parallel_min is None else parallel_min
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def encrypt(self, data):
+        """Encrypt sensitive data."""
+        if isinstance(data, str):
+            data = data.encode()
+        return self.fernet.encrypt(data)
+
+    def _decrypt(self, encrypted_data):
+        if encrypted_data is None:
+            return None
+        try:
+            if isinstance(encrypted_data, memoryview):
+                encrypted_data = bytes(encrypted_data)
+            return self.fernet.decrypt(encrypted_data).decode()
+        except Exception:
+            return None
+
+    def decrypt(self, encrypted_data):
+        """Decrypt sensitive data, returning None if it cannot be decrypted."""
+        started = time.perf_counter()
+        value = self._decrypt(encrypted_data)
+        _record_decrypt(1, time.perf_counter() - started)
+        return value
+
+    def decrypt_many(self, values):
+        """
+        Decrypt a batch of values, on a thread pool when the batch is large.
+
+        Args:
+            values: Encrypted values (None entries stay None)
+
+        Returns:
+            List of decrypted strings, in order
+        """
+        started = time.perf_counter()
+        if self.threads > 1 and len(values) >= self.parallel_min:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="decrypt")
+            chunksize = max(1, len(values) // (self.threads * 4))
+            results = list(self._executor.map(self._decrypt, values, chunksize=chunksize))
+        else:
+            results = [self._decrypt(value) for value in values]
+        _record_decrypt(len(values), time.perf_counter() - started)
+        return results
+
+
+class LazyWish(dict):
+    """
+    A wish row whose 'content' is decrypted on first access.
+
+    Reading other fields never decrypts. Reading 'content', or using the
+    wish as a whole (iterating, copying, serializing), decrypts it once.
+    """
+
+    def __init__(self, row, cipher):
+        row = dict(row)
+        self._encrypted = row.pop('encrypted_content', None)
+        self._cipher = cipher
+        self._pending = True
+        super().__init__(row)
+
+    @property
+    def decrypted(self):
+        """Whether the content has been decrypted."""
+        return not self._pending
+
+    def _load(self):
+        if self._pending:
+            dict.__setitem__(self, 'content', self._cipher.decrypt(self._encrypted))
+            self._settle()
+
+    def _settle(self):
+        self._pending = False
+        self._encrypted = None
+
+    @staticmethod
+    def load_all(wishes):
+        """Decrypt the content of many wishes in one batch (see WishCipher.decrypt_many)."""
+        pending = [wish for wish in wishes if isinstance(wish, LazyWish) and wish._pending]
+        if not pending:
+            return
+        contents = pending[0]._cipher.decrypt_many([wish._encrypted for wish in pending])
+        for wish, content in zip(pending, contents):
+            dict.__setitem__(wish, 'content', content)
+            wish._settle()
+
+    def __getitem__(self, key):
+        if key == 'content':
+            self._load()
+        return dict.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        if key == 'content':
+            self._load()
+        return dict.get(self, key, default)
+
+    def __contains__(self, key):
+        return (key == 'content' and self._pending) or dict.__contains__(self, key)
+
+    def __len__(self):
+        return dict.__len__(self) + (1 if self._pending else 0)
+
+    def __iter__(self):
+        self._load()
+        return dict.__iter__(self)
+
+    def keys(self):
+        self._load()
+        return dict.keys(self)
+
+    def values(self):
+        self._load()
+        return dict.values(self)
+
+    def items(self):
+        self._load()
+        return dict.items(self)
+
+    def copy(self):
+        self._load()
+        return dict(dict.items(self))
+
+    def pop(self, key, *default):
+        if key == 'content':
+            self._load()
+        return dict.pop(self, key, *default)
+
+    def __setitem__(self, key, value):
+        if key == 'content':
+            self._settle()
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        if key == 'content' and self._pending:
+            self._settle()
+            return
+        dict.__delitem__(self, key)
+
+    def update(self, *args, **kwargs):
+        other = dict(*args, **kwargs)
+        if 'content' in other:
+            self._settle()
+        dict.update(self, other)
+
+    def __eq__(self, other):
+        self._load()
+        return dict.__eq__(self, other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        if self._pending:
+            return f"LazyWish({dict.__repr__(self)[:-1]}, 'content': <encrypted>}})"
+        return f"LazyWish({dict.__repr__(self)})"
+
+    def __reduce__(self):
+        # Pickles (e.g. caches) hold a plain, decrypted dictionary
+        return (dict, (self.copy(),))
@@ -0,0 +1,93 @@
+"""
+Exceptions raised by the Wishes Vault data layer.
+
+WishesDatabase and AsyncWishesDatabase raise these instead of driver
+exceptions, so callers can react without knowing whether psycopg2, asyncpg
+or SQLite is underneath. VaultUnavailableError means the database could not
+be reached and a retry may succeed; other errors will fail again the same
+way. Presentation (Streamlit messages, HTTP status codes) is left to the
+caller.
+"""
+
+import sqlite3
+import logging
+
+
+class VaultError(Exception):
+    """Base class for Wishes Vault database errors."""
+
+    def __init__(self, message, operation=None):
+        super().__init__(message)
+        self.operation = operation
+
+
+class VaultUnavailableError(VaultError):
+    """The database cannot be reached right now (connection refused or lost, pool exhausted, file locked)."""
+
+
+class VaultQueryError(VaultError):
+    """A vault query failed."""
+
+
+class VaultIntegrityError(VaultQueryError):
+    """A write violated a database constraint, e.g. it referenced a missing wish."""
+
+
+# SQLSTATE classes: connection exception, insufficient resources, operator intervention
+_UNAVAILABLE_SQLSTATES = ('08', '53', '57')
+_UNAVAILABLE_DRIVER_ERRORS = ('OperationalError', 'InterfaceError')
+
+
+def _classify(error):
+    code = str(getattr(error, 'sqlstate', None) or getattr(error, 'pgcode', None) or '')
+    if code.startswith('23') or isinstance(error, sqlite3.IntegrityError):
+        return VaultIntegrityError
+    if code[:2] in _UNAVAILABLE_SQLSTATES or isinstance(error, (ConnectionError, TimeoutError, OSError)):
+        return VaultUnavailableError
+    if isinstance(error, sqlite3.OperationalError):
+        # Another process holds the write lock; anything else is a bad query
+        return VaultUnavailableError if 'locked' in str(error) else VaultQueryError
+    # psycopg2 reports refused and dropped connections without a SQLSTATE
+    if not code and type(error).__name__ in _UNAVAILABLE_DRIVER_ERRORS:
+        return VaultUnavailableError
+    return VaultQueryError
+
+
+def is_unavailable(error):
+    """Check whether an error means the database could not be reached (retrying later may succeed)."""
+    return isinstance(error, VaultUnavailableError) or (
+        not isinstance(error, VaultError) and _classify(error) is VaultUnavailableError)
+
+
+def is_row_error(error):
+    """
+    Check whether an error is caused by the row's data: a constraint
+    violation (SQLSTATE 23) or a bad value (22, e.g. a string too long for
+    its column). Writing the same row again fails the same way.
+    """
+    code = str(getattr(error, 'sqlstate', None) or getattr(error, 'pgcode', None) or '')
+    return code[:2] in ('22', '23') or isinstance(error, (sqlite3.IntegrityError, sqlite3.DataError))
+
+
+def vault_error(error, operation, logger=None, **context):
+    """
+    Log a failed vault operation and wrap the driver error in a VaultError.
+
+    Use as ``raise vault_error(e, "save wish", logger, user_id=user_id) from e``.
+
+    Args:
+        error: Exception raised by the driver or the pool
+        operation: What was being done, e.g. "save wish"
+        logger: Logger to report to (default: this module's)
+        **context: Fields attached to the log record (e.g. user_id, wish_id)
+
+    Returns:
+        The VaultError to raise (the error itself if it already is one)
+    """
+    wrapped = error if isinstance(error, VaultError) else _classify(error)(str(error), operation)
+    level = logging.WARNING if isinstance(wrapped, VaultUnavailableError) else logging.ERROR
+    (logger or logging.getLogger(__name__)).log(
+        level, f"Failed to {operation}: {error}",
+        extra={'vault_operation': operation, 'vault_error': type(wrapped).__name__, 'vault_context': context}
+    )
+    return wrapped
@@ -0,0 +1,36 @@
+"""
+Keyset pagination cursors for wish listings.
+
+A cursor encodes the (created_at, id) of the last wish on a page; the next
+page continues strictly after it in (created_at DESC, id DESC) order, so
+each page is one index range scan regardless of how many wishes precede it.
+"""
+
+import json
+import base64
+from datetime import datetime
+from typing import Tuple
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(created_at: datetime, wish_id: int) -> str:
+    """Encode the position after a wish as an opaque URL-safe cursor."""
+    payload = json.dumps([created_at.isoformat(), wish_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode a cursor from encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, wish_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(wish_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
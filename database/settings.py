@@ -0,0 +1,22 @@
+"""
+Connection settings for the SHAKTI-AI Wishes Vault database.
+"""
+
+import os
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Database configuration
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST', 'localhost'),
+    'database': os.getenv('DB_NAME', 'shakti_ai_db'),
+    'user': os.getenv('DB_USER', 'postgres'),
+    'password': os.getenv('DB_PASSWORD', 'password'),
+    'port': os.getenv('DB_PORT', '5432')
+}
+
+# Storage engine: 'postgres' (DB_CONFIG) or 'sqlite' (embedded file at SQLITE_PATH)
+DB_BACKEND = os.getenv('DB_BACKEND', 'postgres').lower()
+SQLITE_PATH = os.getenv('SQLITE_PATH', os.path.join(os.path.dirname(__file__), 'wishes_vault.sqlite3'))
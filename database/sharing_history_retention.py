@@ -0,0 +1,160 @@
+"""
+Sharing History Retention for the SHAKTI-AI Wishes Vault
+Removes sharing-history rows older than the retention period in small
+batches, optionally archiving them first, so the audit table stays small
+without long locks or one huge transaction.
+
+Archives use the bulk file format of wishes_bulk.py and can be restored with
+``python database/wishes_bulk.py import``. Run this regularly (e.g. daily
+from cron); each batch commits on its own, so an interrupted run loses no
+work and the next run continues where it stopped. Archived rows are synced
+to disk before they are deleted. An existing archive is never overwritten,
+so give each run a new archive file.
+
+Usage:
+    python database/sharing_history_retention.py --dry-run
+    python database/sharing_history_retention.py --days 365 --archive archive/history-2025.copy.gz
+    python database/sharing_history_retention.py --days 730 --batch-size 1000
+"""
+
+import io
+import os
+import sys
+import argparse
+from pathlib import Path
+from datetime import datetime, timedelta
+
+import psycopg2
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from database.settings import DB_CONFIG
+from database.wishes_bulk import TABLE_COLUMNS, open_bulk_file, write_header
+
+
+def count_expired(conn, cutoff):
+    """Count sharing-history rows shared before the cutoff."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM sharing_history WHERE shared_at < %s;", (cutoff,))
+    count = cursor.fetchone()[0]
+    cursor.close()
+    conn.rollback()
+    return count
+
+
+def sync_archive(archive):
+    """Flush an archive and fsync the file under it, so its rows survive a crash."""
+    archive.flush()
+    try:
+        fileno = archive.fileno()
+    except (AttributeError, io.UnsupportedOperation):
+        # In-memory archive: nothing to sync
+        return
+    os.fsync(fileno)
+
+
+def purge_history(conn, cutoff, batch_size=5000, archive=None):
+    """
+    Delete sharing-history rows shared before the cutoff, one batch per transaction.
+
+    Batches walk the primary key, so each one reads only the rows it removes
+    until the expired rows are used up.
+
+    Args:
+        conn: psycopg2 connection
+        cutoff: Rows shared before this datetime are removed
+        batch_size: Rows deleted per transaction
+        archive: Binary file object that receives the rows (bulk format) before they are deleted
+
+    Returns:
+        Dictionary with 'rows' removed and 'batches' committed
+    """
+    columns = TABLE_COLUMNS['sharing_history']
+    if archive is not None:
+        write_header(archive, 'sharing_history')
+
+    stats = {'rows': 0, 'batches': 0}
+    last_id = 0
+    cursor = conn.cursor()
+    try:
+        while True:
+            cursor.execute("""
+                SELECT id FROM sharing_history
+                WHERE id > %s AND shared_at < %s
+                ORDER BY id
+                LIMIT %s;
+            """, (last_id, cutoff, batch_size))
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                break
+
+            if archive is not None:
+                query = cursor.mogrify(f"SELECT {', '.join(columns)} FROM sharing_history "
+                                       "WHERE id = ANY(%s) ORDER BY id", (ids,)).decode()
+                cursor.copy_expert(f"COPY ({query}) TO STDOUT", archive)
+                # Archived rows must be on disk before they are deleted
+                sync_archive(archive)
+
+            cursor.execute("DELETE FROM sharing_history WHERE id = ANY(%s);", (ids,))
+            stats['rows'] += cursor.rowcount
+            conn.commit()
+
+            stats['batches'] += 1
+            last_id = ids[-1]
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remove old sharing history from the SHAKTI-AI Wishes Vault")
+    parser.add_argument('--days', type=int, default=int(os.getenv('SHARING_HISTORY_RETENTION_DAYS', '365')),
+                        help="Keep rows shared within this many days")
+    parser.add_argument('--batch-size', type=int,
+                        default=int(os.getenv('SHARING_HISTORY_RETENTION_BATCH', '5000')),
+                        help="Rows deleted per transaction")
+    parser.add_argument('--archive', help="Write removed rows to this bulk file first (.gz to compress)")
+    parser.add_argument('--dry-run', action='store_true', help="Only count the rows that would be removed")
+    args = parser.parse_args()
+
+    cutoff = datetime.now() - timedelta(days=args.days)
+
+    if args.archive and os.path.exists(args.archive):
+        print(f"❌ {args.archive} already exists; archive each run to a new file")
+        return 1
+
+    try:
+        conn = psycopg2.connect(**DB_CONFIG)
+    except psycopg2.OperationalError as e:
+        print(f"❌ Connection failed: {e}")
+        return 1
+
+    try:
+        if args.dry_run:
+            print(f"🔎 {count_expired(conn, cutoff)} sharing history rows are older than {cutoff:%Y-%m-%d}")
+            return 0
+
+        if args.archive:
+            # 'x' fails instead of truncating an archive created since the check above
+            with open_bulk_file(args.archive, 'x') as archive:
+                stats = purge_history(conn, cutoff, args.batch_size, archive)
+            print(f"📦 Archived to {args.archive}")
+        else:
+            stats = purge_history(conn, cutoff, args.batch_size)
+        print(f"✅ Removed {stats['rows']} sharing history rows older than {cutoff:%Y-%m-%d} "
+              f"in {stats['batches']} batches")
+        return 0
+    except Exception as e:
+        print(f"❌ Retention failed: {e}")
+        return 1
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,367 @@
+"""
+Write-behind queue for sharing-history rows.
+
+Sharing a wish only records an audit row, so the share request should not
+wait on that commit. log() queues the row and returns; a background worker
+writes queued rows in batches every ``interval`` seconds (or as soon as
+``max_batch`` rows are waiting). If the database cannot be reached, the
+batch is appended to a JSONL fallback file and replayed after the next
+successful write. Any other error would recur on every replay, so such a
+batch is logged and dropped. Queued rows are flushed on close().
+
+SharingHistoryWriter runs on a thread (sync layer, Streamlit);
+AsyncSharingHistoryWriter runs as a task on the event loop (FastAPI).
+"""
+
+import os
+import json
+import atexit
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no advisory locks; run a single process there
+    fcntl = None
+
+try:
+    from database.errors import is_unavailable
+except ImportError:
+    # Imported as a top-level module from inside database/
+    from errors import is_unavailable
+
+logger = logging.getLogger(__name__)
+
+SHARING_HISTORY_COLUMNS = ('wish_id', 'shared_with', 'sharing_method', 'status', 'notes', 'shared_at', 'user_id')
+DEFAULT_FALLBACK_PATH = os.path.join(os.path.dirname(__file__), 'sharing_history_fallback.jsonl')
+
+
+def make_entry(wish_id, shared_with, sharing_method, status='sent', notes=None, shared_at=None, user_id=None):
+    """Build a sharing-history row in SHARING_HISTORY_COLUMNS order, stamped with the share time."""
+    return (wish_id, shared_with, sharing_method, status, notes, shared_at or datetime.now(), user_id)
+
+
+def missing_owner_ids(entries: List[tuple]) -> List[int]:
+    """Wish ids of rows logged without the owner's user id."""
+    return sorted({entry[0] for entry in entries if entry[-1] is None})
+
+
+def fill_owners(entries: List[tuple], owners: Dict[int, str]) -> List[tuple]:
+    """Set the user id of rows logged without one from a wish id -> owner mapping."""
+    return [entry if entry[-1] is not None else entry[:-1] + (owners.get(entry[0]),) for entry in entries]
+
+
+@contextmanager
+def _locked(path: str):
+    """Hold an exclusive lock on the fallback file's lock file, shared by every process using it."""
+    if fcntl is None:
+        yield
+        return
+    with open(path + '.lock', 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def append_fallback(path: str, entries: List[tuple]):
+    """Append rows to the fallback file (one JSON object per line) and fsync it."""
+    with _locked(path), open(path, 'a', encoding='utf-8') as f:
+        for entry in entries:
+            row = dict(zip(SHARING_HISTORY_COLUMNS, entry))
+            row['shared_at'] = row['shared_at'].isoformat()
+            f.write(json.dumps(row) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def take_fallback(path: str) -> List[tuple]:
+    """
+    Remove the fallback file and return its rows (restore them with append_fallback on failure).
+
+    Web workers and the Streamlit app may share the file; the lock makes
+    reading and removing it one step, so two processes never take the same
+    rows and no append lands in a file that is being removed.
+    """
+    with _locked(path):
+        if not os.path.exists(path):
+            return []
+        entries = []
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    row['shared_at'] = datetime.fromisoformat(row['shared_at'])
+                    # Rows saved before user_id was recorded lack the column
+                    entries.append(tuple(row.get(column) for column in SHARING_HISTORY_COLUMNS))
+        os.remove(path)
+    return entries
+
+
+class SharingHistoryWriter:
+    """Thread-based write-behind queue for the sync vault layer."""
+
+    def __init__(self, write_batch: Callable[[List[tuple]], Any], interval: float = 0.5,
+                 max_batch: int = 500, fallback_path: str = DEFAULT_FALLBACK_PATH):
+        """
+        Initialize the writer.
+
+        Args:
+            write_batch: Function inserting a list of rows; raises if they were not written
+            interval: Seconds between background flushes
+            max_batch: Queued rows that trigger an early flush
+            fallback_path: JSONL file for rows that could not be written
+        """
+        self.write_batch = write_batch
+        self.interval = interval
+        self.max_batch = max_batch
+        self.fallback_path = fallback_path
+        self.stats = {'queued': 0, 'written': 0, 'batches': 0, 'fallback_rows': 0, 'replayed': 0, 'dropped': 0}
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="sharing-history-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def log(self, wish_id, shared_with, sharing_method, status='sent', notes=None, user_id=None, shared_at=None):
+        """Queue a sharing-history row without waiting for the database."""
+        entry = make_entry(wish_id, shared_with, sharing_method, status, notes, shared_at, user_id)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Sharing history writer is closed")
+            self._pending.append(entry)
+            self.stats['queued'] += 1
+            full = len(self._pending) >= self.max_batch
+        if full:
+            self._wake.set()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> bool:
+        """
+        Write all queued rows now.
+
+        Returns:
+            True if they reached the database, False if they went to the fallback file or were dropped
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return True
+
+            try:
+                self.write_batch(batch)
+            except Exception as e:
+                if not is_unavailable(e):
+                    self._drop(batch, e)
+                    return False
+                logger.error(f"Could not write {len(batch)} sharing history rows, saving to fallback: {e}")
+                append_fallback(self.fallback_path, batch)
+                self.stats['fallback_rows'] += len(batch)
+                return False
+
+            self.stats['written'] += len(batch)
+            self.stats['batches'] += 1
+            self._replay_fallback()
+            return True
+
+    def _replay_fallback(self):
+        """Write rows saved while the database was unreachable."""
+        entries = take_fallback(self.fallback_path)
+        if not entries:
+            return
+        try:
+            self.write_batch(entries)
+            self.stats['replayed'] += len(entries)
+            logger.info(f"Replayed {len(entries)} sharing history rows from the fallback file")
+        except Exception as e:
+            if not is_unavailable(e):
+                self._drop(entries, e)
+                return
+            logger.warning(f"Fallback replay failed, keeping rows for later: {e}")
+            append_fallback(self.fallback_path, entries)
+
+    def _drop(self, entries: List[tuple], error: Exception):
+        logger.error(f"Dropping {len(entries)} sharing history rows that cannot be written: {error}")
+        self.stats['dropped'] += len(entries)
+
+    def close(self):
+        """Flush queued rows and stop the background thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self.flush()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get counters plus the number of rows still queued."""
+        with self._lock:
+            return dict(self.stats, pending=len(self._pending))
+
+
+class AsyncSharingHistoryWriter:
+    """Event-loop write-behind queue for the async vault layer."""
+
+    def __init__(self, write_batch: Callable[[List[tuple]], Any], interval: float = 0.5,
+                 max_batch: int = 500, fallback_path: str = DEFAULT_FALLBACK_PATH):
+        """
+        Initialize the writer; call start() on the event loop.
+
+        Args:
+            write_batch: Coroutine function inserting a list of rows; raises if they were not written
+            interval: Seconds between background flushes
+            max_batch: Queued rows that trigger an early flush
+            fallback_path: JSONL file for rows that could not be written
+        """
+        self.write_batch = write_batch
+        self.interval = interval
+        self.max_batch = max_batch
+        self.fallback_path = fallback_path
+        self.stats = {'queued': 0, 'written': 0, 'batches': 0, 'fallback_rows': 0, 'replayed': 0, 'dropped': 0}
+        self._pending = []
+        self._loop = None
+        self._flush_lock = None
+        self._wake = None
+        self._task = None
+        self._closing = False
+
+    def _bind(self):
+        # Locks and tasks belong to one event loop; start over if it has changed
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._flush_lock = asyncio.Lock()
+            self._wake = asyncio.Event()
+            self._task = None
+        return loop
+
+    def start(self):
+        """Start the flush task on the running event loop."""
+        loop = self._bind()
+        if self._task is None or self._task.done():
+            self._closing = False
+            self._task = loop.create_task(self._run())
+
+    def log(self, wish_id, shared_with, sharing_method, status='sent', notes=None, user_id=None, shared_at=None):
+        """Queue a sharing-history row without waiting for the database."""
+        self.start()
+        self._pending.append(make_entry(wish_id, shared_with, sharing_method, status, notes, shared_at, user_id))
+        self.stats['queued'] += 1
+        if len(self._pending) >= self.max_batch:
+            self._wake.set()
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self) -> bool:
+        """
+        Write all queued rows now.
+
+        Returns:
+            True if they reached the database, False if they went to the fallback file or were dropped
+        """
+        self._bind()
+        async with self._flush_lock:
+            batch, self._pending = self._pending, []
+            if not batch:
+                return True
+
+            try:
+                await self.write_batch(batch)
+            except asyncio.CancelledError:
+                # The batch has left the queue; keep it rather than lose it
+                append_fallback(self.fallback_path, batch)
+                self.stats['fallback_rows'] += len(batch)
+                raise
+            except Exception as e:
+                if not is_unavailable(e):
+                    self._drop(batch, e)
+                    return False
+                logger.error(f"Could not write {len(batch)} sharing history rows, saving to fallback: {e}")
+                await asyncio.to_thread(append_fallback, self.fallback_path, batch)
+                self.stats['fallback_rows'] += len(batch)
+                return False
+
+            self.stats['written'] += len(batch)
+            self.stats['batches'] += 1
+            await self._replay_fallback()
+            return True
+
+    async def _replay_fallback(self):
+        """Write rows saved while the database was unreachable."""
+        entries = await asyncio.to_thread(take_fallback, self.fallback_path)
+        if not entries:
+            return
+        try:
+            await self.write_batch(entries)
+            self.stats['replayed'] += len(entries)
+            logger.info(f"Replayed {len(entries)} sharing history rows from the fallback file")
+        except Exception as e:
+            if not is_unavailable(e):
+                self._drop(entries, e)
+                return
+            logger.warning(f"Fallback replay failed, keeping rows for later: {e}")
+            await asyncio.to_thread(append_fallback, self.fallback_path, entries)
+
+    def _drop(self, entries: List[tuple], error: Exception):
+        logger.error(f"Dropping {len(entries)} sharing history rows that cannot be written: {error}")
+        self.stats['dropped'] += len(entries)
+
+    async def close(self, timeout: float = 5.0):
+        """Let an in-flight flush finish, stop the flush task and flush queued rows."""
+        if self._task is not None and self._loop is asyncio.get_running_loop():
+            self._closing = True
+            self._wake.set()
+            await asyncio.wait([self._task], timeout=timeout)
+            if not self._task.done():
+                self._task.cancel()
+                try:
+                    await self._task
+                except asyncio.CancelledError:
+                    pass
+        self._task = None
+        await self.flush()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get counters plus the number of rows still queued."""
+        return dict(self.stats, pending=len(self._pending))
+
+
+def writer_settings_from_env() -> Optional[Dict[str, Any]]:
+    """
+    Read write-behind settings: SHARING_HISTORY_WRITE_BEHIND (default true),
+    SHARING_HISTORY_FLUSH_SECONDS, SHARING_HISTORY_MAX_BATCH and
+    SHARING_HISTORY_FALLBACK.
+
+    Returns:
+        Keyword arguments for a writer, or None when write-behind is disabled
+    """
+    if os.getenv('SHARING_HISTORY_WRITE_BEHIND', 'true').lower() not in ('1', 'true', 'yes'):
+        return None
+    return {
+        'interval': float(os.getenv('SHARING_HISTORY_FLUSH_SECONDS', '0.5')),
+        'max_batch': int(os.getenv('SHARING_HISTORY_MAX_BATCH', '500')),
+        'fallback_path': os.getenv('SHARING_HISTORY_FALLBACK', DEFAULT_FALLBACK_PATH)
+    }
@@ -0,0 +1,300 @@
+"""
+Embedded SQLite storage for the Wishes Vault.
+
+Lets the vault, the Streamlit page and the FastAPI endpoints run with no
+database server, for local development, CI and load tests. Select it with
+DB_BACKEND=sqlite; the file is SQLITE_PATH. Tables, indexes and encryption
+are the same as on PostgreSQL, and the file runs in WAL mode so readers do
+not block the writer.
+
+The adapters below accept the SQL the vault layers already send:
+
+- SQLiteConnection looks like a psycopg2 connection to WishesDatabase and
+  plugs into ConnectionPool. ``%s`` placeholders become ``?``, and a tuple
+  parameter expands to a parenthesized list, as psycopg2 renders it.
+- AsyncSQLitePool looks like an asyncpg pool to AsyncWishesDatabase.
+  ``$n`` placeholders become ``?``, ``= ANY($n::type[])`` with a list
+  becomes ``IN (...)``, and constraint errors carry an asyncpg-style sqlstate.
+  It holds one connection and hands it to one request at a time. sqlite3
+  calls block, so they run on the pool's own thread, never on the event loop.
+"""
+
+import re
+import sqlite3
+import asyncio
+from datetime import datetime
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS wishes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id VARCHAR(255) NOT NULL,
+        encrypted_content BLOB NOT NULL,
+        contact_name VARCHAR(255),
+        contact_email VARCHAR(255),
+        contact_phone VARCHAR(20),
+        contact_relationship VARCHAR(100),
+        sharing_preferences TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        is_active BOOLEAN DEFAULT TRUE
+    );
+    CREATE TABLE IF NOT EXISTS sharing_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        wish_id INTEGER REFERENCES wishes(id),
+        shared_with VARCHAR(255) NOT NULL,
+        sharing_method VARCHAR(50) NOT NULL,
+        shared_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        status VARCHAR(50) DEFAULT 'sent',
+        notes TEXT,
+        user_id VARCHAR(255)
+    );
+    CREATE INDEX IF NOT EXISTS idx_wishes_user_id ON wishes(user_id);
+    CREATE INDEX IF NOT EXISTS idx_wishes_created_at ON wishes(created_at);
+    CREATE INDEX IF NOT EXISTS idx_wishes_user_active_created
+        ON wishes(user_id, is_active, created_at DESC, id DESC);
+    CREATE INDEX IF NOT EXISTS idx_sharing_history_user_shared ON sharing_history(user_id, shared_at DESC);
+    CREATE INDEX IF NOT EXISTS idx_sharing_history_wish_shared ON sharing_history(wish_id, shared_at DESC);
+"""
+
+# Timestamps are stored as ISO text and read back as datetime, like PostgreSQL TIMESTAMP
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_converter('TIMESTAMP', lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter('BOOLEAN', lambda value: bool(int(value)))
+
+_ASYNC_PLACEHOLDER = re.compile(r"=\s*ANY\(\$(\d+)(?:::\w+\[\])?\)|\$(\d+)")
+
+
+class SQLiteIntegrityError(sqlite3.IntegrityError):
+    """Constraint violation with the SQLSTATE class asyncpg reports (23)."""
+
+    sqlstate = '23000'
+
+
+def open_database(path: str, timeout: float = 5.0) -> sqlite3.Connection:
+    """
+    Open the vault database file in WAL mode and create its tables.
+
+    Args:
+        path: Database file (':memory:' for a private in-memory database)
+        timeout: Seconds to wait for another writer's lock
+
+    Returns:
+        sqlite3 connection
+    """
+    db = sqlite3.connect(path, timeout=timeout, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL;")
+    db.execute("PRAGMA synchronous=NORMAL;")
+    db.execute("PRAGMA foreign_keys=ON;")
+    db.executescript(SCHEMA)
+    return db
+
+
+def _expand_params(query: str, params) -> tuple:
+    """Translate psycopg2-style ``%s`` placeholders and parameters to SQLite's."""
+    parts = query.replace('%%', '\0').split('%s')
+    if len(parts) - 1 != len(params):
+        raise sqlite3.ProgrammingError(f"Query has {len(parts) - 1} placeholders for {len(params)} parameters")
+    sql, values = [parts[0]], []
+    for value, part in zip(params, parts[1:]):
+        if isinstance(value, tuple):
+            sql.append('(' + ', '.join('?' * len(value)) + ')')
+            values.extend(value)
+        else:
+            sql.append('?')
+            values.append(value)
+        sql.append(part)
+    return ''.join(sql).replace('\0', '%'), values
+
+
+class SQLiteCursor:
+    """The subset of a psycopg2 cursor WishesDatabase uses."""
+
+    def __init__(self, cursor: sqlite3.Cursor, as_dict: bool = False):
+        self._cursor = cursor
+        self._as_dict = as_dict
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    def execute(self, query: str, params=()):
+        self._cursor.execute(*_expand_params(query, params))
+
+    def executemany(self, query: str, rows):
+        self._cursor.executemany(query.replace('%s', '?'), rows)
+
+    def _row(self, row):
+        if row is None or not self._as_dict:
+            return row
+        return {column[0]: value for column, value in zip(self._cursor.description, row)}
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchall(self) -> List:
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """A SQLite connection with the psycopg2 connection API ConnectionPool and WishesDatabase use."""
+
+    def __init__(self, db: sqlite3.Connection):
+        self.db = db
+        self.closed = 0
+
+    def cursor(self, cursor_factory=None) -> SQLiteCursor:
+        """Open a cursor; any cursor_factory (e.g. RealDictCursor) returns rows as dictionaries."""
+        return SQLiteCursor(self.db.cursor(), as_dict=cursor_factory is not None)
+
+    def commit(self):
+        self.db.commit()
+
+    def rollback(self):
+        self.db.rollback()
+
+    def close(self):
+        self.db.close()
+        self.closed = 1
+
+
+def connect(path: str, timeout: float = 5.0) -> SQLiteConnection:
+    """Open a vault connection for ConnectionPool (its connect function)."""
+    return SQLiteConnection(open_database(path, timeout))
+
+
+class AsyncSQLiteConnection:
+    """The subset of asyncpg.Connection AsyncWishesDatabase uses."""
+
+    def __init__(self, db: sqlite3.Connection, executor: ThreadPoolExecutor):
+        self.db = db
+        self._executor = executor
+        self._depth = 0
+
+    async def _call(self, function, *args):
+        """Run blocking sqlite3 work on the connection's thread."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    def _run(self, query: str, args: tuple) -> sqlite3.Cursor:
+        values = []
+
+        def placeholder(match):
+            if match.group(1):
+                items = list(args[int(match.group(1)) - 1])
+                values.extend(items)
+                return 'IN (' + ', '.join('?' * len(items)) + ')'
+            values.append(args[int(match.group(2)) - 1])
+            return '?'
+
+        sql = _ASYNC_PLACEHOLDER.sub(placeholder, query)
+        try:
+            return self.db.execute(sql, values)
+        except sqlite3.IntegrityError as e:
+            raise SQLiteIntegrityError(str(e)) from e
+
+    def _fetch(self, query: str, args: tuple, rows: str):
+        cursor = self._run(query, args)
+        if rows == 'count':
+            return max(cursor.rowcount, 0)
+        return cursor.fetchall() if rows == 'all' else cursor.fetchone()
+
+    async def execute(self, query: str, *args) -> str:
+        count = await self._call(self._fetch, query, args, 'count')
+        return f"{query.split()[0].upper()} {count}"
+
+    async def fetch(self, query: str, *args) -> List[sqlite3.Row]:
+        return await self._call(self._fetch, query, args, 'all')
+
+    async def fetchrow(self, query: str, *args) -> Optional[sqlite3.Row]:
+        return await self._call(self._fetch, query, args, 'one')
+
+    async def fetchval(self, query: str, *args) -> Any:
+        row = await self._call(self._fetch, query, args, 'one')
+        return row[0] if row else None
+
+    def _insert_many(self, table: str, records, columns):
+        placeholders = ', '.join('?' * len(columns))
+        try:
+            self.db.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", records)
+        except sqlite3.IntegrityError as e:
+            raise SQLiteIntegrityError(str(e)) from e
+
+    async def copy_records_to_table(self, table: str, records, columns):
+        await self._call(self._insert_many, table, list(records), columns)
+
+    def _rollback_to(self, savepoint: str):
+        self.db.execute(f"ROLLBACK TO SAVEPOINT {savepoint};")
+        self.db.execute(f"RELEASE SAVEPOINT {savepoint};")
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Commit or roll back on exit; nested transactions are savepoints, as in asyncpg."""
+        savepoint = f"sp_{self._depth}" if self._depth else None
+        if savepoint:
+            await self._call(self.db.execute, f"SAVEPOINT {savepoint};")
+        self._depth += 1
+        try:
+            yield
+        except BaseException:
+            if savepoint:
+                await self._call(self._rollback_to, savepoint)
+            else:
+                await self._call(self.db.rollback)
+            raise
+        else:
+            if savepoint:
+                await self._call(self.db.execute, f"RELEASE SAVEPOINT {savepoint};")
+            else:
+                await self._call(self.db.commit)
+        finally:
+            self._depth -= 1
+
+
+class AsyncSQLitePool:
+    """A one-connection pool with the asyncpg.Pool API AsyncWishesDatabase uses."""
+
+    def __init__(self, path: str, timeout: float = 5.0):
+        """
+        Open the pool.
+
+        Args:
+            path: Database file (':memory:' for a private in-memory database)
+            timeout: Seconds to wait for another process's write lock
+        """
+        db = open_database(path, timeout)
+        db.row_factory = sqlite3.Row
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-vault")
+        self._conn = AsyncSQLiteConnection(db, self._executor)
+        self._loop = None
+        self._lock = None
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Hand out the connection to one caller at a time."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Locks belong to one event loop
+            self._loop, self._lock = loop, asyncio.Lock()
+        async with self._lock:
+            yield self._conn
+
+    async def close(self):
+        await self._conn._call(self._conn.db.close)
+        self._executor.shutdown(wait=False)
+
+    def get_size(self) -> int:
+        return 1
+
+    def get_idle_size(self) -> int:
+        return 0 if self._lock is not None and self._lock.locked() else 1
+
+    def get_min_size(self) -> int:
+        return 1
+
+    def get_max_size(self) -> int:
+        return 1
@@ -0,0 +1,135 @@
+"""
+Per-user read-through cache of decrypted wishes.
+
+The Streamlit vault reads the user's wishes on every script rerun, and every
+widget click is a rerun. WishesDatabase keeps what it read here for a short
+TTL and drops a user's entries whenever it writes one of their wishes.
+
+Entries live only in process memory (never pickled or written to disk) and
+are deep copies, so callers cannot change what other reruns see. Each
+process has its own cache; writes made by another process show up once the
+TTL runs out.
+"""
+
+import os
+import copy
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class WishCache:
+    """Thread-safe TTL cache of query results, grouped and invalidated per user."""
+
+    def __init__(self, ttl_seconds: float = 30, max_users: int = 1024):
+        """
+        Initialize the cache.
+
+        Args:
+            ttl_seconds: Lifetime of a cached result
+            max_users: Users kept before the least recently used one is evicted
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_users = max_users
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every invalidation so reads that raced a write are not stored
+        self._version = 0
+        self.stats = {'hits': 0, 'misses': 0, 'expirations': 0, 'invalidations': 0, 'evictions': 0}
+
+    def token(self) -> int:
+        """Take before reading from the database and pass to put()."""
+        with self._lock:
+            return self._version
+
+    def get(self, user_id: Hashable, key: Hashable) -> Optional[Any]:
+        """
+        Get a cached result.
+
+        Args:
+            user_id: Owner of the wishes
+            key: Query identifier, e.g. ('wishes', limit)
+
+        Returns:
+            A private copy of the result, or None on a miss
+        """
+        now = time.monotonic()
+        with self._lock:
+            entries = self._users.get(user_id)
+            entry = entries.get(key) if entries else None
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            expires_at, value = entry
+            if now >= expires_at:
+                del entries[key]
+                self.stats['expirations'] += 1
+                self.stats['misses'] += 1
+                return None
+            self._users.move_to_end(user_id)
+            self.stats['hits'] += 1
+        return copy.deepcopy(value)
+
+    def put(self, user_id: Hashable, key: Hashable, value: Any, token: int):
+        """
+        Store a result read from the database.
+
+        Args:
+            user_id: Owner of the wishes
+            key: Query identifier
+            value: Result to cache (copied)
+            token: token() taken before the read; stale reads are dropped
+        """
+        value = copy.deepcopy(value)
+        with self._lock:
+            if token != self._version:
+                return
+            self._users.setdefault(user_id, {})[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def invalidate(self, user_id: Hashable):
+        """Drop every cached result of a user (call after writing their wishes)."""
+        with self._lock:
+            self._version += 1
+            if self._users.pop(user_id, None) is not None:
+                self.stats['invalidations'] += 1
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._version += 1
+            self._users.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with counters, cached users and hit rate
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats['users'] = len(self._users)
+            stats['ttl_seconds'] = self.ttl_seconds
+
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+
+def cache_from_env() -> Optional[WishCache]:
+    """
+    Create the cache from WISHES_CACHE_TTL (seconds, default 30; 0 disables)
+    and WISHES_CACHE_MAX_USERS.
+
+    Returns:
+        WishCache, or None when caching is disabled
+    """
+    ttl_seconds = float(os.getenv('WISHES_CACHE_TTL', '30'))
+    if ttl_seconds <= 0:
+        return None
+    return WishCache(ttl_seconds, int(os.getenv('WISHES_CACHE_MAX_USERS', '1024')))
@@ -0,0 +1,294 @@
+"""
+Bulk Import/Export for the SHAKTI-AI Wishes Vault
+Streams wishes and sharing history in and out of PostgreSQL with COPY, one
+row at a time, so tables of any size move without being loaded into memory.
+
+Formats:
+    encrypted  Rows exactly as stored; content stays encrypted with the vault key.
+               For backups and migrations between databases sharing db_wishes.key.
+    archive    Content re-encrypted with a separate archive key (WISHES_ARCHIVE_KEY
+               or --archive-key). For user data exports and vault key rotation.
+
+Files are PostgreSQL COPY text rows after a one-line header; names ending in
+.gz are compressed.
+
+Usage:
+    python database/wishes_bulk.py export wishes backup/wishes.copy.gz
+    python database/wishes_bulk.py export sharing_history backup/history.copy.gz
+    python database/wishes_bulk.py export wishes alice.copy --user-id alice --format archive
+    python database/wishes_bulk.py import backup/wishes.copy.gz
+    python database/wishes_bulk.py generate-key
+"""
+
+import os
+import sys
+import gzip
+import json
+import argparse
+from pathlib import Path
+
+import psycopg2
+from cryptography.fernet import Fernet, InvalidToken
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from database.settings import DB_CONFIG
+from database.encryption import WishCipher
+
+TABLE_COLUMNS = {
+    'wishes': ['id', 'user_id', 'encrypted_content', 'contact_name', 'contact_email', 'contact_phone',
+               'contact_relationship', 'sharing_preferences', 'created_at', 'updated_at', 'is_active'],
+    'sharing_history': ['id', 'wish_id', 'shared_with', 'sharing_method', 'shared_at', 'status', 'notes',
+                        'user_id'],
+}
+ENCRYPTED_COLUMNS = {'wishes': 'encrypted_content'}
+FORMATS = ('encrypted', 'archive')
+HEADER_PREFIX = b'#shakti-bulk '
+
+
+def open_bulk_file(path, mode):
+    """
+    Open a bulk file for binary reading ('r'), writing ('w') or creating ('x', fails if it exists).
+
+    Files whose name ends in .gz are gzip-compressed.
+    """
+    if str(path).endswith('.gz'):
+        return gzip.open(path, mode + 'b')
+    return open(path, mode + 'b')
+
+
+def _decode_bytea(field):
+    """Bytes of a bytea field in COPY text format (hex output with its backslash escaped)."""
+    return bytes.fromhex(field[3:].decode())
+
+
+def _encode_bytea(data):
+    """Encode bytes as a bytea field in COPY text format."""
+    return b'\\\\x' + data.hex().encode()
+
+
+def reencrypt_rows(lines, column_index, source, target):
+    """
+    Re-encrypt one column of COPY text rows.
+
+    Args:
+        lines: Iterable of COPY text rows (bytes, newline-terminated)
+        column_index: Position of the encrypted bytea column
+        source: Fernet that decrypts the current content
+        target: Fernet that encrypts the new content
+
+    Yields:
+        Rewritten rows
+
+    Raises:
+        ValueError: If a row's content cannot be decrypted with the source key
+    """
+    for line_number, line in enumerate(lines, start=1):
+        fields = line.rstrip(b'\n').split(b'\t')
+        try:
+            content = source.decrypt(_decode_bytea(fields[column_index]))
+        except (InvalidToken, ValueError, IndexError) as e:
+            raise ValueError(f"Row {line_number} could not be decrypted; wrong key?") from e
+        fields[column_index] = _encode_bytea(target.encrypt(content))
+        yield b'\t'.join(fields) + b'\n'
+
+
+class _RowSink:
+    """Write target for COPY TO that passes complete rows through a transform."""
+
+    def __init__(self, out, transform):
+        self.out = out
+        self.transform = transform
+        self.buffer = b''
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        self.buffer += data
+        if b'\n' in self.buffer:
+            complete, self.buffer = self.buffer.rsplit(b'\n', 1)
+            for row in self.transform(line + b'\n' for line in complete.split(b'\n')):
+                self.out.write(row)
+        return len(data)
+
+
+class _RowSource:
+    """Read source for COPY FROM backed by an iterator of rows."""
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.buffer = b''
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            try:
+                self.buffer += next(self.rows)
+            except StopIteration:
+                break
+        if size < 0:
+            data, self.buffer = self.buffer, b''
+        else:
+            data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def readline(self, size=-1):
+        return self.read(size)
+
+
+def export_table(conn, table, out, fmt='encrypted', user_id=None, archive_key=None):
+    """
+    Stream a table to a bulk file with COPY TO.
+
+    Args:
+        conn: psycopg2 connection
+        table: 'wishes' or 'sharing_history'
+        out: Binary file object to write to
+        fmt: 'encrypted' or 'archive'
+        user_id: Export only this user's rows
+        archive_key: Fernet key for the archive format
+
+    Returns:
+        Number of rows exported
+    """
+    if table not in TABLE_COLUMNS:
+        raise ValueError(f"Unknown table: {table}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt}")
+
+    columns = TABLE_COLUMNS[table]
+    cursor = conn.cursor()
+
+    query = f"SELECT {', '.join(columns)} FROM {table}"
+    if user_id is not None:
+        query += cursor.mogrify(" WHERE user_id = %s", (user_id,)).decode()
+    query += " ORDER BY id"
+
+    write_header(out, table, fmt)
+
+    sink = out
+    if fmt == 'archive' and table in ENCRYPTED_COLUMNS:
+        if not archive_key:
+            raise ValueError("The archive format needs an archive key")
+        column_index = columns.index(ENCRYPTED_COLUMNS[table])
+        vault, archive = WishCipher().fernet, Fernet(archive_key)
+        sink = _RowSink(out, lambda lines: reencrypt_rows(lines, column_index, vault, archive))
+
+    cursor.copy_expert(f"COPY ({query}) TO STDOUT", sink)
+    rows = cursor.rowcount
+    cursor.close()
+    return rows
+
+
+def write_header(out, table, fmt='encrypted'):
+    """Write a bulk file header for all of a table's columns."""
+    header = {'table': table, 'format': fmt, 'columns': TABLE_COLUMNS[table]}
+    out.write(HEADER_PREFIX + json.dumps(header).encode() + b'\n')
+
+
+def read_header(source):
+    """Read and validate a bulk file header."""
+    line = source.readline()
+    if not line.startswith(HEADER_PREFIX):
+        raise ValueError("Not a wishes bulk file (missing header)")
+    header = json.loads(line[len(HEADER_PREFIX):])
+    if header.get('table') not in TABLE_COLUMNS or header.get('format') not in FORMATS:
+        raise ValueError(f"Unsupported bulk file: {header}")
+    unknown = set(header['columns']) - set(TABLE_COLUMNS[header['table']])
+    if unknown:
+        raise ValueError(f"Unknown columns in bulk file: {sorted(unknown)}")
+    return header
+
+
+def import_table(conn, source, archive_key=None):
+    """
+    Stream a bulk file into its table with COPY FROM, in one transaction.
+
+    Rows keep their ids (sharing history refers to wish ids), so importing
+    into a table that already holds those ids fails and nothing is written.
+
+    Args:
+        conn: psycopg2 connection
+        source: Binary file object positioned at the header
+        archive_key: Fernet key the archive was written with
+
+    Returns:
+        Tuple of (table, rows imported)
+    """
+    header = read_header(source)
+    table, columns = header['table'], header['columns']
+
+    data = source
+    if header['format'] == 'archive' and table in ENCRYPTED_COLUMNS:
+        if not archive_key:
+            raise ValueError("Importing an archive needs its archive key")
+        column_index = columns.index(ENCRYPTED_COLUMNS[table])
+        data = _RowSource(reencrypt_rows(iter(source.readline, b''), column_index,
+                                         Fernet(archive_key), WishCipher().fernet))
+
+    cursor = conn.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", data)
+        rows = cursor.rowcount
+        # Continue the id sequence after the imported rows
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {table};"
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return table, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import/export for the SHAKTI-AI Wishes Vault")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = commands.add_parser('export', help="Export a table to a file")
+    export_parser.add_argument('table', choices=sorted(TABLE_COLUMNS))
+    export_parser.add_argument('path', help="Output file (.gz to compress)")
+    export_parser.add_argument('--format', choices=FORMATS, default='encrypted')
+    export_parser.add_argument('--user-id', help="Export only this user's rows")
+    export_parser.add_argument('--archive-key', default=os.getenv('WISHES_ARCHIVE_KEY'))
+
+    import_parser = commands.add_parser('import', help="Import a file into its table")
+    import_parser.add_argument('path')
+    import_parser.add_argument('--archive-key', default=os.getenv('WISHES_ARCHIVE_KEY'))
+
+    commands.add_parser('generate-key', help="Print a new archive key")
+
+    args = parser.parse_args()
+
+    if args.command == 'generate-key':
+        print(Fernet.generate_key().decode())
+        return 0
+
+    try:
+        conn = psycopg2.connect(**DB_CONFIG)
+    except psycopg2.OperationalError as e:
+        print(f"❌ Connection failed: {e}")
+        return 1
+
+    try:
+        if args.command == 'export':
+            with open_bulk_file(args.path, 'w') as out:
+                rows = export_table(conn, args.table, out, args.format, args.user_id, args.archive_key)
+            print(f"✅ Exported {rows} {args.table} rows to {args.path} ({args.format})")
+        else:
+            with open_bulk_file(args.path, 'r') as source:
+                table, rows = import_table(conn, source, args.archive_key)
+            print(f"✅ Imported {rows} {table} rows from {args.path}")
+        return 0
+    except Exception as e:
+        print(f"❌ {args.command.capitalize()} failed: {e}")
+        return 1
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
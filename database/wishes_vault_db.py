@@ -16,6 +16,7 @@ import re
 from datetime import datetime, timedelta
 import random
 from .db_config import wishes_db
+from .errors import VaultError, VaultUnavailableError
 
 def validate_email(email):
     """Validate email format."""
@@ -89,6 +90,23 @@ Sent securely via SHAKTI-AI Wishes Vault 💜"""
         st.error(f"WhatsApp sharing error: {e}")
         return False
 
+def run_vault_operation(action, default, operation, *args, **kwargs):
+    """
+    Run a wishes database operation, showing a failure on the page instead of raising.
+    
+    Args:
+        action: What the user was doing, e.g. "load your wishes"
+        default: Value returned when the operation fails
+        operation: WishesDatabase method to call with the remaining arguments
+    """
+    try:
+        return operation(*args, **kwargs)
+    except VaultUnavailableError:
+        st.error(f"⚠️ Could not {action}: the wishes database is not reachable. Please check your database configuration.")
+    except VaultError as e:
+        st.error(f"❌ Could not {action}: {e}")
+    return default
+
 def get_user_id():
     """Get or create a user ID for the current session."""
     if 'user_id' not in st.session_state:
@@ -99,8 +117,7 @@ def show_secure_wishes_vault(neutral_mode=False):
     """Enhanced wishes vault with PostgreSQL database backend."""
     
     # Initialize database
-    if not wishes_db.init_database():
-        st.error("⚠️ Database connection failed. Please check your PostgreSQL configuration.")
+    if not run_vault_operation("open the wishes vault", False, wishes_db.init_database):
         return
     
     user_id = get_user_id()
@@ -122,7 +139,7 @@ def show_secure_wishes_vault(neutral_mode=False):
         st.caption("Write your wishes, save, and they will stay hidden until released.")
 
         # Get user's wishes from database
-        user_wishes = wishes_db.get_wishes(user_id, limit=1)
+        user_wishes = run_vault_operation("load your wishes", [], wishes_db.get_wishes, user_id, limit=1)
         current_wish = user_wishes[0] if user_wishes else None
         
         # Initialize session state
@@ -302,11 +319,13 @@ def show_secure_wishes_vault(neutral_mode=False):
                                 with st.spinner("📧 Preparing email..."):
                                     if send_email_share(current_wish['content'], current_wish['contact_email'], sender_name):
                                         # Log sharing activity
-                                        wishes_db.log_sharing(
+                                        run_vault_operation(
+                                            "record this share", False, wishes_db.log_sharing,
                                             wish_id=current_wish['id'],
                                             shared_with=current_wish['contact_email'],
                                             sharing_method='email',
-                                            status='initiated'
+                                            status='initiated',
+                                            user_id=user_id
                                         )
                                         st.success(f"✅ Email client opened for {current_wish['contact_email']}!")
                                         st.balloons()
@@ -321,11 +340,13 @@ def show_secure_wishes_vault(neutral_mode=False):
                                 with st.spinner("📱 Opening WhatsApp..."):
                                     if send_whatsapp_share(current_wish['content'], current_wish['contact_phone'], sender_name):
                                         # Log sharing activity
-                                        wishes_db.log_sharing(
+                                        run_vault_operation(
+                                            "record this share", False, wishes_db.log_sharing,
                                             wish_id=current_wish['id'],
                                             shared_with=current_wish['contact_phone'],
                                             sharing_method='whatsapp',
-                                            status='initiated'
+                                            status='initiated',
+                                            user_id=user_id
                                         )
                                         st.success("✅ WhatsApp opened with your message!")
                                         st.info("💡 Complete the sending in the WhatsApp window that opened.")
@@ -344,7 +365,9 @@ def show_secure_wishes_vault(neutral_mode=False):
             
             with col2:
                 if current_wish and st.button("📊 View History", use_container_width=True):
-                    sharing_history = wishes_db.get_sharing_history(user_id)
+                    sharing_history = run_vault_operation(
+                        "load your sharing history", [], wishes_db.get_sharing_history, user_id
+                    )
                     if sharing_history:
                         st.markdown("**Sharing History:**")
                         for record in sharing_history[:5]:  # Show last 5 entries
@@ -354,7 +377,7 @@ def show_secure_wishes_vault(neutral_mode=False):
             
             with col3:
                 if current_wish and st.button("🗑️ Delete Wishes", use_container_width=True, type="secondary"):
-                    if wishes_db.delete_wish(current_wish['id'], user_id):
+                    if run_vault_operation("delete your wishes", False, wishes_db.delete_wish, current_wish['id'], user_id):
                         # Clear session state
                         for key in ['wishes_input', 'contact_name', 'contact_email', 'contact_phone', 'contact_relationship']:
                             if key in st.session_state:
@@ -372,7 +395,7 @@ def get_wishes_summary(user_id=None):
     if not user_id:
         user_id = get_user_id()
     
-    wishes = wishes_db.get_wishes(user_id, limit=5)
+    wishes = run_vault_operation("load your wishes", [], wishes_db.get_wishes, user_id, limit=5)
     return {
         'total_wishes': len(wishes),
         'latest_wish': wishes[0] if wishes else None,
@@ -0,0 +1,182 @@
+"""
+Context packing module for fitting retrieved chunks into a token budget.
+"""
+
+import os
+import re
+import math
+from typing import List, Dict, Callable, Optional
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+
+class TokenCounter:
+    """Counts Gemini tokens with a local Gemini SentencePiece tokenizer model, otherwise estimates them."""
+
+    def __init__(self, model_name: str = "gemini-2.0-flash", tokenizer_path: Optional[str] = None):
+        """
+        Initialize the token counter.
+
+        Gemini models share the Gemma SentencePiece tokenizer, so tokens are
+        counted locally when ``tokenizer_path`` (GEMINI_TOKENIZER_MODEL env
+        var) points to a copy of its model file. Without one, tokens are
+        estimated at four characters per token; nothing is downloaded.
+
+        Args:
+            model_name: Gemini model whose tokens are counted
+            tokenizer_path: Local SentencePiece tokenizer model file
+        """
+        self.model_name = model_name
+        self.method = 'estimate'
+        self.fallback_reason = None
+        self._sentencepiece = None
+
+        if tokenizer_path is None:
+            tokenizer_path = os.getenv('GEMINI_TOKENIZER_MODEL')
+        if not tokenizer_path:
+            self.fallback_reason = "GEMINI_TOKENIZER_MODEL is not set"
+            return
+
+        try:
+            import sentencepiece
+            self._sentencepiece = sentencepiece.SentencePieceProcessor(model_file=tokenizer_path)
+            self.method = 'gemini'
+        except Exception as e:
+            self.fallback_reason = f"cannot load {tokenizer_path}: {e}"
+            print(f"⚠️ Gemini tokenizer not available ({self.fallback_reason}); "
+                  f"estimating context tokens at 4 characters per token")
+
+    def count(self, text: str) -> int:
+        """
+        Count the tokens in a text.
+
+        Args:
+            text: Text to count
+
+        Returns:
+            Number of tokens
+        """
+        if not text:
+            return 0
+        if self._sentencepiece is not None:
+            return len(self._sentencepiece.encode(text))
+        return math.ceil(len(text) / 4)
+
+
+_token_counters = {}
+
+
+def get_token_counter(model_name: str = "gemini-2.0-flash") -> TokenCounter:
+    """Get a shared token counter for a model, creating it on first use."""
+    if model_name not in _token_counters:
+        _token_counters[model_name] = TokenCounter(model_name)
+    return _token_counters[model_name]
+
+
+def _source_header(position: int, chunk: Dict) -> str:
+    return f"[Source: {chunk.get('doc_title', 'Unknown')}]\n"
+
+
+class ContextPacker:
+    """Greedily fills a token budget with retrieved chunks, best first."""
+
+    def __init__(self, token_counter: Optional[TokenCounter] = None,
+                 separator: str = "\n\n---\n\n", min_chunk_tokens: int = 40):
+        """
+        Initialize the context packer.
+
+        Args:
+            token_counter: Counter used to measure tokens
+            separator: Text placed between packed chunks
+            min_chunk_tokens: Smallest trimmed chunk worth including
+        """
+        self.token_counter = token_counter or get_token_counter()
+        self.separator = separator
+        self.min_chunk_tokens = min_chunk_tokens
+
+    def trim_to_tokens(self, text: str, max_tokens: int) -> str:
+        """
+        Trim text to whole sentences that fit in a token budget.
+
+        Args:
+            text: Text to trim
+            max_tokens: Maximum number of tokens
+
+        Returns:
+            Longest sentence-aligned prefix that fits, or an empty string
+        """
+        sentences = SENTENCE_BOUNDARY.split(text.strip())
+
+        # Count each sentence once and take the longest prefix whose sum fits,
+        # rather than re-counting the growing prefix for every sentence
+        end = 0
+        total = 0
+        for sentence in sentences:
+            total += self.token_counter.count(sentence)
+            if total > max_tokens:
+                break
+            end += 1
+
+        # Tokens can merge across the joining spaces; check the prefix itself
+        kept = " ".join(sentences[:end])
+        while end and self.token_counter.count(kept) > max_tokens:
+            end -= 1
+            kept = " ".join(sentences[:end])
+        return kept
+
+    def pack(self, chunks: List[Dict], max_tokens: int,
+             format_header: Callable[[int, Dict], str] = _source_header) -> Dict[str, any]:
+        """
+        Pack chunks into a context string within a token budget.
+
+        Chunks are taken in the given (relevance) order. A chunk that does
+        not fit whole is trimmed at a sentence boundary; if even that leaves
+        too little, it is skipped and later, shorter chunks are still tried.
+
+        Args:
+            chunks: Retrieved chunk dictionaries, best first
+            max_tokens: Token budget for the whole context
+            format_header: Builds the header line for the chunk at a 1-based position
+
+        Returns:
+            Dictionary with the context, packed chunks and token usage
+        """
+        parts = []
+        packed_chunks = []
+        tokens_used = 0  # running estimate; the final context is counted once at the end
+        trimmed = 0
+        separator_tokens = self.token_counter.count(self.separator)
+
+        for chunk in chunks:
+            text = chunk.get('text', '')
+            header = format_header(len(parts) + 1, chunk)
+            overhead = self.token_counter.count(header) + (separator_tokens if parts else 0)
+            remaining = max_tokens - tokens_used - overhead
+
+            if remaining < self.min_chunk_tokens:
+                continue
+
+            text_tokens = self.token_counter.count(text)
+            if text_tokens > remaining:
+                text = self.trim_to_tokens(text, remaining)
+                text_tokens = self.token_counter.count(text)
+                if text_tokens < self.min_chunk_tokens:
+                    continue
+                chunk = dict(chunk, text=text, trimmed=True)
+                trimmed += 1
+
+            parts.append(header + text)
+            packed_chunks.append(chunk)
+            tokens_used += overhead + text_tokens
+
+        context = self.separator.join(parts)
+
+        return {
+            'context': context,
+            'chunks': packed_chunks,
+            'tokens_used': self.token_counter.count(context),
+            'token_budget': max_tokens,
+            'trimmed_chunks': trimmed,
+            'dropped_chunks': len(chunks) - len(packed_chunks),
+            'token_count_method': self.token_counter.method
+        }
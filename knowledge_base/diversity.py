@@ -0,0 +1,151 @@
+"""
+Diversity-aware selection of retrieved chunks.
+
+Chunks are created with overlapping windows, so neighbouring chunks of the
+same document are often retrieved together and repeat each other in the
+prompt. This module picks a diverse subset with maximal marginal relevance
+(MMR) and stitches adjacent chunks of the same document into one span.
+"""
+
+import numpy as np
+from typing import List, Dict, Optional
+
+
+def mmr_select(embeddings: np.ndarray, relevance: np.ndarray, k: int, lambda_mult: float = 0.7) -> List[int]:
+    """
+    Select ``k`` items by maximal marginal relevance.
+
+    Args:
+        embeddings: Normalized candidate embeddings of shape (n, dimension)
+        relevance: Relevance score per candidate, roughly in [0, 1]
+        k: Number of items to select
+        lambda_mult: Trade-off between relevance (1.0) and diversity (0.0)
+
+    Returns:
+        Positions of the selected candidates, in selection order
+    """
+    n = len(relevance)
+    if n == 0 or k <= 0:
+        return []
+
+    similarity = embeddings @ embeddings.T
+    selected = [int(np.argmax(relevance))]
+    max_redundancy = similarity[selected[0]].copy()
+
+    while len(selected) < min(k, n):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_redundancy
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        max_redundancy = np.maximum(max_redundancy, similarity[best])
+
+    return selected
+
+
+def _stitch(first: str, second: str, max_overlap: int = 300, min_overlap: int = 20) -> str:
+    """Join two texts, dropping the prefix of ``second`` that repeats the end of ``first``."""
+    for size in range(min(len(first), len(second), max_overlap), min_overlap - 1, -1):
+        if first.endswith(second[:size]):
+            return first + second[size:]
+    return first + " " + second
+
+
+def merge_adjacent_chunks(results: List[Dict]) -> List[Dict]:
+    """
+    Merge retrieved chunks that are consecutive in the same document.
+
+    A merged span takes the position of its best-ranked member, keeps the
+    highest scores of its members and unions their page information.
+
+    Args:
+        results: Retrieved chunks, best first
+
+    Returns:
+        List of chunks and merged spans, best first
+    """
+    groups = {}
+    for position, result in enumerate(results):
+        doc_key = result.get('doc_filename') or result.get('doc_title')
+        if doc_key is None or result.get('chunk_index') is None:
+            groups[('', position)] = [(position, result)]
+        else:
+            groups.setdefault(doc_key, []).append((position, result))
+
+    spans = []
+    for members in groups.values():
+        members.sort(key=lambda member: member[1].get('chunk_index', 0))
+        run = [members[0]]
+        for member in members[1:]:
+            if member[1]['chunk_index'] == run[-1][1]['chunk_index'] + 1:
+                run.append(member)
+            else:
+                spans.append(run)
+                run = [member]
+        spans.append(run)
+
+    merged = []
+    for run in sorted(spans, key=lambda span: min(position for position, _ in span)):
+        if len(run) == 1:
+            merged.append(run[0][1])
+            continue
+
+        chunks = [result for _, result in run]
+        span = dict(min(run, key=lambda member: member[0])[1])
+
+        text = chunks[0]['text']
+        for chunk in chunks[1:]:
+            text = _stitch(text, chunk['text'])
+
+        pages = {}
+        for chunk in chunks:
+            for page in chunk.get('pages', []):
+                pages.setdefault(page['page_number'], page)
+
+        for score_key in ('similarity', 'rrf_score', 'bm25_score', 'rerank_score'):
+            scores = [chunk[score_key] for chunk in chunks if score_key in chunk]
+            if scores:
+                span[score_key] = max(scores)
+
+        span.update({
+            'text': text,
+            'pages': [pages[number] for number in sorted(pages)],
+            'primary_page': chunks[0].get('primary_page'),
+            'char_count': len(text),
+            'word_count': len(text.split()),
+            'start_pos': chunks[0].get('start_pos'),
+            'end_pos': chunks[-1].get('end_pos'),
+            'chunk_index': chunks[0]['chunk_index'],
+            'merged_chunk_ids': [chunk.get('id') for chunk in chunks]
+        })
+        merged.append(span)
+
+    for rank, result in enumerate(merged):
+        result['rank'] = rank + 1
+
+    return merged
+
+
+def relevance_scores(results: List[Dict]) -> np.ndarray:
+    """
+    Min-max normalize the strongest available ranking score of each result.
+
+    Uses the cross-encoder score when present, then the fused score, then
+    the cosine similarity, so MMR respects the upstream ranking.
+
+    Args:
+        results: Retrieved chunks
+
+    Returns:
+        Numpy array of relevance scores in [0, 1]
+    """
+    for score_key in ('rerank_score', 'rrf_score', 'similarity'):
+        if results and all(score_key in result for result in results):
+            scores = np.array([result[score_key] for result in results], dtype='float32')
+            break
+    else:
+        scores = np.linspace(1.0, 0.0, num=len(results), dtype='float32')
+
+    spread = scores.max() - scores.min() if len(scores) else 0.0
+    if spread <= 0:
+        return np.ones(len(scores), dtype='float32')
+    return (scores - scores.min()) / spread
@@ -320,6 +320,11 @@ class DocumentProcessor:
             chunks.append(chunk)
             chunk_id += 1
             
+            # The last chunk reached the end of the document; stepping back
+            # by the overlap would only produce shrinking copies of its tail
+            if end >= len(full_text):
+                break
+            
             # Move start position with overlap
             start = max(end - self.chunk_overlap, start + 1)
         
@@ -0,0 +1,204 @@
+"""
+Text encoder backends for embedding chunks and queries.
+
+The default backend is the PyTorch sentence-transformers model. The ONNX
+backend runs an ONNX Runtime export of the same model (optionally int8
+quantized) on CPU without loading torch, and produces vectors compatible
+with indexes built by the default backend. Export the model with
+``scripts/export_onnx_encoder.py``.
+"""
+
+import os
+import threading
+import numpy as np
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+DEFAULT_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_ONNX_DIR = Path(__file__).parent / "models" / "all-MiniLM-L6-v2-onnx"
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_QUANTIZED_MODEL_FILE = "model_int8.onnx"
+
+
+def mean_pool(token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """
+    Average token embeddings over the non-padding tokens.
+
+    Args:
+        token_embeddings: Array of shape (batch, tokens, dimension)
+        attention_mask: Array of shape (batch, tokens) with 1 for real tokens
+
+    Returns:
+        Array of shape (batch, dimension)
+    """
+    mask = attention_mask[:, :, None].astype(np.float32)
+    summed = (token_embeddings * mask).sum(axis=1)
+    counts = np.clip(mask.sum(axis=1), 1e-9, None)
+    return summed / counts
+
+
+def l2_normalize(embeddings: np.ndarray) -> np.ndarray:
+    """Scale each row to unit length."""
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.clip(norms, 1e-12, None)
+
+
+class SentenceTransformerEncoder:
+    """Encoder backed by the PyTorch sentence-transformers model."""
+
+    backend = "sentence-transformers"
+
+    def __init__(self, model_name: str = DEFAULT_MODEL_NAME):
+        """
+        Load the sentence transformer model.
+
+        Args:
+            model_name: Name of the sentence transformer model to use
+        """
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dimension = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str], batch_size: int = 32, show_progress_bar: bool = False) -> np.ndarray:
+        """
+        Embed a list of texts.
+
+        Args:
+            texts: Texts to embed
+            batch_size: Number of texts per forward pass
+            show_progress_bar: Whether to show a progress bar
+
+        Returns:
+            Float32 array of shape (len(texts), dimension)
+        """
+        embeddings = self.model.encode(texts, batch_size=batch_size, show_progress_bar=show_progress_bar)
+        return np.asarray(embeddings, dtype='float32')
+
+
+class OnnxEncoder:
+    """Encoder backed by an ONNX Runtime export of a sentence transformer."""
+
+    backend = "onnx"
+
+    def __init__(self, model_dir: str = str(DEFAULT_ONNX_DIR), model_name: str = DEFAULT_MODEL_NAME,
+                 quantized: bool = False, max_length: int = 256, num_threads: Optional[int] = None):
+        """
+        Load the exported model and its tokenizer.
+
+        Args:
+            model_dir: Directory with model.onnx (or model_int8.onnx) and tokenizer.json
+            model_name: Name of the model the export was made from
+            quantized: Use the dynamically int8-quantized export
+            max_length: Maximum tokens per text, matching the model's max_seq_length
+            num_threads: ONNX Runtime intra-op threads (default: runtime's choice)
+        """
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        model_dir = Path(model_dir)
+        model_file = model_dir / (ONNX_QUANTIZED_MODEL_FILE if quantized else ONNX_MODEL_FILE)
+        if not model_file.exists():
+            raise FileNotFoundError(
+                f"{model_file} not found; run scripts/export_onnx_encoder.py to export the model"
+            )
+
+        self.model_name = model_name
+        self.quantized = quantized
+
+        options = onnxruntime.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(
+            str(model_file), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+
+        self.dimension = self.session.get_outputs()[0].shape[-1]
+        if not isinstance(self.dimension, int):
+            self.dimension = self.encode(["dimension probe"]).shape[1]
+
+    def encode(self, texts: List[str], batch_size: int = 32, show_progress_bar: bool = False) -> np.ndarray:
+        """
+        Embed a list of texts with mean pooling and L2 normalization.
+
+        Args:
+            texts: Texts to embed
+            batch_size: Number of texts per forward pass
+            show_progress_bar: Accepted for interface compatibility; ignored
+
+        Returns:
+            Float32 array of shape (len(texts), dimension)
+        """
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start:start + batch_size])
+            input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+            attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+
+            inputs = {'input_ids': input_ids, 'attention_mask': attention_mask}
+            if 'token_type_ids' in self.input_names:
+                inputs['token_type_ids'] = np.array([encoding.type_ids for encoding in encodings], dtype=np.int64)
+
+            token_embeddings = self.session.run(None, inputs)[0]
+            batches.append(l2_normalize(mean_pool(token_embeddings, attention_mask)))
+
+        if not batches:
+            return np.empty((0, self.dimension), dtype='float32')
+        return np.vstack(batches).astype('float32')
+
+
+_encoders = {}
+_encoders_lock = threading.Lock()
+
+
+def get_encoder(model_name: str = DEFAULT_MODEL_NAME, backend: Optional[str] = None):
+    """
+    Get the shared encoder for a model, loading it on first use.
+
+    EMBEDDING_BACKEND selects 'sentence-transformers' (default) or 'onnx'.
+    The ONNX backend reads ONNX_MODEL_DIR and EMBEDDING_QUANTIZED.
+
+    Args:
+        model_name: Name of the sentence transformer model
+        backend: Backend name, overriding EMBEDDING_BACKEND
+
+    Returns:
+        Encoder with ``encode(texts)`` and ``dimension``
+    """
+    backend = (backend or os.getenv('EMBEDDING_BACKEND', 'sentence-transformers')).lower()
+    key = (backend, model_name)
+
+    with _encoders_lock:
+        if key not in _encoders:
+            if backend == 'onnx':
+                _encoders[key] = OnnxEncoder(
+                    model_dir=os.getenv('ONNX_MODEL_DIR', str(DEFAULT_ONNX_DIR)),
+                    model_name=model_name,
+                    quantized=os.getenv('EMBEDDING_QUANTIZED', 'false').lower() in ('1', 'true', 'yes')
+                )
+            elif backend == 'sentence-transformers':
+                _encoders[key] = SentenceTransformerEncoder(model_name)
+            else:
+                raise ValueError(f"Unknown embedding backend: {backend}")
+            print(f"Loaded {backend} encoder for {model_name}")
+        return _encoders[key]
+
+
+def get_loaded_encoders() -> List[Dict[str, Any]]:
+    """
+    Describe the encoders loaded so far.
+
+    Returns:
+        List of dictionaries with backend, model name and dimension
+    """
+    with _encoders_lock:
+        return [
+            {'backend': backend, 'model_name': model_name, 'dimension': encoder.dimension}
+            for (backend, model_name), encoder in _encoders.items()
+        ]
@@ -0,0 +1,251 @@
+"""
+Lexical (BM25) index module for exact-term retrieval.
+
+Dense embeddings are weak at matching exact identifiers such as statutory
+references ("Section 498A"), abbreviations ("PCOS") or drug names. This module
+builds a compact BM25 inverted index over the same chunks as the FAISS index
+and stores it next to it as flat numpy arrays, so it can be memory-mapped at
+load time instead of being deserialized.
+"""
+
+import re
+import json
+import numpy as np
+from pathlib import Path
+from typing import List, Dict, Tuple, Optional
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase alphanumeric terms.
+
+    Single letters are dropped, but digits are kept so that references such
+    as "498a" or "376" stay searchable.
+    """
+    return [
+        token for token in TOKEN_PATTERN.findall(text.lower())
+        if len(token) > 1 or token.isdigit()
+    ]
+
+
+class LexicalIndex:
+    """Okapi BM25 inverted index stored as memory-mappable numpy arrays."""
+
+    VOCAB_FILE = "vocab.json"
+    OFFSETS_FILE = "offsets.npy"
+    DOC_IDS_FILE = "doc_ids.npy"
+    TERM_FREQS_FILE = "term_freqs.npy"
+    DOC_LENGTHS_FILE = "doc_lengths.npy"
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        Initialize an empty lexical index.
+
+        Args:
+            k1: BM25 term frequency saturation parameter
+            b: BM25 document length normalization parameter
+        """
+        self.k1 = k1
+        self.b = b
+        self.vocab = {}
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.doc_ids = np.zeros(0, dtype=np.int32)
+        self.term_freqs = np.zeros(0, dtype=np.uint16)
+        self.doc_lengths = np.zeros(0, dtype=np.float32)
+        self.avg_doc_length = 0.0
+
+    @property
+    def num_docs(self) -> int:
+        return len(self.doc_lengths)
+
+    def build(self, texts: List[str]) -> bool:
+        """
+        Build the inverted index from chunk texts.
+
+        Document ids are positions in ``texts`` and therefore line up with
+        the row ids of the FAISS index built from the same chunks.
+
+        Args:
+            texts: List of chunk texts, in index order
+
+        Returns:
+            True if successful, False otherwise
+        """
+        if not texts:
+            return False
+
+        postings = {}
+        doc_lengths = np.zeros(len(texts), dtype=np.float32)
+
+        for doc_id, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lengths[doc_id] = len(tokens)
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                postings.setdefault(token, []).append((doc_id, count))
+
+        terms = sorted(postings)
+        self.vocab = {term: term_id for term_id, term in enumerate(terms)}
+
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        for term_id, term in enumerate(terms):
+            offsets[term_id + 1] = offsets[term_id] + len(postings[term])
+
+        doc_ids = np.empty(offsets[-1], dtype=np.int32)
+        term_freqs = np.empty(offsets[-1], dtype=np.uint16)
+        for term_id, term in enumerate(terms):
+            start, end = offsets[term_id], offsets[term_id + 1]
+            entries = postings[term]
+            doc_ids[start:end] = [doc_id for doc_id, _ in entries]
+            term_freqs[start:end] = [min(count, np.iinfo(np.uint16).max) for _, count in entries]
+
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.term_freqs = term_freqs
+        self.doc_lengths = doc_lengths
+        self.avg_doc_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+        return True
+
+    def search(self, query: str, top_k: int = 20) -> List[Tuple[int, float]]:
+        """
+        Score documents against a query with BM25.
+
+        Args:
+            query: Search query string
+            top_k: Number of top documents to return
+
+        Returns:
+            List of (doc_id, bm25_score) tuples, best first
+        """
+        if self.num_docs == 0:
+            return []
+
+        term_ids = sorted({self.vocab[t] for t in tokenize(query) if t in self.vocab})
+        if not term_ids:
+            return []
+
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        length_norm = self.k1 * (1 - self.b + self.b * self.doc_lengths / max(self.avg_doc_length, 1e-6))
+
+        for term_id in term_ids:
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            docs = self.doc_ids[start:end]
+            tf = self.term_freqs[start:end].astype(np.float32)
+            df = end - start
+            idf = np.log(1 + (self.num_docs - df + 0.5) / (df + 0.5))
+            scores[docs] += idf * tf * (self.k1 + 1) / (tf + length_norm[docs])
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > top_k:
+            matched = matched[np.argpartition(-scores[matched], top_k)[:top_k]]
+        ordered = matched[np.argsort(-scores[matched], kind='stable')]
+
+        return [(int(doc_id), float(scores[doc_id])) for doc_id in ordered]
+
+    def save(self, save_path: str) -> bool:
+        """
+        Save the index arrays and vocabulary to a directory.
+
+        Args:
+            save_path: Directory path to save the lexical index
+
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            save_path = Path(save_path)
+            save_path.mkdir(parents=True, exist_ok=True)
+
+            np.save(save_path / self.OFFSETS_FILE, self.offsets)
+            np.save(save_path / self.DOC_IDS_FILE, self.doc_ids)
+            np.save(save_path / self.TERM_FREQS_FILE, self.term_freqs)
+            np.save(save_path / self.DOC_LENGTHS_FILE, self.doc_lengths)
+
+            with open(save_path / self.VOCAB_FILE, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'k1': self.k1,
+                    'b': self.b,
+                    'avg_doc_length': self.avg_doc_length,
+                    'terms': sorted(self.vocab, key=self.vocab.get)
+                }, f, separators=(',', ':'))
+
+            return True
+
+        except Exception as e:
+            print(f"Error saving lexical index: {e}")
+            return False
+
+    def load(self, load_path: str, mmap: bool = True) -> bool:
+        """
+        Load the index from a directory.
+
+        Args:
+            load_path: Directory path to load the lexical index from
+            mmap: Memory-map the posting arrays instead of reading them
+
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            load_path = Path(load_path)
+            files = [self.VOCAB_FILE, self.OFFSETS_FILE, self.DOC_IDS_FILE,
+                     self.TERM_FREQS_FILE, self.DOC_LENGTHS_FILE]
+
+            if not all((load_path / f).exists() for f in files):
+                return False
+
+            mmap_mode = 'r' if mmap else None
+
+            with open(load_path / self.VOCAB_FILE, 'r', encoding='utf-8') as f:
+                vocab_data = json.load(f)
+
+            self.k1 = vocab_data['k1']
+            self.b = vocab_data['b']
+            self.avg_doc_length = vocab_data['avg_doc_length']
+            self.vocab = {term: term_id for term_id, term in enumerate(vocab_data['terms'])}
+            self.offsets = np.load(load_path / self.OFFSETS_FILE, mmap_mode=mmap_mode)
+            self.doc_ids = np.load(load_path / self.DOC_IDS_FILE, mmap_mode=mmap_mode)
+            self.term_freqs = np.load(load_path / self.TERM_FREQS_FILE, mmap_mode=mmap_mode)
+            self.doc_lengths = np.load(load_path / self.DOC_LENGTHS_FILE, mmap_mode=mmap_mode)
+            return True
+
+        except Exception as e:
+            print(f"Error loading lexical index: {e}")
+            return False
+
+    def get_stats(self) -> Dict[str, any]:
+        """
+        Get statistics about the lexical index.
+
+        Returns:
+            Dictionary with lexical index statistics
+        """
+        return {
+            'num_docs': self.num_docs,
+            'vocab_size': len(self.vocab),
+            'num_postings': int(len(self.doc_ids)),
+            'avg_doc_length': self.avg_doc_length
+        }
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """
+    Fuse several ranked id lists with reciprocal-rank fusion.
+
+    Args:
+        rankings: Ranked lists of document ids, best first
+        k: RRF smoothing constant
+
+    Returns:
+        List of (doc_id, fused_score) tuples, best first
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,125 @@
+"""
+Bounded LRU caches for repeated retrieval work within one process.
+
+The same query text is embedded and searched repeatedly: once per agent,
+again on every Streamlit rerun and again on retries. These caches make the
+repeats free. Retrieval results are stored as one small numpy record array
+of row ids and scores rather than copies of the chunk dictionaries.
+"""
+
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import List, Dict, Hashable, Optional
+
+SCORE_FIELDS = ('similarity', 'rrf_score', 'bm25_score', 'rerank_score')
+
+RESULT_DTYPE = np.dtype([('vector_id', np.int32)] + [(field, np.float32) for field in SCORE_FIELDS])
+
+
+class LRUCache:
+    """Thread-safe least-recently-used cache with hit/miss counters."""
+
+    def __init__(self, max_entries: int = 1024):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of entries before the oldest is evicted
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, key: Hashable):
+        """Return the cached value for a key, or None."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return value
+
+    def put(self, key: Hashable, value):
+        """Store a value, evicting the least recently used entry when full."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with counters, size and hit rate
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self._entries)
+            stats['max_entries'] = self.max_entries
+
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+
+def pack_results(results: List[Dict]) -> np.ndarray:
+    """
+    Compact retrieved chunks into a record array of row ids and scores.
+
+    Scores a result does not have are stored as NaN.
+
+    Args:
+        results: Retrieved chunks carrying a 'vector_id'
+
+    Returns:
+        Read-only numpy record array with RESULT_DTYPE
+    """
+    packed = np.zeros(len(results), dtype=RESULT_DTYPE)
+    for field in SCORE_FIELDS:
+        packed[field] = np.nan
+    for row, result in enumerate(results):
+        packed[row]['vector_id'] = result['vector_id']
+        for field in SCORE_FIELDS:
+            if field in result:
+                packed[row][field] = result[field]
+    packed.flags.writeable = False
+    return packed
+
+
+def unpack_results(packed: np.ndarray, chunks: List[Dict]) -> List[Dict]:
+    """
+    Rebuild chunk dictionaries from a packed record array.
+
+    Args:
+        packed: Record array produced by pack_results
+        chunks: The vector store's chunk list
+
+    Returns:
+        List of chunk copies with their scores and ranks
+    """
+    results = []
+    for rank, row in enumerate(packed):
+        vector_id = int(row['vector_id'])
+        result = chunks[vector_id].copy()
+        result['vector_id'] = vector_id
+        for field in SCORE_FIELDS:
+            if not np.isnan(row[field]):
+                result[field] = float(row[field])
+        result['rank'] = rank + 1
+        results.append(result)
+    return results
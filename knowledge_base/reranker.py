@@ -0,0 +1,199 @@
+"""
+Re-ranking module for re-scoring retrieved chunks with a cross-encoder.
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import List, Dict, Optional
+
+
+class CrossEncoderReranker:
+    """Re-scores (query, chunk) pairs with a small CPU cross-encoder under a latency budget."""
+
+    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+                 budget_ms: float = 150.0, max_length: int = 256, probe_every: int = 20):
+        """
+        Initialize the reranker. The model is loaded lazily on a worker thread.
+
+        Args:
+            model_name: Name of the sentence-transformers cross-encoder model
+            budget_ms: Per-query latency budget in milliseconds
+            max_length: Maximum tokens per (query, chunk) pair
+            probe_every: Let one batch through after this many over-budget
+                bypasses so that the latency estimate can recover
+        """
+        self.model_name = model_name
+        self.budget_ms = budget_ms
+        self.max_length = max_length
+        self.probe_every = probe_every
+        self.model = None
+
+        # A single worker keeps scoring off the request thread so that a slow
+        # batch can be abandoned once the budget is spent
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reranker")
+        self._lock = threading.Lock()
+        self._pending = None
+        self._ms_per_pair = None
+        self._skipped_since_probe = 0
+        self.stats = {
+            'reranked': 0,
+            'bypassed_over_budget': 0,
+            'bypassed_busy': 0,
+            'bypassed_cold': 0,
+            'errors': 0
+        }
+
+    def _load_model(self):
+        """Load the cross-encoder model (runs on the worker thread)."""
+        if self.model is None:
+            from sentence_transformers import CrossEncoder
+            self.model = CrossEncoder(self.model_name, max_length=self.max_length, device="cpu")
+        return self.model
+
+    def _warm(self):
+        """Load the model and score one pair so the first real batch is not cold (runs on the worker thread)."""
+        try:
+            self._load_model().predict([("warm up", "warm up")], batch_size=1, show_progress_bar=False)
+        except Exception as e:
+            print(f"Error loading re-ranker model: {e}")
+
+    def _score(self, query: str, texts: List[str], probe: bool = False) -> List[float]:
+        """Score all pairs in one batched forward pass (runs on the worker thread)."""
+        model = self._load_model()
+        start = time.perf_counter()
+        scores = model.predict([(query, text) for text in texts], batch_size=len(texts),
+                               show_progress_bar=False)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        # Exponentially weighted per-pair cost, used to skip batches that
+        # cannot finish within the budget. A probe replaces the estimate so
+        # that one slow batch cannot keep re-ranking off for good.
+        per_pair = elapsed_ms / len(texts)
+        if self._ms_per_pair is None or probe:
+            self._ms_per_pair = per_pair
+        else:
+            self._ms_per_pair = 0.8 * self._ms_per_pair + 0.2 * per_pair
+
+        return [float(score) for score in scores]
+
+    def _count(self, name: str):
+        """Increment a stats counter; rerank() runs on many request threads."""
+        with self._lock:
+            self.stats[name] += 1
+
+    def warm_up(self):
+        """Start loading the model in the background; retried if a previous load failed."""
+        with self._lock:
+            if self._pending is not None and self._pending.done():
+                self._pending = None
+            if self.model is None and self._pending is None:
+                self._pending = self._executor.submit(self._warm)
+
+    def is_ready(self) -> bool:
+        """Check whether the model is loaded and the worker is idle."""
+        with self._lock:
+            if self._pending is not None and self._pending.done():
+                self._pending = None
+            return self.model is not None and self._pending is None
+
+    def rerank(self, query: str, candidates: List[Dict], top_k: int = 4) -> List[Dict]:
+        """
+        Re-rank candidate chunks and keep the best ``top_k``.
+
+        Falls back to the incoming order whenever re-scoring would not fit in
+        the latency budget: while the model is still loading, while a
+        previous batch is still running, when the expected cost of this
+        batch is over budget, or when the batch does not finish in time.
+        Every ``probe_every`` over-budget bypasses one batch is scored anyway
+        to re-measure the cost.
+
+        Args:
+            query: Search query
+            candidates: Retrieved chunks in their original order
+            top_k: Number of chunks to keep
+
+        Returns:
+            List of up to ``top_k`` chunks, with 'rerank_score' when re-scored
+        """
+        if len(candidates) <= 1:
+            return candidates[:top_k]
+
+        if self.model is None:
+            self.warm_up()
+            self._count('bypassed_cold')
+            return candidates[:top_k]
+
+        probe = False
+        if self._ms_per_pair is not None and self._ms_per_pair * len(candidates) > self.budget_ms:
+            with self._lock:
+                self._skipped_since_probe += 1
+                probe = self._skipped_since_probe > self.probe_every
+                if not probe:
+                    self.stats['bypassed_over_budget'] += 1
+                    return candidates[:top_k]
+
+        with self._lock:
+            if self._pending is not None and not self._pending.done():
+                self.stats['bypassed_busy'] += 1
+                return candidates[:top_k]
+            if probe:
+                self._skipped_since_probe = 0
+            self._pending = self._executor.submit(self._score, query, [c.get('text', '') for c in candidates], probe)
+            future = self._pending
+
+        try:
+            scores = future.result(timeout=self.budget_ms / 1000)
+        except TimeoutError:
+            self._count('bypassed_over_budget')
+            return candidates[:top_k]
+        except Exception as e:
+            print(f"Error during re-ranking: {e}")
+            self._count('errors')
+            return candidates[:top_k]
+
+        order = sorted(range(len(candidates)), key=lambda i: scores[i], reverse=True)
+
+        results = []
+        for rank, i in enumerate(order[:top_k]):
+            result = candidates[i]
+            result['rerank_score'] = float(scores[i])
+            result['rank'] = rank + 1
+            results.append(result)
+
+        self._count('reranked')
+        return results
+
+    def get_stats(self) -> Dict[str, any]:
+        """
+        Get re-ranking statistics.
+
+        Returns:
+            Dictionary with re-ranking counters and latency estimate
+        """
+        with self._lock:
+            stats = dict(self.stats)
+        stats.update({
+            'model_name': self.model_name,
+            'model_loaded': self.model is not None,
+            'budget_ms': self.budget_ms,
+            'ms_per_pair': self._ms_per_pair
+        })
+        return stats
+
+
+def reranker_from_env() -> Optional[CrossEncoderReranker]:
+    """
+    Create a reranker from environment configuration.
+
+    Returns:
+        CrossEncoderReranker if RERANK_ENABLED is set, otherwise None
+    """
+    if os.getenv('RERANK_ENABLED', 'false').lower() not in ('1', 'true', 'yes'):
+        return None
+
+    return CrossEncoderReranker(
+        model_name=os.getenv('RERANKER_MODEL', 'cross-encoder/ms-marco-MiniLM-L-6-v2'),
+        budget_ms=float(os.getenv('RERANK_BUDGET_MS', '150'))
+    )
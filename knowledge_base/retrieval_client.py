@@ -0,0 +1,119 @@
+"""
+Client for the local retrieval service (knowledge_base/retrieval_service.py).
+"""
+
+import json
+import socket
+import threading
+import http.client
+import urllib.parse
+import numpy as np
+from typing import List, Dict
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection over a Unix domain socket."""
+
+    def __init__(self, socket_path: str, timeout: float = 10.0):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class RetrievalClient:
+    """Talks to the retrieval service over keep-alive HTTP connections."""
+
+    def __init__(self, base_url: str, timeout: float = 10.0):
+        """
+        Initialize the client.
+
+        Args:
+            base_url: Service address, e.g. http://127.0.0.1:8100 or unix:///tmp/shakti-retrieval.sock
+            timeout: Request timeout in seconds
+        """
+        self.base_url = base_url
+        self.timeout = timeout
+        self._url = urllib.parse.urlparse(base_url)
+        if self._url.scheme not in ("http", "unix"):
+            raise ValueError(f"Unsupported retrieval service URL: {base_url}")
+        self._local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        """Get this thread's connection to the service."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            if self._url.scheme == "unix":
+                connection = UnixHTTPConnection(self._url.path, timeout=self.timeout)
+            else:
+                connection = http.client.HTTPConnection(self._url.hostname, self._url.port or 80,
+                                                        timeout=self.timeout)
+            self._local.connection = connection
+        return connection
+
+    def _request(self, method: str, path: str, payload: Dict = None) -> Dict:
+        """Send a JSON request, reconnecting once if a kept-alive connection went stale."""
+        body = json.dumps(payload) if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body else {}
+
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+            except (ConnectionError, http.client.HTTPException, OSError):
+                connection.close()
+                self._local.connection = None
+                if attempt == 1:
+                    raise
+                continue
+
+            if response.status != 200:
+                raise RuntimeError(f"Retrieval service returned {response.status}: {data[:200]!r}")
+            return json.loads(data)
+
+    def retrieve(self, agent_name: str, query: str, top_k: int = 3, min_similarity: float = 0.3,
+                 hybrid: bool = True, rerank: bool = True, diversify: bool = True) -> List[Dict]:
+        """
+        Retrieve relevant chunks for an agent (see KnowledgeRetriever.retrieve_for_agent).
+
+        Returns:
+            List of relevant chunks with metadata
+        """
+        return self._request("POST", "/retrieve", {
+            "agent_name": agent_name,
+            "query": query,
+            "top_k": top_k,
+            "min_similarity": min_similarity,
+            "hybrid": hybrid,
+            "rerank": rerank,
+            "diversify": diversify
+        })["results"]
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts with the service's encoder.
+
+        Returns:
+            Normalized embeddings of shape (len(texts), dimension)
+        """
+        embeddings = self._request("POST", "/encode", {"texts": texts})["embeddings"]
+        return np.asarray(embeddings, dtype='float32')
+
+    def get_info(self) -> Dict:
+        """
+        Get the service's model and knowledge bases.
+
+        Returns:
+            Dictionary with 'model_name', 'dimension' and per-agent 'version',
+            'chunks', 'warmed_up' and 'centroid'
+        """
+        return self._request("GET", "/info")
+
+    def get_stats(self) -> Dict:
+        """Get the service's batching and cache statistics."""
+        return self._request("GET", "/stats")
@@ -0,0 +1,266 @@
+"""
+Local retrieval service that owns the encoder and indexes.
+
+Chat workers send retrieval requests here (set RETRIEVAL_SERVICE_URL)
+instead of each loading the knowledge base. Requests arriving within a few
+milliseconds of each other are coalesced: their queries are embedded in one
+encoder batch and each agent index is searched once for all of them.
+
+Usage:
+    python -m knowledge_base.retrieval_service --port 8100
+    python -m knowledge_base.retrieval_service --uds /tmp/shakti-retrieval.sock
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+import threading
+import numpy as np
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+# Add the project root to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from knowledge_base.retriever import KnowledgeRetriever
+from knowledge_base.reranker import reranker_from_env
+
+
+class RequestCoalescer:
+    """Gathers concurrent requests into batches for a batch handler."""
+
+    def __init__(self, handler: Callable[[List[Any]], List[Any]], max_batch: int = 32,
+                 max_wait_ms: float = 5.0, executor: Optional[ThreadPoolExecutor] = None):
+        """
+        Initialize the coalescer.
+
+        Args:
+            handler: Function mapping a list of requests to a list of results
+            max_batch: Largest batch to hand to the handler
+            max_wait_ms: How long the first request of a batch waits for company
+            executor: Executor the handler runs on (default: a single worker thread)
+        """
+        self.handler = handler
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="coalescer")
+        self._queue = None
+        self._task = None
+        self.stats = {'requests': 0, 'batches': 0, 'largest_batch': 0, 'errors': 0}
+
+    def start(self):
+        """Start the batching loop on the running event loop."""
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the batching loop."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, request: Any) -> Any:
+        """
+        Queue a request and wait for its result.
+
+        Args:
+            request: Request passed to the handler as part of a batch
+
+        Returns:
+            The handler's result for this request
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((request, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Requests queued while the previous batch ran join without waiting
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            self.stats['requests'] += len(batch)
+            self.stats['batches'] += 1
+            self.stats['largest_batch'] = max(self.stats['largest_batch'], len(batch))
+
+            requests = [request for request, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._executor, self.handler, requests)
+            except Exception as e:
+                self.stats['errors'] += 1
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get batching statistics.
+
+        Returns:
+            Dictionary with request and batch counts and the mean batch size
+        """
+        stats = dict(self.stats)
+        stats['mean_batch'] = stats['requests'] / stats['batches'] if stats['batches'] else 0.0
+        return stats
+
+
+def _plain(value):
+    """Convert numpy scalars and arrays in a result to JSON-serializable values."""
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return value
+
+
+def create_app(retriever: Optional[KnowledgeRetriever] = None, max_batch: int = 32, max_wait_ms: float = 5.0):
+    """
+    Create the retrieval service application.
+
+    Args:
+        retriever: Local retriever to serve (default: one loaded at startup)
+        max_batch: Largest coalesced batch
+        max_wait_ms: Coalescing window in milliseconds
+
+    Returns:
+        FastAPI application
+    """
+    from fastapi import FastAPI
+    from pydantic import BaseModel
+
+    class RetrieveRequest(BaseModel):
+        agent_name: str
+        query: str
+        top_k: int = 3
+        min_similarity: float = 0.3
+        hybrid: bool = True
+        rerank: bool = True
+        diversify: bool = True
+
+    class EncodeRequest(BaseModel):
+        texts: List[str]
+
+    app = FastAPI(title="SHAKTI-AI Retrieval Service", version="1.0.0")
+    state = {'retriever': retriever, 'started_at': time.time()}
+
+    # Encoding and index search share one thread so batches never compete for the CPU
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="retrieval")
+
+    def retrieve_batch(requests: List[Dict]) -> List[List[Dict]]:
+        return [_plain(results) for results in state['retriever'].retrieve_batch(requests)]
+
+    def encode_batch(text_lists: List[List[str]]) -> List[List[List[float]]]:
+        texts = [text for text_list in text_lists for text in text_list]
+        embeddings = state['retriever'].encode_texts(texts).tolist() if texts else []
+        results, start = [], 0
+        for text_list in text_lists:
+            results.append(embeddings[start:start + len(text_list)])
+            start += len(text_list)
+        return results
+
+    retrieval = RequestCoalescer(retrieve_batch, max_batch, max_wait_ms, executor)
+    encoding = RequestCoalescer(encode_batch, max_batch, max_wait_ms, executor)
+
+    @app.on_event("startup")
+    async def start():
+        if state['retriever'] is None:
+            loop = asyncio.get_running_loop()
+            state['retriever'] = await loop.run_in_executor(
+                executor, lambda: KnowledgeRetriever(reranker=reranker_from_env(), service_url="")
+            )
+        retrieval.start()
+        encoding.start()
+        # Warm the encoder and indexes without holding up startup
+        threading.Thread(target=state['retriever'].warm_up, daemon=True).start()
+
+    @app.on_event("shutdown")
+    async def stop():
+        await retrieval.stop()
+        await encoding.stop()
+
+    @app.post("/retrieve")
+    async def retrieve(request: RetrieveRequest):
+        return {"results": await retrieval.submit(request.model_dump())}
+
+    @app.post("/encode")
+    async def encode(request: EncodeRequest):
+        return {"embeddings": await encoding.submit(request.texts)}
+
+    @app.get("/info")
+    async def info():
+        retriever = state['retriever']
+        agents = {}
+        for agent_name, status in retriever.get_index_status().items():
+            centroid = retriever.get_agent_centroid(agent_name)
+            agents[agent_name] = dict(status, centroid=centroid.tolist() if centroid is not None else None)
+
+        stores = list(retriever.agent_stores.values())
+        return {
+            "model_name": stores[0].model_name if stores else None,
+            "dimension": stores[0].dimension if stores else None,
+            "agents": agents
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return {
+            "uptime_seconds": round(time.time() - state['started_at'], 1),
+            "retrieval_batching": retrieval.get_stats(),
+            "encode_batching": encoding.get_stats(),
+            "caches": state['retriever'].get_cache_stats()
+        }
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SHAKTI-AI retrieval service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--uds", help="Serve on a Unix domain socket instead of TCP")
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    import uvicorn
+    app = create_app(max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+    if args.uds:
+        uvicorn.run(app, uds=args.uds)
+    else:
+        uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,35 +2,140 @@
 Retriever module for finding relevant knowledge base content.
 """
 
+import os
 import re
+import time
+import hashlib
+import threading
+import numpy as np
 from pathlib import Path
 from typing import List, Dict, Optional
 from knowledge_base.vector_store import VectorStore
+from knowledge_base.retrieval_client import RetrievalClient
+from knowledge_base.lexical_index import reciprocal_rank_fusion
+from knowledge_base.reranker import CrossEncoderReranker
+from knowledge_base.diversity import mmr_select, merge_adjacent_chunks, relevance_scores
+from knowledge_base.context_packer import ContextPacker
+from knowledge_base.query_cache import LRUCache, pack_results, unpack_results
+
+# Default options of retrieve_for_agent, also used for batched requests
+RETRIEVAL_DEFAULTS = {
+    'top_k': 3,
+    'min_similarity': 0.3,
+    'hybrid': True,
+    'rerank': True,
+    'diversify': True
+}
 
 class KnowledgeRetriever:
     """Handles retrieval of relevant knowledge from vector stores."""
     
-    def __init__(self, kb_base_path: str = "knowledge_base/processed"):
+    def __init__(self, kb_base_path: str = "knowledge_base/processed",
+                 reranker: Optional[CrossEncoderReranker] = None,
+                 embedding_cache_size: int = 1024, results_cache_size: int = 2048,
+                 mmap_indexes: Optional[bool] = None, service_url: Optional[str] = None,
+                 service_info_ttl: Optional[float] = None):
         """
         Initialize the knowledge retriever.
         
         Args:
             kb_base_path: Base path where processed knowledge bases are stored
+            reranker: Optional cross-encoder used to re-rank over-retrieved results
+            embedding_cache_size: Maximum cached query embeddings
+            results_cache_size: Maximum cached retrieval results
+            mmap_indexes: Memory-map the FAISS indexes (default: FAISS_MMAP env var)
+            service_url: Retrieval service to delegate to instead of loading the
+                indexes here (default: RETRIEVAL_SERVICE_URL env var; "" forces local)
+            service_info_ttl: Seconds before the service's agents and versions are
+                fetched again (default: RETRIEVAL_INFO_TTL env var, 30)
         """
         self.kb_base_path = Path(kb_base_path)
+        if mmap_indexes is None:
+            mmap_indexes = os.getenv('FAISS_MMAP', 'false').lower() in ('1', 'true', 'yes')
+        self.mmap_indexes = mmap_indexes
         self.agent_stores = {}
-        self.load_all_stores()
+        self.candidate_multiplier = 4
+        self.rrf_k = 60
+        self.reranker = reranker
+        self.rerank_candidates = 20
+        self.mmr_lambda = 0.7
+        self.mmr_fetch_multiplier = 3
+        self.embedding_cache = LRUCache(embedding_cache_size)
+        self.results_cache = LRUCache(results_cache_size)
+        self.warmed_agents = set()
+        
+        if service_url is None:
+            service_url = os.getenv('RETRIEVAL_SERVICE_URL', '')
+        self.client = RetrievalClient(service_url) if service_url else None
+        if service_info_ttl is None:
+            service_info_ttl = float(os.getenv('RETRIEVAL_INFO_TTL', '30'))
+        self.service_info_ttl = service_info_ttl
+        self._service_info = None
+        self._service_info_at = 0.0
+        self._service_info_lock = threading.Lock()
+        
+        if self.client is None:
+            self.load_all_stores()
+        
+        if self.reranker is not None:
+            self.reranker.warm_up()
+    
+    @property
+    def is_remote(self) -> bool:
+        """Whether retrieval is delegated to a retrieval service."""
+        return self.client is not None
+    
+    def _get_service_info(self) -> Dict:
+        """
+        Get the retrieval service's agents and versions, fetched again every service_info_ttl seconds.
+        
+        A rebuilt index on the service shows up after at most one TTL. If a
+        refresh fails, the last answer is used and the next call asks again.
+        
+        Raises:
+            Exception: The service could not be reached and has never answered
+        """
+        with self._service_info_lock:
+            if self._service_info is not None and time.monotonic() - self._service_info_at < self.service_info_ttl:
+                return self._service_info
+            try:
+                info = self.client.get_info()
+            except Exception as e:
+                if self._service_info is None:
+                    raise
+                print(f"Retrieval service unavailable, using its last known state: {e}")
+                return self._service_info
+            self._service_info = info
+            self._service_info_at = time.monotonic()
+            return info
+    
+    def set_reranker(self, reranker: Optional[CrossEncoderReranker]):
+        """
+        Replace the re-ranking stage.
+        
+        Args:
+            reranker: Cross-encoder to use, or None to disable re-ranking
+        """
+        self.reranker = reranker
+        self.results_cache.clear()
+        if self.reranker is not None:
+            self.reranker.warm_up()
     
     def load_all_stores(self):
         """Load all available vector stores for different agents."""
         agent_names = ['maaya', 'gynika', 'meher', 'nyaya', 'vaanya']
         
+        # Cached embeddings and results belong to the previously loaded stores
+        self.embedding_cache.clear()
+        self.results_cache.clear()
+        self.warmed_agents = set()
+        
         for agent_name in agent_names:
             store_path = self.kb_base_path / f"{agent_name}_vectorstore"
             if store_path.exists():
                 try:
                     vector_store = VectorStore()
-                    if vector_store.load(str(store_path)):
+                    if vector_store.load(str(store_path), mmap_index=self.mmap_indexes):
                         self.agent_stores[agent_name] = vector_store
                         print(f"Loaded knowledge base for {agent_name}")
                     else:
@@ -63,7 +168,103 @@ class KnowledgeRetriever:
         
         return ' '.join(filtered_words).strip()
     
-    def retrieve_for_agent(self, agent_name: str, query: str, top_k: int = 3, min_similarity: float = 0.3) -> List[Dict]:
+    def encode_query(self, query: str):
+        """
+        Embed a query with the encoder shared by the agent stores.
+        
+        Args:
+            query: Raw user query
+            
+        Returns:
+            Normalized query embedding of shape (1, dimension)
+        """
+        return self._embed_processed_query(self.preprocess_query(query))
+    
+    def _embed_processed_query(self, processed_query: str):
+        """Embed an already preprocessed query, reusing cached embeddings."""
+        return self._embed_processed_queries([processed_query])[processed_query]
+    
+    def _embed_processed_queries(self, processed_queries: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Embed preprocessed queries, encoding all uncached ones in one batch.
+        
+        Returns:
+            Dictionary mapping each query to a read-only (1, dimension) embedding
+        """
+        if self.client is not None:
+            model_name = self._get_service_info().get('model_name', 'remote')
+        elif self.agent_stores:
+            model_name = next(iter(self.agent_stores.values())).model_name
+        else:
+            raise ValueError("No knowledge base loaded")
+        
+        embeddings = {}
+        missing = []
+        for processed_query in dict.fromkeys(processed_queries):
+            query_embedding = self.embedding_cache.get((model_name, processed_query))
+            if query_embedding is None:
+                missing.append(processed_query)
+            else:
+                embeddings[processed_query] = query_embedding
+        
+        if missing:
+            for processed_query, row in zip(missing, self.encode_texts(missing)):
+                query_embedding = row[None, :].copy()
+                query_embedding.flags.writeable = False
+                self.embedding_cache.put((model_name, processed_query), query_embedding)
+                embeddings[processed_query] = query_embedding
+        
+        return embeddings
+    
+    def encode_texts(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts in one batch with the shared encoder, without caching.
+        
+        Args:
+            texts: Texts to embed
+            
+        Returns:
+            Normalized embeddings of shape (len(texts), dimension)
+        """
+        if self.client is not None:
+            return self.client.encode(texts)
+        if not self.agent_stores:
+            raise ValueError("No knowledge base loaded")
+        return next(iter(self.agent_stores.values())).encode_queries(texts)
+    
+    def get_agent_centroid(self, agent_name: str) -> Optional[np.ndarray]:
+        """
+        Get the normalized mean embedding of an agent's knowledge base.
+        
+        Args:
+            agent_name: Name of the agent
+            
+        Returns:
+            Centroid of shape (dimension,), or None if the agent has no knowledge base
+        """
+        if self.client is not None:
+            centroid = self._get_service_info().get('agents', {}).get(agent_name, {}).get('centroid')
+            return np.asarray(centroid, dtype='float32') if centroid else None
+        if agent_name not in self.agent_stores:
+            return None
+        return self.agent_stores[agent_name].get_centroid()
+    
+    def get_kb_version(self) -> str:
+        """
+        Get a combined version identifier for all loaded knowledge bases.
+        
+        Returns:
+            Short hash that changes whenever any agent store is rebuilt
+        """
+        if self.client is not None:
+            agents = self._get_service_info().get('agents', {})
+            versions = [f"{name}:{info['version']}" for name, info in sorted(agents.items())]
+        else:
+            versions = [f"{name}:{store.version}" for name, store in sorted(self.agent_stores.items())]
+        return hashlib.sha1("|".join(versions).encode('utf-8')).hexdigest()[:16]
+    
+    def retrieve_for_agent(self, agent_name: str, query: str, top_k: int = 3, min_similarity: float = 0.3,
+                           hybrid: bool = True, rerank: bool = True, diversify: bool = True) -> List[Dict]:
         """
         Retrieve relevant knowledge for a specific agent.
         
@@ -72,61 +273,274 @@ class KnowledgeRetriever:
             query: Search query
             top_k: Number of top results to return
             min_similarity: Minimum similarity threshold
+            hybrid: Fuse dense results with BM25 results for exact-term matches
+            rerank: Over-retrieve and re-rank with the cross-encoder, if configured
+            diversify: Select with MMR and merge adjacent chunks of the same document
             
         Returns:
             List of relevant chunks with metadata
         """
-        if agent_name not in self.agent_stores:
-            print(f"No knowledge base available for agent: {agent_name}")
-            return []
+        if self.client is not None:
+            try:
+                return self.client.retrieve(agent_name, query, top_k, min_similarity, hybrid, rerank, diversify)
+            except Exception as e:
+                print(f"Error during search: {e}")
+                return []
+        
+        return self.retrieve_batch([{
+            'agent_name': agent_name,
+            'query': query,
+            'top_k': top_k,
+            'min_similarity': min_similarity,
+            'hybrid': hybrid,
+            'rerank': rerank,
+            'diversify': diversify
+        }])[0]
+    
+    def retrieve_batch(self, requests: List[Dict]) -> List[List[Dict]]:
+        """
+        Retrieve knowledge for several (agent, query) requests at once.
+        
+        All uncached queries are embedded in one encoder batch, and each
+        agent's index is searched once for all of its queries.
+        
+        Args:
+            requests: Dictionaries with 'agent_name' and 'query', plus any
+                retrieve_for_agent options (top_k, min_similarity, ...)
+            
+        Returns:
+            List of retrieved chunk lists, in request order
+        """
+        outputs = [[] for _ in requests]
+        pending = []
         
-        # Preprocess query
-        processed_query = self.preprocess_query(query)
+        for position, request in enumerate(requests):
+            agent_name = request['agent_name']
+            if agent_name not in self.agent_stores:
+                print(f"No knowledge base available for agent: {agent_name}")
+                continue
+            
+            options = {key: request.get(key, default) for key, default in RETRIEVAL_DEFAULTS.items()}
+            processed_query = self.preprocess_query(request['query'])
+            cache_key = (agent_name, processed_query) + tuple(options[key] for key in RETRIEVAL_DEFAULTS)
+            
+            cached = self.results_cache.get(cache_key)
+            if cached is not None:
+                results = unpack_results(cached, self.agent_stores[agent_name].chunks)
+                outputs[position] = merge_adjacent_chunks(results) if options['diversify'] else results
+            else:
+                pending.append({
+                    'position': position,
+                    'agent_name': agent_name,
+                    'query': request['query'],
+                    'processed_query': processed_query,
+                    'cache_key': cache_key,
+                    'options': options
+                })
         
-        # Search in agent's knowledge base
-        results = self.agent_stores[agent_name].search(
-            processed_query, 
-            top_k=top_k, 
-            min_similarity=min_similarity
-        )
+        if not pending:
+            return outputs
+        
+        try:
+            embeddings = self._embed_processed_queries([item['processed_query'] for item in pending])
+        except Exception as e:
+            print(f"Error during search: {e}")
+            return outputs
+        
+        by_agent = {}
+        for item in pending:
+            by_agent.setdefault(item['agent_name'], []).append(item)
+        
+        for agent_name, items in by_agent.items():
+            vector_store = self.agent_stores[agent_name]
+            dense_ks = [self._dense_k(vector_store, item['options']) for item in items]
+            query_embeddings = np.vstack([embeddings[item['processed_query']] for item in items])
+            
+            # One index search for every query of this agent; each request
+            # then takes its own threshold and depth from the shared ranking
+            dense_lists = vector_store.search_by_embeddings(query_embeddings, max(dense_ks), float('-inf'))
+            
+            for item, dense_k, dense_results in zip(items, dense_ks, dense_lists):
+                options = item['options']
+                dense_results = [result for result in dense_results
+                                 if result['similarity'] >= options['min_similarity']][:dense_k]
+                
+                results, complete = self._select_results(
+                    vector_store, item['query'], item['processed_query'], embeddings[item['processed_query']],
+                    options['top_k'], options['min_similarity'], options['hybrid'], options['rerank'],
+                    options['diversify'], dense_results=dense_results
+                )
+                
+                # A re-ranking bypass is not worth remembering
+                if complete:
+                    self.results_cache.put(item['cache_key'], pack_results(results))
+                
+                outputs[item['position']] = merge_adjacent_chunks(results) if options['diversify'] else results
+        
+        return outputs
+    
+    def _fetch_sizes(self, top_k: int, rerank: bool, diversify: bool) -> tuple[int, int, bool]:
+        """Return how many results to select and fetch, and whether to re-rank."""
+        use_reranker = rerank and self.reranker is not None
+        select_k = top_k * self.mmr_fetch_multiplier if diversify else top_k
+        fetch_k = max(select_k, self.rerank_candidates) if use_reranker else select_k
+        return select_k, fetch_k, use_reranker
+    
+    def _dense_k(self, vector_store: VectorStore, options: Dict) -> int:
+        """Return how many dense results a request needs from the index."""
+        _, fetch_k, _ = self._fetch_sizes(options['top_k'], options['rerank'], options['diversify'])
+        if options['hybrid'] and vector_store.lexical_index is not None:
+            return self._candidate_k(fetch_k)
+        return fetch_k
+    
+    def _candidate_k(self, top_k: int) -> int:
+        """Return how deep hybrid search over-fetches each ranking."""
+        return max(top_k * self.candidate_multiplier, 20)
+    
+    def _select_results(self, vector_store: VectorStore, query: str, processed_query: str, query_embedding,
+                        top_k: int, min_similarity: float, hybrid: bool, rerank: bool,
+                        diversify: bool, dense_results: Optional[List[Dict]] = None) -> tuple[List[Dict], bool]:
+        """
+        Run search, fusion, re-ranking and diversity selection.
+        
+        Args:
+            dense_results: Dense search results already fetched for this query
+        
+        Returns:
+            Tuple of (selected chunks before merging, whether every enabled stage ran)
+        """
+        select_k, fetch_k, use_reranker = self._fetch_sizes(top_k, rerank, diversify)
+        
+        if not hybrid or vector_store.lexical_index is None:
+            if dense_results is not None:
+                results = dense_results[:fetch_k]
+            else:
+                # Search in agent's knowledge base
+                results = vector_store.search_by_embedding(
+                    query_embedding, 
+                    top_k=fetch_k, 
+                    min_similarity=min_similarity
+                )
+        else:
+            results = self.hybrid_search(vector_store, processed_query, query_embedding, fetch_k, min_similarity,
+                                         dense_results=dense_results)
+        
+        complete = True
+        if use_reranker:
+            results = self.reranker.rerank(query, results, select_k)
+            complete = not results or 'rerank_score' in results[0]
+        
+        if diversify:
+            results = self.select_diverse(vector_store, results, top_k)
+        
+        return results, complete
+    
+    def select_diverse(self, vector_store: VectorStore, results: List[Dict], top_k: int) -> List[Dict]:
+        """
+        Pick a diverse subset of results with MMR.
+        
+        Args:
+            vector_store: Agent's vector store holding the result embeddings
+            results: Retrieved chunks, best first
+            top_k: Number of chunks to select
+            
+        Returns:
+            List of selected chunks, best first
+        """
+        if len(results) > top_k and all('vector_id' in result for result in results):
+            embeddings = vector_store.get_embeddings([result['vector_id'] for result in results])
+            selected = mmr_select(embeddings, relevance_scores(results), top_k, self.mmr_lambda)
+            results = [results[i] for i in sorted(selected)]
+        else:
+            results = results[:top_k]
+        
+        for rank, result in enumerate(results):
+            result['rank'] = rank + 1
         
         return results
     
-    def format_context(self, retrieved_chunks: List[Dict], max_context_length: int = 1500) -> str:
+    def hybrid_search(self, vector_store: VectorStore, processed_query: str, query_embedding,
+                      top_k: int, min_similarity: float,
+                      dense_results: Optional[List[Dict]] = None) -> List[Dict]:
         """
-        Format retrieved chunks into a coherent context string.
+        Fuse dense and BM25 rankings with reciprocal-rank fusion.
+        
+        Both rankings are over-fetched so that a chunk ranked moderately by
+        both can outrank one ranked highly by only one of them. Chunks found
+        only lexically must still clear half of ``min_similarity`` so that
+        common words alone cannot pull in unrelated text.
         
         Args:
-            retrieved_chunks: List of retrieved chunk dictionaries
-            max_context_length: Maximum length of context to return
+            vector_store: Agent's vector store
+            processed_query: Preprocessed query text
+            query_embedding: Normalized query embedding
+            top_k: Number of top results to return
+            min_similarity: Minimum similarity threshold for dense results
+            dense_results: Dense results already fetched for this query, if any
             
         Returns:
-            Formatted context string
+            List of relevant chunks with metadata, best fused score first
         """
-        if not retrieved_chunks:
-            return ""
+        candidate_k = self._candidate_k(top_k)
         
-        context_parts = []
-        current_length = 0
+        if dense_results is None:
+            dense_results = vector_store.search_by_embedding(query_embedding, candidate_k, min_similarity)
+        lexical_results = vector_store.lexical_search(processed_query, candidate_k)
         
-        for i, chunk in enumerate(retrieved_chunks):
-            chunk_text = chunk['text']
-            source_info = f"[Source: {chunk.get('doc_title', 'Unknown')}]"
+        dense_by_id = {result['vector_id']: result for result in dense_results}
+        bm25_by_id = dict(lexical_results)
+        
+        fused = reciprocal_rank_fusion([
+            [result['vector_id'] for result in dense_results],
+            [vector_id for vector_id, _ in lexical_results]
+        ], k=self.rrf_k)
+        
+        # Score lexical-only hits against the query embedding
+        lexical_only = [vector_id for vector_id, _ in fused if vector_id not in dense_by_id]
+        lexical_similarity = {}
+        if lexical_only:
+            embeddings = vector_store.get_embeddings(lexical_only)
+            similarities = embeddings @ query_embedding[0]
+            lexical_similarity = dict(zip(lexical_only, similarities.tolist()))
+        
+        results = []
+        for vector_id, fused_score in fused:
+            if vector_id in dense_by_id:
+                result = dense_by_id[vector_id]
+            else:
+                similarity = lexical_similarity[vector_id]
+                if similarity < min_similarity / 2:
+                    continue
+                result = vector_store.chunks[vector_id].copy()
+                result['similarity'] = float(similarity)
+                result['vector_id'] = vector_id
             
-            # Add source information and chunk text
-            chunk_with_source = f"{source_info}\n{chunk_text}"
+            result['rrf_score'] = fused_score
+            result['bm25_score'] = bm25_by_id.get(vector_id, 0.0)
+            result['rank'] = len(results) + 1
+            results.append(result)
             
-            # Check if adding this chunk would exceed max length
-            if current_length + len(chunk_with_source) > max_context_length and context_parts:
+            if len(results) >= top_k:
                 break
-            
-            context_parts.append(chunk_with_source)
-            current_length += len(chunk_with_source)
         
-        # Join with separators
-        context = "\n\n---\n\n".join(context_parts)
+        return results
+    
+    def format_context(self, retrieved_chunks: List[Dict], max_tokens: int = 400) -> str:
+        """
+        Format retrieved chunks into a coherent context string.
         
-        return context
+        Args:
+            retrieved_chunks: List of retrieved chunk dictionaries
+            max_tokens: Token budget for the context
+            
+        Returns:
+            Formatted context string
+        """
+        if not retrieved_chunks:
+            return ""
+        
+        packed = ContextPacker().pack(retrieved_chunks, max_tokens)
+        return packed['context']
     
     def get_enhanced_source_citations(self, retrieved_chunks: List[Dict]) -> List[Dict]:
         """
@@ -202,7 +616,7 @@ class KnowledgeRetriever:
         results = {}
         
         for agent_name in agent_names:
-            if agent_name in self.agent_stores:
+            if agent_name in self.get_available_agents():
                 agent_results = self.retrieve_for_agent(agent_name, query, top_k)
                 if agent_results:  # Only include if there are results
                     results[agent_name] = agent_results
@@ -216,6 +630,8 @@ class KnowledgeRetriever:
         Returns:
             List of agent names with knowledge bases
         """
+        if self.client is not None:
+            return list(self._get_service_info().get('agents', {}).keys())
         return list(self.agent_stores.keys())
     
     def get_knowledge_stats(self) -> Dict[str, Dict]:
@@ -225,12 +641,102 @@ class KnowledgeRetriever:
         Returns:
             Dictionary with stats for each agent's knowledge base
         """
+        if self.client is not None:
+            return self._get_service_info().get('agents', {})
+        
         stats = {}
         
         for agent_name, vector_store in self.agent_stores.items():
             stats[agent_name] = vector_store.get_stats()
         
         return stats
+    
+    def warm_up(self, query: str = "women's health and wellbeing"):
+        """
+        Run a dummy query through every agent index.
+        
+        Loads the shared encoder and pages in each index, so the first real
+        query does not pay for it. Goes around retrieve_for_agent, which
+        swallows errors, so that an agent is only marked warmed up when its
+        query actually ran.
+        
+        Args:
+            query: Query to run
+        """
+        if self.client is None:
+            try:
+                query_embedding = self._embed_processed_query(self.preprocess_query(query))
+            except Exception as e:
+                print(f"Warm-up query failed: {e}")
+                return
+        
+        for agent_name in self.get_available_agents():
+            try:
+                if self.client is not None:
+                    self.client.retrieve(agent_name, query, 1, 0.0, True, True, True)
+                else:
+                    self.agent_stores[agent_name].search_by_embedding(query_embedding, 1, float('-inf'))
+                self.warmed_agents.add(agent_name)
+            except Exception as e:
+                print(f"Warm-up query failed for {agent_name}: {e}")
+    
+    def get_index_status(self) -> Dict[str, Dict]:
+        """
+        Get the load and warm-up state of each agent index.
+        
+        Returns:
+            Dictionary with version, chunk count and warm-up state per agent
+        """
+        if self.client is not None:
+            return {
+                agent_name: {
+                    'version': info['version'],
+                    'chunks': info['chunks'],
+                    'warmed_up': agent_name in self.warmed_agents
+                }
+                for agent_name, info in self._get_service_info().get('agents', {}).items()
+            }
+        
+        return {
+            agent_name: {
+                'version': vector_store.version,
+                'chunks': len(vector_store.chunks),
+                'warmed_up': agent_name in self.warmed_agents
+            }
+            for agent_name, vector_store in self.agent_stores.items()
+        }
+    
+    def get_cache_stats(self) -> Dict[str, Dict]:
+        """
+        Get statistics for the query embedding and retrieval result caches.
+        
+        Returns:
+            Dictionary with stats for each cache
+        """
+        return {
+            'embeddings': self.embedding_cache.get_stats(),
+            'results': self.results_cache.get_stats()
+        }
+
+
+_shared_retriever = None
+_shared_retriever_lock = threading.Lock()
+
+
+def get_shared_retriever() -> KnowledgeRetriever:
+    """
+    Get the process-wide knowledge retriever, loading it on first use.
+    
+    The pre-fork server calls this in the parent process so that forked
+    workers inherit the loaded indexes instead of loading their own.
+    The retriever is created without a reranker, whose worker thread would
+    not survive a fork; callers attach one with set_reranker.
+    """
+    global _shared_retriever
+    with _shared_retriever_lock:
+        if _shared_retriever is None:
+            _shared_retriever = KnowledgeRetriever()
+    return _shared_retriever
 
 
 # Convenience function for quick retrieval
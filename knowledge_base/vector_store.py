@@ -5,11 +5,14 @@ Vector store module for managing embeddings and similarity search.
 import os
 import json
 import pickle
+import hashlib
+from datetime import datetime
 import numpy as np
 from pathlib import Path
 from typing import List, Dict, Tuple, Optional
-from sentence_transformers import SentenceTransformer
 import faiss
+from knowledge_base.lexical_index import LexicalIndex
+from knowledge_base.encoders import get_encoder
 
 class VectorStore:
     """Manages document embeddings and similarity search using FAISS."""
@@ -18,15 +21,30 @@ class VectorStore:
         """
         Initialize the vector store.
         
+        The encoder is shared between stores and only loaded when something
+        needs to be embedded; a loaded index reads its dimension from metadata.
+        
         Args:
             model_name: Name of the sentence transformer model to use
         """
         self.model_name = model_name
-        self.model = SentenceTransformer(model_name)
-        self.dimension = self.model.get_sentence_embedding_dimension()
+        self.dimension = None
         self.index = None
+        self.lexical_index = None
         self.chunks = []
         self.metadata = {}
+        self.version = None
+        self._centroid = None
+    
+    @property
+    def encoder(self):
+        """Shared encoder for this store's model, loaded on first use."""
+        encoder = get_encoder(self.model_name)
+        if self.dimension is not None and encoder.dimension != self.dimension:
+            raise ValueError(
+                f"Encoder dimension {encoder.dimension} does not match index dimension {self.dimension}"
+            )
+        return encoder
         
     def create_embeddings(self, texts: List[str]) -> np.ndarray:
         """
@@ -39,7 +57,7 @@ class VectorStore:
             Numpy array of embeddings
         """
         print(f"Creating embeddings for {len(texts)} texts...")
-        embeddings = self.model.encode(texts, show_progress_bar=True)
+        embeddings = self.encoder.encode(texts, show_progress_bar=True)
         return embeddings.astype('float32')
     
     def build_index(self, chunks: List[Dict[str, any]]) -> bool:
@@ -61,7 +79,9 @@ class VectorStore:
             texts = [chunk['text'] for chunk in chunks]
             
             # Create embeddings
+            self.dimension = None
             embeddings = self.create_embeddings(texts)
+            self.dimension = embeddings.shape[1]
             
             # Build FAISS index
             self.index = faiss.IndexFlatIP(self.dimension)  # Inner product (cosine similarity)
@@ -71,14 +91,22 @@ class VectorStore:
             
             # Add to index
             self.index.add(embeddings)
+            self._centroid = None
+            
+            # Build BM25 index over the same chunk order
+            self.lexical_index = LexicalIndex()
+            self.lexical_index.build(texts)
             
             # Store chunks and metadata
+            content_hash = hashlib.sha1("\x00".join(texts).encode('utf-8')).hexdigest()[:12]
             self.chunks = chunks
+            self.version = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{content_hash}"
             self.metadata = {
                 'total_chunks': len(chunks),
                 'model_name': self.model_name,
                 'dimension': self.dimension,
-                'index_type': 'IndexFlatIP'
+                'index_type': 'IndexFlatIP',
+                'version': self.version
             }
             
             print(f"Successfully built index with {len(chunks)} chunks")
@@ -88,6 +116,32 @@ class VectorStore:
             print(f"Error building index: {e}")
             return False
     
+    def encode_query(self, query: str) -> np.ndarray:
+        """
+        Create a normalized embedding for a search query.
+        
+        Args:
+            query: Search query string
+            
+        Returns:
+            Numpy array of shape (1, dimension)
+        """
+        return self.encode_queries([query])
+    
+    def encode_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        Create normalized embeddings for several queries in one batch.
+        
+        Args:
+            queries: Search query strings
+            
+        Returns:
+            Numpy array of shape (len(queries), dimension)
+        """
+        query_embeddings = self.encoder.encode(queries, batch_size=max(len(queries), 1)).astype('float32')
+        faiss.normalize_L2(query_embeddings)
+        return query_embeddings
+    
     def search(self, query: str, top_k: int = 5, min_similarity: float = 0.3) -> List[Dict[str, any]]:
         """
         Search for similar chunks given a query.
@@ -106,26 +160,107 @@ class VectorStore:
         
         try:
             # Create query embedding
-            query_embedding = self.model.encode([query]).astype('float32')
-            faiss.normalize_L2(query_embedding)
+            query_embedding = self.encode_query(query)
+            return self.search_by_embedding(query_embedding, top_k, min_similarity)
             
-            # Search
-            similarities, indices = self.index.search(query_embedding, top_k)
+        except Exception as e:
+            print(f"Error during search: {e}")
+            return []
+    
+    def search_by_embedding(self, query_embedding: np.ndarray, top_k: int = 5, min_similarity: float = 0.3) -> List[Dict[str, any]]:
+        """
+        Search for similar chunks given an already normalized query embedding.
+        
+        Args:
+            query_embedding: Normalized query embedding of shape (1, dimension)
+            top_k: Number of top results to return
+            min_similarity: Minimum similarity threshold
             
-            # Format results
+        Returns:
+            List of similar chunks with similarity scores
+        """
+        if self.index is None:
+            print("Index not built. Call build_index() first.")
+            return []
+        
+        return self.search_by_embeddings(query_embedding, top_k, min_similarity)[0]
+    
+    def search_by_embeddings(self, query_embeddings: np.ndarray, top_k: int = 5,
+                             min_similarity: float = 0.3) -> List[List[Dict[str, any]]]:
+        """
+        Search for several queries with one index search.
+        
+        Args:
+            query_embeddings: Normalized query embeddings of shape (n, dimension)
+            top_k: Number of top results to return per query
+            min_similarity: Minimum similarity threshold
+            
+        Returns:
+            List of result lists, one per query
+        """
+        if self.index is None:
+            print("Index not built. Call build_index() first.")
+            return [[] for _ in range(len(query_embeddings))]
+        
+        # Search
+        similarities, indices = self.index.search(query_embeddings, top_k)
+        
+        # Format results
+        all_results = []
+        for query_similarities, query_indices in zip(similarities, indices):
             results = []
-            for i, (similarity, idx) in enumerate(zip(similarities[0], indices[0])):
-                if similarity >= min_similarity and idx < len(self.chunks):
+            for i, (similarity, idx) in enumerate(zip(query_similarities, query_indices)):
+                if similarity >= min_similarity and 0 <= idx < len(self.chunks):
                     result = self.chunks[idx].copy()
                     result['similarity'] = float(similarity)
                     result['rank'] = i + 1
+                    result['vector_id'] = int(idx)
                     results.append(result)
+            all_results.append(results)
+        
+        return all_results
+    
+    def lexical_search(self, query: str, top_k: int = 20) -> List[Tuple[int, float]]:
+        """
+        Search the BM25 index for exact term matches.
+        
+        Args:
+            query: Search query string
+            top_k: Number of top results to return
             
-            return results
-            
-        except Exception as e:
-            print(f"Error during search: {e}")
+        Returns:
+            List of (vector_id, bm25_score) tuples, best first
+        """
+        if self.lexical_index is None:
             return []
+        return self.lexical_index.search(query, top_k)
+    
+    def get_embeddings(self, vector_ids: List[int]) -> np.ndarray:
+        """
+        Fetch stored (normalized) embeddings for the given vector ids.
+        
+        Args:
+            vector_ids: Row ids in the FAISS index
+            
+        Returns:
+            Numpy array of shape (len(vector_ids), dimension)
+        """
+        embeddings = np.empty((len(vector_ids), self.dimension), dtype='float32')
+        for row, vector_id in enumerate(vector_ids):
+            embeddings[row] = self.index.reconstruct(int(vector_id))
+        return embeddings
+    
+    def get_centroid(self) -> Optional[np.ndarray]:
+        """
+        Get the normalized mean of all stored embeddings.
+        
+        Returns:
+            Numpy array of shape (dimension,), or None if the index is empty
+        """
+        if self._centroid is None and self.index is not None and self.index.ntotal > 0:
+            centroid = self.index.reconstruct_n(0, self.index.ntotal).mean(axis=0)
+            self._centroid = (centroid / np.linalg.norm(centroid)).astype('float32')
+        return self._centroid
     
     def save(self, save_path: str) -> bool:
         """
@@ -152,6 +287,10 @@ class VectorStore:
             with open(save_path / "metadata.json", 'w') as f:
                 json.dump(self.metadata, f, indent=2)
             
+            # Save BM25 index next to the FAISS index
+            if self.lexical_index is not None:
+                self.lexical_index.save(str(save_path / "lexical"))
+            
             print(f"Vector store saved to {save_path}")
             return True
             
@@ -159,12 +298,14 @@ class VectorStore:
             print(f"Error saving vector store: {e}")
             return False
     
-    def load(self, load_path: str) -> bool:
+    def load(self, load_path: str, mmap_index: bool = False) -> bool:
         """
         Load the vector store from disk.
         
         Args:
             load_path: Directory path to load the vector store from
+            mmap_index: Memory-map the FAISS index read-only instead of copying it
+                into memory, so forked processes share one copy through the page cache
             
         Returns:
             True if successful, False otherwise
@@ -181,8 +322,13 @@ class VectorStore:
                 print(f"Vector store files not found in {load_path}")
                 return False
             
-            # Load FAISS index
-            self.index = faiss.read_index(str(index_file))
+            # Load FAISS index; IO_FLAG_MMAP_IFC maps flat indexes (faiss >= 1.8)
+            mmap_flag = getattr(faiss, 'IO_FLAG_MMAP_IFC', None)
+            if mmap_index and mmap_flag is not None:
+                self.index = faiss.read_index(str(index_file), mmap_flag | faiss.IO_FLAG_READ_ONLY)
+            else:
+                self.index = faiss.read_index(str(index_file))
+            self._centroid = None
             
             # Load chunks
             with open(chunks_file, 'rb') as f:
@@ -191,6 +337,18 @@ class VectorStore:
             # Load metadata
             with open(metadata_file, 'r') as f:
                 self.metadata = json.load(f)
+            self.dimension = self.metadata.get('dimension', self.index.d)
+            
+            # Stores built before versioning are identified by size and build time
+            self.version = self.metadata.get(
+                'version', f"{len(self.chunks)}-{int(index_file.stat().st_mtime)}"
+            )
+            
+            # Memory-map the BM25 index; stores built before it existed get
+            # an in-memory index built from their chunks
+            self.lexical_index = LexicalIndex()
+            if not self.lexical_index.load(str(load_path / "lexical")):
+                self.lexical_index.build([chunk['text'] for chunk in self.chunks])
             
             print(f"Vector store loaded from {load_path}")
             print(f"Loaded {len(self.chunks)} chunks")
@@ -211,7 +369,9 @@ class VectorStore:
             'total_chunks': len(self.chunks),
             'model_name': self.model_name,
             'dimension': self.dimension,
-            'index_built': self.index is not None
+            'version': self.version,
+            'index_built': self.index is not None,
+            'lexical_index_built': self.lexical_index is not None
         }
         
         if self.chunks:
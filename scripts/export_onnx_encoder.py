@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Export the SHAKTI-AI embedding model to ONNX for the CPU encoder backend.
+
+Writes model.onnx, tokenizer.json and (with --quantize) a dynamically
+int8-quantized model_int8.onnx, then checks that the exported encoders
+match the sentence-transformers model on sample texts.
+
+Needs the export-time extras: torch, transformers, sentence-transformers,
+onnx and onnxruntime. Serving needs only onnxruntime and tokenizers.
+
+Usage:
+    python scripts/export_onnx_encoder.py [--output DIR] [--quantize]
+Then set EMBEDDING_BACKEND=onnx (and EMBEDDING_QUANTIZED=true for int8).
+"""
+
+import sys
+import inspect
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from knowledge_base.encoders import (
+    DEFAULT_MODEL_NAME, DEFAULT_ONNX_DIR, ONNX_MODEL_FILE, ONNX_QUANTIZED_MODEL_FILE,
+    OnnxEncoder, SentenceTransformerEncoder
+)
+
+SAMPLE_TEXTS = [
+    "Is spotting normal in early pregnancy?",
+    "What are my rights if my employer harasses me at work?",
+    "How can I manage anxiety after a traumatic experience?",
+    "Menopause symptoms and hormonal changes in women over fifty.",
+    "Iron-rich foods help prevent anaemia during pregnancy. Take supplements as advised by your doctor.",
+]
+
+
+def export_model(model_name: str, output_dir: Path):
+    """Export the transformer and tokenizer to ONNX."""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name)
+    model.eval()
+
+    tokenizer.save_pretrained(str(output_dir))
+
+    dummy = tokenizer(["export example"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in dummy]
+    dynamic_axes = {name: {0: "batch", 1: "tokens"} for name in input_names}
+    dynamic_axes["token_embeddings"] = {0: "batch", 1: "tokens"}
+
+    class TokenEmbeddings(torch.nn.Module):
+        """Passes the inputs by name; forward()'s positional order differs between transformers versions."""
+
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs)))[0]
+
+    # Recent torch defaults to the dynamo exporter, which needs onnxscript and
+    # takes dynamic shapes differently; keep the TorchScript exporter
+    legacy = {'dynamo': False} if 'dynamo' in inspect.signature(torch.onnx.export).parameters else {}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            TokenEmbeddings(model),
+            tuple(dummy[name] for name in input_names),
+            str(output_dir / ONNX_MODEL_FILE),
+            input_names=input_names,
+            output_names=["token_embeddings"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+            **legacy
+        )
+    print(f"✅ Exported {model_name} to {output_dir / ONNX_MODEL_FILE}")
+
+
+def quantize_model(output_dir: Path):
+    """Quantize the exported model's weights to int8."""
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    quantize_dynamic(
+        str(output_dir / ONNX_MODEL_FILE),
+        str(output_dir / ONNX_QUANTIZED_MODEL_FILE),
+        weight_type=QuantType.QInt8
+    )
+    print(f"✅ Quantized model written to {output_dir / ONNX_QUANTIZED_MODEL_FILE}")
+
+
+def check_compatibility(model_name: str, output_dir: Path, quantized: bool) -> float:
+    """Report the lowest cosine similarity between ONNX and PyTorch embeddings."""
+    reference = SentenceTransformerEncoder(model_name).encode(SAMPLE_TEXTS)
+    reference /= np.linalg.norm(reference, axis=1, keepdims=True)
+
+    encoder = OnnxEncoder(str(output_dir), model_name, quantized=quantized)
+    embeddings = encoder.encode(SAMPLE_TEXTS)
+
+    min_cosine = float((reference * embeddings).sum(axis=1).min())
+    label = "int8" if quantized else "fp32"
+    print(f"📊 {label} export: minimum cosine similarity to PyTorch = {min_cosine:.4f}")
+    return min_cosine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX")
+    parser.add_argument("--model", default=DEFAULT_MODEL_NAME, help="Sentence transformer model name")
+    parser.add_argument("--output", default=str(DEFAULT_ONNX_DIR), help="Output directory")
+    parser.add_argument("--quantize", action="store_true", help="Also write an int8-quantized model")
+    args = parser.parse_args()
+
+    output_dir = Path(args.output)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    print("🧬 SHAKTI-AI ONNX Encoder Export")
+    print("=" * 40)
+
+    export_model(args.model, output_dir)
+    check_compatibility(args.model, output_dir, quantized=False)
+
+    if args.quantize:
+        quantize_model(output_dir)
+        check_compatibility(args.model, output_dir, quantized=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Pre-fork server for the SHAKTI-AI backend service.
+
+Loads the read-only knowledge base (memory-mapped FAISS indexes, chunks,
+BM25 postings) and the embedding model once in the parent, then forks
+uvicorn workers that share those pages copy-on-write. See
+docs/PREFORK_SERVING.md.
+
+Usage:
+    python serve_prefork.py --workers 4 --host 0.0.0.0 --port 8000
+"""
+
+import os
+import gc
+import sys
+import time
+import signal
+import socket
+import logging
+import argparse
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("serve_prefork")
+
+
+def preload():
+    """
+    Load read-only state in the parent before forking.
+
+    Nothing that starts threads or network clients may run here: thread
+    pools (reranker executor, ONNX Runtime, torch intra-op threads) and
+    gRPC channels (Gemini) do not survive fork, so workers create those
+    themselves after forking.
+    """
+    started = time.perf_counter()
+
+    # Map the FAISS indexes from the page cache instead of copying them
+    os.environ.setdefault('FAISS_MMAP', 'true')
+
+    from knowledge_base.retriever import get_shared_retriever
+    retriever = get_shared_retriever()
+    for vector_store in retriever.agent_stores.values():
+        vector_store.get_centroid()
+
+    # Loading torch weights is fork-safe as long as no inference has run
+    if os.getenv('EMBEDDING_BACKEND', 'sentence-transformers').lower() == 'sentence-transformers' \
+            and os.getenv('PREFORK_PRELOAD_ENCODER', 'true').lower() in ('1', 'true', 'yes'):
+        from knowledge_base.encoders import get_encoder
+        get_encoder()
+
+    import backend_service  # noqa: F401  (imports the app without heavy components)
+
+    # Move everything loaded so far out of the garbage collector's reach, so
+    # collections in the workers do not write to (and so copy) shared pages
+    gc.collect()
+    gc.freeze()
+
+    logger.info(f"Preloaded {len(retriever.agent_stores)} knowledge bases in {time.perf_counter() - started:.2f}s")
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """Bind the listening socket shared by all workers."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(sock: socket.socket, log_level: str):
+    """Serve the app on the inherited socket (runs in the forked child)."""
+    import uvicorn
+    from backend_service import app
+
+    config = uvicorn.Config(app, log_level=log_level)
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork server for the SHAKTI-AI backend")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "2")))
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    sock = bind_socket(args.host, args.port)
+    preload()
+
+    workers = {}
+    shutting_down = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                run_worker(sock, args.log_level)
+            finally:
+                os._exit(0)
+        workers[pid] = time.monotonic()
+        logger.info(f"Started worker {pid}")
+
+    def shutdown(signum, frame):
+        nonlocal shutting_down
+        shutting_down = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    for _ in range(args.workers):
+        spawn()
+    logger.info(f"Serving on http://{args.host}:{args.port} with {args.workers} workers")
+
+    # Supervise: restart workers that die, until asked to stop
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+
+        started = workers.pop(pid, None)
+        if started is None:
+            continue
+        if shutting_down:
+            logger.info(f"Worker {pid} stopped")
+            continue
+
+        logger.warning(f"Worker {pid} exited with status {status}; restarting")
+        # Avoid a tight restart loop when workers crash on startup
+        if time.monotonic() - started < 1.0:
+            time.sleep(1.0)
+        spawn()
+
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
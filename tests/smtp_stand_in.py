@@ -0,0 +1,126 @@
+"""
+Local SMTP server for email tests.
+
+Speaks enough ESMTP for smtplib (EHLO, AUTH PLAIN, NOOP, MAIL, RCPT, DATA,
+RSET, QUIT) on a random localhost port, records what it receives, and can
+drop connections or refuse messages to exercise reconnects and retries.
+"""
+
+import base64
+import socket
+import threading
+import socketserver
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server.stand_in
+        server._track(self.request)
+        self.reply("220 localhost stand-in ESMTP")
+        mail_from, rcpt_tos = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip()
+            verb = command.split(' ', 1)[0].upper()
+            argument = command[len(verb):].strip()
+
+            if verb == 'EHLO':
+                self.reply("250-localhost")
+                self.reply("250 AUTH PLAIN")
+            elif verb == 'HELO':
+                self.reply("250 localhost")
+            elif verb == 'AUTH':
+                credentials = base64.b64decode(argument.split()[-1]).split(b'\0')
+                if credentials[-1].decode() != server.password:
+                    self.reply("535 Authentication failed")
+                    continue
+                server.logins += 1
+                self.reply("235 Authentication successful")
+            elif verb == 'NOOP':
+                server.noops += 1
+                self.reply("250 OK")
+            elif verb == 'MAIL':
+                mail_from, rcpt_tos = argument.split(':', 1)[1].strip('<> '), []
+                self.reply("250 OK")
+            elif verb == 'RCPT':
+                address = argument.split(':', 1)[1].strip('<> ')
+                if address in server.refused:
+                    self.reply("550 No such user")
+                else:
+                    rcpt_tos.append(address)
+                    self.reply("250 OK")
+            elif verb == 'DATA':
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data in (b".\r\n", b".\n"):
+                        break
+                    lines.append(data)
+                if server.temporary_failures:
+                    server.temporary_failures -= 1
+                    self.reply("451 Try again later")
+                else:
+                    server.messages.append((mail_from, rcpt_tos, b"".join(lines).decode()))
+                    self.reply("250 Queued")
+            elif verb == 'RSET':
+                mail_from, rcpt_tos = None, []
+                self.reply("250 OK")
+            elif verb == 'QUIT':
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class LocalSMTPServer:
+    """SMTP server on 127.0.0.1 running in a background thread; use as a context manager."""
+
+    def __init__(self, password="secret"):
+        self.password = password
+        self.messages = []
+        self.refused = set()
+        self.temporary_failures = 0
+        self.logins = 0
+        self.noops = 0
+        self.connections = 0
+        self._sockets = []
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.stand_in = self
+        self.host, self.port = self._server.server_address
+
+    def _track(self, sock):
+        with self._lock:
+            self.connections += 1
+            self._sockets.append(sock)
+
+    def drop_connections(self):
+        """Close every open client connection, as a server timing out idle sessions would."""
+        with self._lock:
+            sockets, self._sockets = self._sockets, []
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.drop_connections()
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,95 @@
+"""
+Test embedding-based routing of queries to agents.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.router import AgentRouter
+
+# Tiny 3-dimensional "embedding space": one axis per topic
+TOPIC_VECTORS = {
+    "pregnancy": [1.0, 0.0, 0.0],
+    "childbirth": [0.9, 0.1, 0.0],
+    "anxiety": [0.0, 1.0, 0.0],
+    "trauma": [0.1, 0.9, 0.0],
+    "property rights": [0.0, 0.0, 1.0],
+}
+
+
+class TopicRetriever:
+    """Retriever stand-in with fixed agent centroids and a topic encoder."""
+
+    centroids = {
+        "maaya": [1.0, 0.1, 0.0],
+        "meher": [0.1, 1.0, 0.0],
+        "nyaya": [0.0, 0.1, 1.0],
+    }
+
+    def get_agent_centroid(self, agent_name):
+        centroid = np.array(self.centroids[agent_name], dtype='float32')
+        return centroid / np.linalg.norm(centroid)
+
+    def encode_texts(self, texts):
+        vectors = np.array([TOPIC_VECTORS.get(text, [0.3, 0.3, 0.3]) for text in texts], dtype='float32')
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+AGENT_INFO = {
+    "maternal": {"specialties": ["pregnancy", "childbirth"]},
+    "mental": {"specialties": ["anxiety", "trauma"]},
+    "legal": {"specialties": ["property rights"]},
+}
+KB_NAMES = {"maternal": "maaya", "mental": "meher", "legal": "nyaya"}
+
+
+def make_router():
+    return AgentRouter(TopicRetriever(), AGENT_INFO, KB_NAMES)
+
+
+def embed(vector):
+    vector = np.array(vector, dtype='float32')
+    return vector / np.linalg.norm(vector)
+
+
+def test_clear_query_routes_to_one_agent():
+    """A query squarely in one topic goes to that agent only."""
+    routing = make_router().route("I feel constant anxiety", embed([0.05, 1.0, 0.0]))
+
+    assert routing['agents'] == ["mental"]
+    assert not routing['fallback']
+    assert routing['confidence'] >= 0.8
+
+
+def test_query_between_two_topics_routes_to_both():
+    """A query spanning two topics goes to both agents, best first."""
+    routing = make_router().route("trauma after childbirth", embed([1.0, 0.95, 0.0]))
+
+    assert sorted(routing['agents']) == ["maternal", "mental"]
+    assert not routing['fallback']
+
+
+def test_unrelated_query_falls_back_to_all_agents():
+    """A query that matches no agent well is sent to every agent."""
+    routing = make_router().route("hello", embed([-1.0, -1.0, -1.0]))
+
+    assert routing['fallback']
+    assert routing['agents'] == list(AGENT_INFO.keys())
+
+
+if __name__ == "__main__":
+    print("🧭 Testing agent router")
+    print("=" * 40)
+
+    for test in [test_clear_query_routes_to_one_agent, test_query_between_two_topics_routes_to_both,
+                 test_unrelated_query_falls_back_to_all_agents]:
+        test()
+        print(f"✅ {test.__name__}")
+
+    print("\n🎉 Agent router tests passed!")
@@ -0,0 +1,82 @@
+"""
+Test the semantic answer cache for near-duplicate questions.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.answer_cache import SemanticAnswerCache, age_bucket
+
+
+def unit(vector):
+    vector = np.asarray(vector, dtype='float32')
+    return vector / np.linalg.norm(vector)
+
+
+QUERY = unit([1.0, 0.0, 0.0])
+PARAPHRASE = unit([0.99, 0.05, 0.0])
+DIFFERENT = unit([0.0, 1.0, 0.0])
+
+
+def test_paraphrase_hits_and_different_query_misses():
+    """Near-duplicate queries reuse the answer; unrelated ones do not."""
+    cache = SemanticAnswerCache(similarity_threshold=0.95)
+    cache.store(['maternal'], 25, QUERY, "cached answer", [{'document': 'WHO'}], kb_version="v1")
+
+    hit = cache.lookup(['maternal'], 27, PARAPHRASE, kb_version="v1")
+    assert hit['response'] == "cached answer"
+    assert hit['sources'] == [{'document': 'WHO'}]
+
+    assert cache.lookup(['maternal'], 25, DIFFERENT, kb_version="v1") is None
+    assert cache.get_stats()['hits'] == 1
+    assert cache.get_stats()['misses'] == 1
+
+
+def test_agent_set_and_age_bucket_are_part_of_the_key():
+    """The same query for other agents or another age group is a miss."""
+    cache = SemanticAnswerCache()
+    cache.store(['maternal', 'mental'], 25, QUERY, "answer", [], kb_version="v1")
+
+    assert cache.lookup(['mental', 'maternal'], 25, QUERY, kb_version="v1") is not None
+    assert cache.lookup(['maternal'], 25, QUERY, kb_version="v1") is None
+    assert cache.lookup(['maternal', 'mental'], 15, QUERY, kb_version="v1") is None
+    assert age_bucket(15) != age_bucket(25)
+
+
+def test_ttl_lru_and_version_invalidation():
+    """Entries expire, are evicted LRU-first and vanish on a new knowledge base version."""
+    cache = SemanticAnswerCache(ttl_seconds=0.05, max_entries=2)
+    cache.store(['legal'], None, QUERY, "old", [], kb_version="v1")
+    time.sleep(0.1)
+    assert cache.lookup(['legal'], None, QUERY, kb_version="v1") is None
+    assert cache.get_stats()['expirations'] == 1
+
+    cache = SemanticAnswerCache(max_entries=2)
+    cache.store(['legal'], None, QUERY, "a", [], kb_version="v1")
+    cache.store(['mental'], None, QUERY, "b", [], kb_version="v1")
+    cache.store(['maternal'], None, QUERY, "c", [], kb_version="v1")
+    assert cache.lookup(['legal'], None, QUERY, kb_version="v1") is None
+    assert cache.get_stats()['evictions'] == 1
+
+    assert cache.lookup(['mental'], None, QUERY, kb_version="v2") is None
+    assert cache.get_stats()['entries'] == 0
+    assert cache.get_stats()['invalidations'] == 1
+
+
+if __name__ == "__main__":
+    print("🔍 Testing semantic answer cache")
+    print("=" * 40)
+
+    for test in [test_paraphrase_hits_and_different_query_misses, test_agent_set_and_age_bucket_are_part_of_the_key,
+                 test_ttl_lru_and_version_invalidation]:
+        test()
+        print(f"✅ {test.__name__}")
+
+    print("\n🎉 Answer cache tests passed!")
@@ -0,0 +1,275 @@
+"""
+Test the async Wishes Vault layer on the SQLite backend
+(database/sqlite_backend.py), which stands in for the asyncpg pool.
+"""
+
+import sys
+import json
+import pickle
+import asyncio
+from pathlib import Path
+
+import pytest
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from cryptography.fernet import Fernet
+from database.encryption import WishCipher, LazyWish, start_decrypt_metrics
+from database.async_wishes_db import AsyncWishesDatabase
+from database.sqlite_backend import AsyncSQLitePool
+
+
+class CountingPool(AsyncSQLitePool):
+    """The SQLite pool the vault ships with, counting connection checkouts."""
+
+    acquired = 0
+
+    def acquire(self):
+        self.acquired += 1
+        return super().acquire()
+
+
+@pytest.fixture
+def vault(tmp_path):
+    return AsyncWishesDatabase(pool=CountingPool(str(tmp_path / "vault.sqlite3")),
+                               cipher=WishCipher(Fernet.generate_key()), backend='sqlite')
+
+
+def test_save_and_get_round_trip(vault):
+    async def run():
+        wish_id = await vault.save_wish("user_1", "Keep my garden green", contact_name="Asha",
+                                        sharing_preferences={"category": "personal"})
+        await vault.save_wish("user_2", "Someone else's wish")
+        return wish_id, await vault.get_wishes("user_1")
+
+    wish_id, wishes = asyncio.run(run())
+
+    assert len(wishes) == 1
+    assert wishes[0]['id'] == wish_id
+    assert wishes[0]['content'] == "Keep my garden green"
+    assert wishes[0]['sharing_preferences'] == {"category": "personal"}
+    assert 'encrypted_content' not in wishes[0]
+
+
+def test_content_is_stored_with_the_shared_cipher(vault):
+    async def run():
+        await vault.save_wish("user_1", "secret")
+        async with vault.connection() as conn:
+            return await conn.fetchval("SELECT encrypted_content FROM wishes")
+
+    stored = asyncio.run(run())
+
+    assert b"secret" not in stored
+    # The sync layer decrypts the same bytes with the same key
+    assert WishCipher(vault.cipher.key).decrypt(stored) == "secret"
+
+
+def test_update_and_delete_are_scoped_to_the_owner(vault):
+    async def run():
+        wish_id = await vault.save_wish("user_1", "first draft")
+        results = {
+            'other_user_update': await vault.update_wish(wish_id, "user_2", content="hijacked"),
+            'owner_update': await vault.update_wish(wish_id, "user_1", content="final", contact_name="Ravi"),
+            'other_user_delete': await vault.delete_wish(wish_id, "user_2"),
+        }
+        results['after_update'] = await vault.get_wishes("user_1")
+        results['owner_delete'] = await vault.delete_wish(wish_id, "user_1")
+        results['after_delete'] = await vault.get_wishes("user_1")
+        return results
+
+    results = asyncio.run(run())
+
+    assert results['other_user_update'] is False
+    assert results['owner_update'] is True
+    assert results['other_user_delete'] is False
+    assert results['after_update'][0]['content'] == "final"
+    assert results['after_update'][0]['contact_name'] == "Ravi"
+    assert results['owner_delete'] is True
+    assert results['after_delete'] == []
+
+
+def test_sharing_history(vault):
+    async def run():
+        wish_id = await vault.save_wish("user_1", "share me", contact_name="Asha")
+        assert await vault.log_sharing(wish_id, "asha@example.com", "email", user_id="user_1")
+        return await vault.get_sharing_history("user_1")
+
+    history = asyncio.run(run())
+
+    assert len(history) == 1
+    assert history[0]['shared_with'] == "asha@example.com"
+    assert history[0]['contact_name'] == "Asha"
+
+
+def test_sharing_history_is_written_in_batches(vault):
+    async def run():
+        wish_id = await vault.save_wish("user_1", "share me")
+        for number in range(5):
+            await vault.log_sharing(wish_id, f"friend{number}@example.com", "email", user_id="user_1")
+        queued = vault.history_writer.get_stats()['pending']
+        history = await vault.get_sharing_history("user_1")
+        await vault.close()
+        return queued, history
+
+    queued, history = asyncio.run(run())
+
+    assert queued == 5
+    assert len(history) == 5
+    assert vault.history_writer.get_stats()['batches'] == 1
+
+
+def test_get_wish_by_id_is_scoped_to_active_owner_wishes(vault):
+    async def run():
+        wish_id = await vault.save_wish("user_1", "only mine", contact_name="Asha")
+        found = await vault.get_wish_by_id(wish_id, "user_1")
+        other_user = await vault.get_wish_by_id(wish_id, "user_2")
+        await vault.delete_wish(wish_id, "user_1")
+        deleted = await vault.get_wish_by_id(wish_id, "user_1")
+        return found, other_user, deleted
+
+    found, other_user, deleted = asyncio.run(run())
+
+    assert found['content'] == "only mine"
+    assert found['contact_name'] == "Asha"
+    assert other_user is None
+    assert deleted is None
+
+
+def test_keyset_pages_cover_every_wish_once(vault):
+    async def run():
+        ids = [await vault.save_wish("user_1", f"wish {number}") for number in range(45)]
+        pages, cursor = [], None
+        while True:
+            page = await vault.list_wishes("user_1", page_size=20, cursor=cursor)
+            pages.append(page['wishes'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                return ids, pages
+
+    ids, pages = asyncio.run(run())
+
+    # Rows created within the same second are ordered by id
+    assert [len(page) for page in pages] == [20, 20, 5]
+    assert [wish['id'] for page in pages for wish in page] == sorted(ids, reverse=True)
+
+
+def test_list_projection_skips_decryption(vault):
+    async def run():
+        for number in range(3):
+            await vault.save_wish("user_1", f"private {number}", contact_name="Title only")
+        summary_metrics = start_decrypt_metrics()
+        summary = await vault.list_wishes("user_1")
+        full_metrics = start_decrypt_metrics()
+        full = await vault.list_wishes("user_1", include_content=True)
+        return summary, summary_metrics, full, full_metrics
+
+    summary, summary_metrics, full, full_metrics = asyncio.run(run())
+
+    assert summary['wishes'][0]['contact_name'] == "Title only"
+    assert 'content' not in summary['wishes'][0]
+    assert summary_metrics['rows'] == 0
+    assert [wish['content'] for wish in full['wishes']] == ["private 2", "private 1", "private 0"]
+    assert full_metrics['rows'] == 3
+
+
+def test_content_is_decrypted_only_when_read(vault):
+    async def run():
+        await vault.save_wish("user_1", "later", contact_name="Asha")
+        metrics = start_decrypt_metrics()
+        wishes = await vault.get_wishes("user_1")
+        before = metrics['rows']
+        title = wishes[0]['contact_name']
+        content = wishes[0]['content']
+        return wishes[0], before, title, content, metrics
+
+    wish, before, title, content, metrics = asyncio.run(run())
+
+    assert before == 0
+    assert title == "Asha"
+    assert content == "later"
+    assert metrics['rows'] == 1
+    # Later reads and serialization reuse the decrypted value
+    assert dict(wish)['content'] == "later"
+    assert metrics['rows'] == 1
+
+
+def test_lazy_wish_behaves_like_a_dict():
+    cipher = WishCipher(Fernet.generate_key())
+    wish = LazyWish({'id': 1, 'encrypted_content': cipher.encrypt("hello")}, cipher)
+
+    assert 'content' in wish and len(wish) == 2
+    assert not wish.decrypted
+    assert json.loads(json.dumps(wish)) == {'id': 1, 'content': "hello"}
+    assert wish.decrypted
+    assert pickle.loads(pickle.dumps(wish)) == {'id': 1, 'content': "hello"}
+
+
+def test_batch_decryption_on_a_thread_pool():
+    cipher = WishCipher(Fernet.generate_key(), threads=4, parallel_min=8)
+    tokens = [cipher.encrypt(f"wish {number}") for number in range(50)] + [None, b"corrupt"]
+
+    assert cipher.decrypt_many(tokens) == [f"wish {number}" for number in range(50)] + [None, None]
+
+
+def test_malformed_cursor_is_rejected(vault):
+    with pytest.raises(ValueError):
+        asyncio.run(vault.list_wishes("user_1", cursor="not-a-cursor"))
+
+
+def test_endpoints_use_the_async_layer(vault, monkeypatch):
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+    import backend_service
+
+    monkeypatch.setattr(backend_service, "wishes_db", vault)
+    client = TestClient(backend_service.app)
+
+    created = client.post("/api/wishes/create", json={"title": "Garden", "content": "Water the roses"})
+    assert created.status_code == 200
+
+    listed = client.get("/api/wishes/list").json()["wishes"]
+    assert [wish["title"] for wish in listed] == ["Garden"]
+    assert "Water the roses" in listed[0]["content"]
+    assert vault._pool.acquired >= 2
+
+    summary = client.get("/api/wishes/list", params={"include_content": "false", "page_size": 1}).json()
+    assert "content" not in summary["wishes"][0]
+    assert summary["next_cursor"] is None
+    assert client.get(f"/api/wishes/{summary['wishes'][0]['id']}").json()["wish"]["content"] == listed[0]["content"]
+    assert client.get("/api/wishes/list", params={"cursor": "bogus"}).status_code == 400
+
+    # Decryption time is reported per request
+    assert 'desc="1 rows"' in client.get("/api/wishes/list").headers["Server-Timing"]
+    assert "Server-Timing" not in client.get("/api/wishes/list", params={"include_content": "false"}).headers
+
+
+def test_share_finds_wishes_beyond_the_newest_hundred(vault, monkeypatch):
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+    import backend_service
+
+    async def fill():
+        ids = []
+        for number in range(120):
+            ids.append(await vault.save_wish("default_user", f"wish {number}", contact_name=f"Wish {number}"))
+        return ids
+
+    ids = asyncio.run(fill())
+    monkeypatch.setattr(backend_service, "wishes_db", vault)
+    client = TestClient(backend_service.app)
+
+    response = client.post("/api/wishes/share", json={
+        "wish_id": ids[0], "method": "whatsapp", "recipient": "+91 98765 43210"
+    })
+
+    assert response.status_code == 200, response.text
+    assert "wish%200" in response.json()["whatsapp_url"]
+    assert client.post("/api/wishes/share", json={
+        "wish_id": 10_000, "method": "whatsapp", "recipient": "+91 98765 43210"
+    }).status_code == 404
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,64 @@
+"""
+Test the circuit breaker that guards Gemini calls.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from utils.circuit_breaker import CircuitBreaker
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=60)
+
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+
+    assert breaker.get_state()['state'] == "open"
+    assert not breaker.allow()
+    assert breaker.get_state()['rejected'] == 1
+
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.get_state()['state'] == "closed"
+
+
+def test_half_open_trial_closes_or_reopens():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+
+    # Only one trial call is let through
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.get_state()['state'] == "open"
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.get_state()['state'] == "closed"
+
+
+if __name__ == "__main__":
+    print("🔌 Testing circuit breaker")
+    print("=" * 40)
+
+    for test in [test_opens_after_consecutive_failures, test_success_resets_failure_count,
+                 test_half_open_trial_closes_or_reopens]:
+        test()
+        print(f"✅ {test.__name__}")
+
+    print("\n🎉 Circuit breaker tests passed!")
@@ -0,0 +1,160 @@
+"""
+Test the Wishes Vault connection pool with in-memory fake connections.
+"""
+
+import sys
+import time
+import threading
+from pathlib import Path
+
+import pytest
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from database.connection_pool import ConnectionPool, PoolTimeoutError
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, query, params=None):
+        if self.conn.broken:
+            raise ConnectionError("server closed the connection")
+        self.conn.queries.append(query)
+
+    def fetchone(self):
+        return (1,)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.queries = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        if self.broken:
+            raise ConnectionError("server closed the connection")
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+
+class FakeConnector:
+    def __init__(self):
+        self.connections = []
+
+    def __call__(self, **kwargs):
+        conn = FakeConnection()
+        self.connections.append(conn)
+        return conn
+
+
+def make_pool(**options):
+    connector = FakeConnector()
+    pool = ConnectionPool({'host': 'fake'}, connect=connector, **options)
+    return pool, connector
+
+
+def test_connections_are_reused():
+    pool, connector = make_pool(min_size=1, max_size=3)
+
+    for _ in range(5):
+        with pool.connection() as conn:
+            conn.cursor().execute("SELECT now();")
+
+    assert len(connector.connections) == 1
+    assert connector.connections[0].commits == 5
+    assert pool.get_status()['reused'] == 5
+
+
+def test_error_rolls_back_and_reraises():
+    pool, connector = make_pool(min_size=1)
+
+    with pytest.raises(ValueError):
+        with pool.connection() as conn:
+            raise ValueError("bad input")
+
+    conn = connector.connections[0]
+    assert conn.commits == 0
+    assert conn.rollbacks >= 1
+    assert pool.get_status()['idle'] == 1
+
+
+def test_broken_connection_is_replaced_on_checkout():
+    pool, connector = make_pool(min_size=1, health_check_after=0)
+    connector.connections[0].broken = True
+
+    with pool.connection() as conn:
+        pass
+
+    assert conn is connector.connections[1]
+    assert connector.connections[0].closed
+    assert pool.get_status()['failed_checks'] == 1
+
+
+def test_old_connections_are_retired():
+    pool, connector = make_pool(min_size=1, max_lifetime=0.01)
+    time.sleep(0.02)
+
+    with pool.connection() as conn:
+        pass
+
+    assert conn is connector.connections[1]
+    assert connector.connections[0].closed
+
+
+def test_checkout_waits_and_times_out_at_max_size():
+    pool, _ = make_pool(min_size=0, max_size=1)
+    held = pool.getconn()
+
+    with pytest.raises(PoolTimeoutError):
+        pool.getconn(timeout=0.05)
+
+    # A connection returned while waiting is handed over
+    threading.Timer(0.05, pool.putconn, args=(held,)).start()
+    assert pool.getconn(timeout=2) is held
+
+
+def test_concurrent_use_stays_within_max_size():
+    pool, connector = make_pool(min_size=0, max_size=4)
+    in_use, peak, lock = [0], [0], threading.Lock()
+
+    def work():
+        for _ in range(20):
+            with pool.connection():
+                with lock:
+                    in_use[0] += 1
+                    peak[0] = max(peak[0], in_use[0])
+                time.sleep(0.001)
+                with lock:
+                    in_use[0] -= 1
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert peak[0] <= 4
+    assert len(connector.connections) <= 4
+    assert pool.get_status()['in_use'] == 0
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,134 @@
+"""
+Test token-budgeted packing of retrieved chunks into agent prompts.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from knowledge_base.context_packer import ContextPacker, TokenCounter
+
+
+class WordCounter(TokenCounter):
+    """Deterministic counter: one token per whitespace-separated word."""
+
+    def __init__(self):
+        self.method = 'words'
+
+    def count(self, text):
+        return len(text.split())
+
+
+def make_chunk(title, sentences, similarity):
+    return {'doc_title': title, 'text': ' '.join(sentences), 'similarity': similarity}
+
+
+def test_pack_respects_budget_and_order():
+    """Chunks are added best first until the budget is used."""
+    packer = ContextPacker(WordCounter(), separator="\n\n", min_chunk_tokens=3)
+    chunks = [
+        make_chunk('A', ['Iron rich foods help.'] * 5, 0.9),
+        make_chunk('B', ['Folic acid matters early.'] * 5, 0.8),
+    ]
+
+    packed = packer.pack(chunks, max_tokens=30)
+
+    assert packed['tokens_used'] <= 30
+    assert packed['chunks'][0]['doc_title'] == 'A'
+    assert packed['context'].startswith('[Source: A]')
+
+
+def test_overflowing_chunk_is_trimmed_at_sentence_boundary():
+    """A chunk that does not fit whole keeps only complete sentences."""
+    packer = ContextPacker(WordCounter(), min_chunk_tokens=3)
+    chunks = [make_chunk('A', ['One two three four.', 'Five six seven eight.', 'Nine ten eleven twelve.'], 0.9)]
+
+    packed = packer.pack(chunks, max_tokens=11)
+
+    assert packed['trimmed_chunks'] == 1
+    assert packed['chunks'][0]['text'] == 'One two three four. Five six seven eight.'
+    assert packed['tokens_used'] <= 11
+
+
+def test_chunk_too_large_to_trim_is_dropped():
+    """Chunks that cannot keep even one sentence are dropped, not cut mid-sentence."""
+    packer = ContextPacker(WordCounter(), min_chunk_tokens=3)
+    chunks = [make_chunk('A', [' '.join(['word'] * 50) + '.'], 0.9)]
+
+    packed = packer.pack(chunks, max_tokens=20)
+
+    assert packed['context'] == ''
+    assert packed['dropped_chunks'] == 1
+    assert packed['tokens_used'] == 0
+
+
+def test_trimming_counts_each_sentence_once():
+    """Trimming a long chunk stays linear in its length."""
+    class CountingWordCounter(WordCounter):
+        def __init__(self):
+            super().__init__()
+            self.words_counted = 0
+
+        def count(self, text):
+            self.words_counted += len(text.split())
+            return super().count(text)
+
+    counter = CountingWordCounter()
+    packer = ContextPacker(counter, min_chunk_tokens=3)
+    text = ' '.join(['One two three four.'] * 200)
+
+    trimmed = packer.trim_to_tokens(text, 600)
+
+    assert trimmed == ' '.join(['One two three four.'] * 150)
+    assert counter.words_counted <= 2 * 600 + 4
+
+
+def test_no_tokenizer_model_estimates_without_loading_anything(monkeypatch):
+    monkeypatch.delenv('GEMINI_TOKENIZER_MODEL', raising=False)
+    monkeypatch.setitem(sys.modules, 'sentencepiece', None)
+
+    counter = TokenCounter()
+
+    assert counter.method == 'estimate'
+    assert counter.count("x" * 10) == 3
+
+
+def test_local_tokenizer_model_counts_tokens(tmp_path):
+    sentencepiece = pytest.importorskip("sentencepiece")
+    corpus = tmp_path / "corpus.txt"
+    corpus.write_text("\n".join(["Iron rich foods help prevent anaemia during pregnancy."] * 50
+                                 + ["Folic acid before conception lowers the risk of defects."] * 50))
+    sentencepiece.SentencePieceTrainer.train(input=str(corpus), model_prefix=str(tmp_path / "tokenizer"),
+                                             vocab_size=40, minloglevel=2)
+
+    counter = TokenCounter(tokenizer_path=str(tmp_path / "tokenizer.model"))
+    text = "Iron rich foods help."
+
+    assert counter.method == 'gemini'
+    assert counter.count(text) == len(counter._sentencepiece.encode(text))
+
+
+def test_missing_tokenizer_falls_back_to_an_estimate_with_a_warning(tmp_path, capsys):
+    counter = TokenCounter(tokenizer_path=str(tmp_path / "missing.model"))
+
+    assert counter.method == 'estimate'
+    assert counter.count("x" * 10) == 3
+    assert "missing.model" in counter.fallback_reason
+    assert "estimating" in capsys.readouterr().out
+
+
+if __name__ == "__main__":
+    print("🔍 Testing context packing")
+    print("=" * 40)
+
+    for test in [test_pack_respects_budget_and_order, test_overflowing_chunk_is_trimmed_at_sentence_boundary,
+                 test_chunk_too_large_to_trim_is_dropped]:
+        test()
+        print(f"✅ {test.__name__}")
+
+    print("\n🎉 Context packing tests passed!")
@@ -0,0 +1,71 @@
+"""
+Test MMR selection and merging of adjacent chunks.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from knowledge_base.diversity import mmr_select, merge_adjacent_chunks
+
+
+def test_mmr_skips_near_duplicates():
+    """A near-duplicate of the top result should lose to a distinct one."""
+    embeddings = np.array([
+        [1.0, 0.0, 0.0],
+        [0.99, 0.14, 0.0],
+        [0.0, 1.0, 0.0],
+    ], dtype='float32')
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    relevance = np.array([1.0, 0.95, 0.6], dtype='float32')
+
+    assert mmr_select(embeddings, relevance, k=2, lambda_mult=0.5) == [0, 2]
+
+
+def test_adjacent_chunks_merge_into_one_span():
+    """Consecutive chunks of a document become one span without the overlap."""
+    results = [
+        {'id': 'chunk_4', 'text': 'Iron supplements help. Take them with vitamin C daily.', 'doc_filename': 'a.pdf',
+         'chunk_index': 4, 'similarity': 0.7, 'pages': [{'page_number': 2}], 'primary_page': 2},
+        {'id': 'chunk_9', 'text': 'Unrelated chunk from another part.', 'doc_filename': 'a.pdf',
+         'chunk_index': 9, 'similarity': 0.6, 'pages': [{'page_number': 5}], 'primary_page': 5},
+        {'id': 'chunk_3', 'text': 'Anaemia is common in pregnancy. Iron supplements help.', 'doc_filename': 'a.pdf',
+         'chunk_index': 3, 'similarity': 0.8, 'pages': [{'page_number': 1}, {'page_number': 2}], 'primary_page': 1},
+    ]
+
+    merged = merge_adjacent_chunks(results)
+
+    assert len(merged) == 2
+    span = merged[0]
+    assert span['merged_chunk_ids'] == ['chunk_3', 'chunk_4']
+    assert span['text'] == 'Anaemia is common in pregnancy. Iron supplements help. Take them with vitamin C daily.'
+    assert span['similarity'] == 0.8
+    assert [page['page_number'] for page in span['pages']] == [1, 2]
+    assert merged[1]['id'] == 'chunk_9'
+
+
+def test_chunks_from_different_documents_stay_separate():
+    """Matching chunk indexes in different documents must not merge."""
+    results = [
+        {'text': 'First document text here.', 'doc_filename': 'a.pdf', 'chunk_index': 1},
+        {'text': 'Second document text here.', 'doc_filename': 'b.pdf', 'chunk_index': 2},
+    ]
+
+    assert len(merge_adjacent_chunks(results)) == 2
+
+
+if __name__ == "__main__":
+    print("🔍 Testing diversity-aware selection")
+    print("=" * 40)
+
+    for test in [test_mmr_skips_near_duplicates, test_adjacent_chunks_merge_into_one_span,
+                 test_chunks_from_different_documents_stay_separate]:
+        test()
+        print(f"✅ {test.__name__}")
+
+    print("\n🎉 Diversity selection tests passed!")
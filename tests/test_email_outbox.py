@@ -0,0 +1,293 @@
+"""
+Test the email outbox against a local SMTP server: delivery, retries with
+backoff, permanent failures, durability across restarts, and the share
+endpoint queuing emails instead of sending them in the request.
+"""
+
+import sys
+import time
+import sqlite3
+import asyncio
+from pathlib import Path
+
+import pytest
+from cryptography.fernet import Fernet
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from smtp_stand_in import LocalSMTPServer
+from database.encryption import WishCipher
+from utils.smtp_pool import SMTPPool
+from utils.email_service import EmailService
+from utils.email_outbox import EmailOutbox, retry_delay
+
+MESSAGE = {"wish_id": 1, "recipient": "friend@example.com", "sender_name": "Asha",
+           "wish_title": "Garden", "wish_content": "Plant a neem tree for me", "shared_at": "2026-01-01T10:00:00"}
+
+
+@pytest.fixture
+def smtp_server():
+    with LocalSMTPServer() as server:
+        yield server
+
+
+@pytest.fixture
+def email_service(smtp_server, monkeypatch):
+    monkeypatch.setenv('SMTP_USER', "vault@example.com")
+    monkeypatch.setenv('SMTP_PASSWORD', smtp_server.password)
+    pool = SMTPPool(smtp_server.host, smtp_server.port, "vault@example.com", smtp_server.password,
+                    starttls=False, keepalive_interval=0)
+    service = EmailService(pool=pool)
+    yield service
+    service.close()
+
+
+def deliver_with(service):
+    def deliver(message):
+        service.deliver_wish_share_email(message["wish_content"], message["recipient"],
+                                         message["sender_name"], message["wish_title"])
+    return deliver
+
+
+def make_outbox(tmp_path, deliver, statuses, **kwargs):
+    async def on_status(message, status, error):
+        statuses.append(status)
+
+    kwargs.setdefault('base_delay', 0)
+    return EmailOutbox(deliver, on_status, path=str(tmp_path / "outbox.sqlite3"),
+                       cipher=WishCipher(key=Fernet.generate_key()), **kwargs)
+
+
+def test_retry_delay_doubles_up_to_the_cap():
+    for attempt, full in [(1, 30), (2, 60), (3, 120), (8, 3600)]:
+        delay = retry_delay(attempt, 30, 3600)
+        assert full / 2 <= delay <= full
+
+
+def test_queued_email_is_sent_and_removed(tmp_path, smtp_server, email_service):
+    statuses = []
+    outbox = make_outbox(tmp_path, deliver_with(email_service), statuses)
+
+    async def scenario():
+        await outbox.enqueue(MESSAGE)
+        assert await outbox.run_pending() == 1
+        return await outbox.get_status()
+
+    status = asyncio.run(scenario())
+    assert statuses == ['sent']
+    assert status['backlog'] == {}
+    assert [message[1] for message in smtp_server.messages] == [["friend@example.com"]]
+
+
+def test_temporary_failures_are_retried(tmp_path, smtp_server, email_service):
+    smtp_server.temporary_failures = 2
+    statuses = []
+    outbox = make_outbox(tmp_path, deliver_with(email_service), statuses)
+
+    async def scenario():
+        await outbox.enqueue(MESSAGE)
+        return await outbox.run_pending()
+
+    assert asyncio.run(scenario()) == 3
+    assert statuses == ['retrying', 'retrying', 'sent']
+    assert len(smtp_server.messages) == 1
+
+
+def test_retries_wait_for_the_backoff(tmp_path, smtp_server, email_service):
+    smtp_server.temporary_failures = 1
+    statuses = []
+    outbox = make_outbox(tmp_path, deliver_with(email_service), statuses, base_delay=60)
+
+    async def scenario():
+        await outbox.enqueue(MESSAGE)
+        await outbox.run_pending()
+        return await outbox.get_status()
+
+    assert asyncio.run(scenario())['backlog'] == {'queued': 1}
+    assert statuses == ['retrying']
+    assert smtp_server.messages == []
+
+
+def test_refused_recipient_fails_without_retry(tmp_path, smtp_server, email_service):
+    smtp_server.refused.add("friend@example.com")
+    statuses = []
+    outbox = make_outbox(tmp_path, deliver_with(email_service), statuses)
+
+    async def scenario():
+        await outbox.enqueue(MESSAGE)
+        await outbox.run_pending()
+        return await outbox.get_status()
+
+    assert asyncio.run(scenario())['backlog'] == {'failed': 1}
+    assert statuses == ['failed']
+
+
+def test_gives_up_after_max_attempts(tmp_path):
+    def unreachable(message):
+        raise ConnectionRefusedError("connection refused")
+
+    statuses = []
+    outbox = make_outbox(tmp_path, unreachable, statuses, max_attempts=3)
+
+    async def scenario():
+        await outbox.enqueue(MESSAGE)
+        await outbox.run_pending()
+        return await outbox.get_status()
+
+    assert asyncio.run(scenario())['backlog'] == {'failed': 1}
+    assert statuses == ['retrying', 'retrying', 'failed']
+
+
+def test_queue_survives_a_restart_and_is_encrypted(tmp_path, smtp_server, email_service):
+    statuses = []
+    first = make_outbox(tmp_path, deliver_with(email_service), statuses)
+    asyncio.run(first.enqueue(MESSAGE))
+
+    assert b"neem" not in (tmp_path / "outbox.sqlite3").read_bytes()
+
+    # Same file and key, new process: the email is still there
+    second = EmailOutbox(deliver_with(email_service), None, path=first.path, cipher=first.cipher)
+    assert asyncio.run(second.run_pending()) == 1
+    assert len(smtp_server.messages) == 1
+
+
+def test_abandoned_claims_are_taken_over_after_the_lease(tmp_path, smtp_server, email_service):
+    statuses = []
+    outbox = make_outbox(tmp_path, deliver_with(email_service), statuses, lease_seconds=0.05)
+    asyncio.run(outbox.enqueue(MESSAGE))
+    # A worker claims the email and dies before finishing
+    assert len(outbox._claim(10)) == 1
+    assert asyncio.run(outbox.run_pending()) == 0
+
+    time.sleep(0.1)
+    assert asyncio.run(outbox.run_pending()) == 1
+    assert statuses == ['sent']
+
+
+def test_close_waits_for_the_email_being_sent(tmp_path):
+    sent = []
+
+    def slow_deliver(message):
+        time.sleep(0.3)
+        sent.append(message)
+
+    statuses = []
+    outbox = make_outbox(tmp_path, slow_deliver, statuses, poll_interval=60)
+
+    async def scenario():
+        outbox.start()
+        await outbox.enqueue(MESSAGE)
+        await asyncio.sleep(0.1)
+        await outbox.close()
+        await outbox.enqueue(MESSAGE)
+        return await outbox.get_status()
+
+    # Recorded as sent, so it is not claimed and delivered again; nothing new is claimed after close
+    assert asyncio.run(scenario())['backlog'] == {'queued': 1}
+    assert len(sent) == 1
+    assert statuses == ['sent']
+
+
+def test_status_callback_is_retried(tmp_path, smtp_server, email_service):
+    statuses = []
+    outbox = make_outbox(tmp_path, deliver_with(email_service), statuses)
+    outbox.report_delay = 0
+    calls = []
+
+    async def on_status(message, status, error):
+        calls.append(status)
+        if len(calls) == 1:
+            raise LookupError("row not written yet")
+        statuses.append(status)
+
+    outbox.on_status = on_status
+
+    async def scenario():
+        await outbox.enqueue(MESSAGE)
+        await outbox.run_pending()
+
+    asyncio.run(scenario())
+    assert calls == ['sent', 'sent']
+    assert statuses == ['sent']
+
+
+def test_share_endpoint_queues_the_email(tmp_path, smtp_server, email_service, monkeypatch):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("psycopg2")
+    from fastapi.testclient import TestClient
+    import backend_service
+    import database.async_wishes_db as async_wishes_db
+    from database.async_wishes_db import AsyncWishesDatabase
+
+    vault_path = str(tmp_path / "vault.sqlite3")
+    monkeypatch.setenv("WARMUP_ON_STARTUP", "false")
+    monkeypatch.setattr(async_wishes_db, "SQLITE_PATH", vault_path)
+    monkeypatch.setattr(backend_service, "wishes_db", AsyncWishesDatabase(backend='sqlite'))
+    monkeypatch.setattr(backend_service, "email_service", email_service)
+    outbox = EmailOutbox(backend_service.deliver_share_email, backend_service.record_email_status,
+                         path=str(tmp_path / "outbox.sqlite3"), cipher=backend_service.wishes_db.cipher,
+                         poll_interval=0.05)
+    monkeypatch.setattr(backend_service, "email_outbox", outbox)
+
+    with TestClient(backend_service.app) as client:
+        wish_id = client.post("/api/wishes/create", json={"title": "Garden", "content": "Plant a neem tree"}).json()["wish_id"]
+        response = client.post("/api/wishes/share",
+                               json={"wish_id": wish_id, "method": "email", "recipient": "friend@example.com"})
+        assert response.status_code == 200
+        assert response.json()["status"] == "queued"
+
+        deadline = time.monotonic() + 5
+        status = None
+        while time.monotonic() < deadline and status != 'sent':
+            time.sleep(0.05)
+            db = sqlite3.connect(vault_path)
+            row = db.execute("SELECT status FROM sharing_history WHERE wish_id = ?;", (wish_id,)).fetchone()
+            db.close()
+            status = row[0] if row else None
+
+    assert status == 'sent'
+    assert [message[1] for message in smtp_server.messages] == [["friend@example.com"]]
+
+
+def test_queued_share_is_written_before_the_response(tmp_path, email_service, monkeypatch):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("psycopg2")
+    from fastapi.testclient import TestClient
+    import backend_service
+    import database.async_wishes_db as async_wishes_db
+    from database.async_wishes_db import AsyncWishesDatabase
+
+    vault_path = str(tmp_path / "vault.sqlite3")
+    monkeypatch.setenv("WARMUP_ON_STARTUP", "false")
+    # Other shares wait a minute in the write-behind queue
+    monkeypatch.setenv("SHARING_HISTORY_FLUSH_SECONDS", "60")
+    monkeypatch.setenv("SHARING_HISTORY_FALLBACK", str(tmp_path / "fallback.jsonl"))
+    monkeypatch.setattr(async_wishes_db, "SQLITE_PATH", vault_path)
+    monkeypatch.setattr(backend_service, "wishes_db", AsyncWishesDatabase(backend='sqlite'))
+    monkeypatch.setattr(backend_service, "email_service", email_service)
+    # A worker that never sends, as when another process owns the outbox
+    outbox = EmailOutbox(backend_service.deliver_share_email, None, path=str(tmp_path / "outbox.sqlite3"),
+                         cipher=backend_service.wishes_db.cipher, poll_interval=60)
+    monkeypatch.setattr(outbox, "start", lambda: None)
+    monkeypatch.setattr(backend_service, "email_outbox", outbox)
+
+    with TestClient(backend_service.app) as client:
+        wish_id = client.post("/api/wishes/create", json={"title": "Garden", "content": "Plant a neem tree"}).json()["wish_id"]
+        response = client.post("/api/wishes/share",
+                               json={"wish_id": wish_id, "method": "email", "recipient": "friend@example.com"})
+        assert response.status_code == 200
+
+        db = sqlite3.connect(vault_path)
+        rows = db.execute("SELECT status FROM sharing_history WHERE wish_id = ?;", (wish_id,)).fetchall()
+        db.close()
+        assert rows == [('queued',)]
+
+        message = dict(MESSAGE, wish_id=wish_id, shared_at="2001-01-01T00:00:00")
+        with pytest.raises(LookupError):
+            client.portal.call(backend_service.record_email_status, message, 'sent')
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,73 @@
+"""
+Test the BM25 lexical index and reciprocal-rank fusion used by hybrid retrieval.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from knowledge_base.lexical_index import LexicalIndex, reciprocal_rank_fusion, tokenize
+
+SAMPLE_TEXTS = [
+    "Section 498A of the Indian Penal Code deals with cruelty by husband or relatives.",
+    "PCOS is a common hormonal disorder that affects periods and fertility.",
+    "Regular antenatal checkups help monitor the health of mother and baby.",
+    "Metformin is sometimes prescribed for insulin resistance in PCOS.",
+]
+
+
+def test_tokenize_keeps_statutory_references():
+    """Statute numbers and abbreviations must survive tokenization."""
+    tokens = tokenize("Section 498A, PCOS & a 2 week plan")
+    assert "498a" in tokens
+    assert "pcos" in tokens
+    assert "2" in tokens
+    assert "a" not in tokens
+
+
+def test_exact_reference_ranks_first():
+    """An exact statutory reference should find its chunk."""
+    index = LexicalIndex()
+    assert index.build(SAMPLE_TEXTS)
+
+    results = index.search("what does section 498a say", top_k=2)
+    assert results[0][0] == 0
+    assert all(score > 0 for _, score in results)
+
+
+def test_save_and_mmap_load_round_trip():
+    """A memory-mapped index must score exactly like the in-memory one."""
+    index = LexicalIndex()
+    index.build(SAMPLE_TEXTS)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        assert index.save(tmp_dir)
+
+        loaded = LexicalIndex()
+        assert loaded.load(tmp_dir, mmap=True)
+        assert loaded.get_stats() == index.get_stats()
+        assert loaded.search("pcos metformin") == index.search("pcos metformin")
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    """Documents ranked by both lists should beat single-list documents."""
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 4, 1]])
+    ids = [doc_id for doc_id, _ in fused]
+    assert ids[0] in (1, 3)
+    assert set(ids[:2]) == {1, 3}
+
+
+if __name__ == "__main__":
+    print("🔍 Testing hybrid retrieval components")
+    print("=" * 40)
+
+    for test in [test_tokenize_keeps_statutory_references, test_exact_reference_ranks_first,
+                 test_save_and_mmap_load_round_trip, test_reciprocal_rank_fusion_rewards_agreement]:
+        test()
+        print(f"✅ {test.__name__}")
+
+    print("\n🎉 Hybrid retrieval tests passed!")
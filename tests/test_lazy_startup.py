@@ -0,0 +1,149 @@
+"""
+Test lazy component loading and that the API imports without heavy modules.
+"""
+
+import sys
+import time
+import subprocess
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from utils import lazy_loader
+from utils.lazy_loader import LazyComponent
+
+HEAVY_MODULES = ["streamlit", "torch", "sentence_transformers", "faiss", "core.crew", "speech_recognition"]
+
+
+def test_component_loads_once_and_records_time():
+    calls = []
+    component = LazyComponent("counter", lambda: calls.append(1) or "value")
+
+    assert component.get_status()["state"] == "pending"
+    assert component.get() == "value"
+    assert component.get() == "value"
+    assert calls == [1]
+    assert component.get_status()["state"] == "loaded"
+    assert component.get_status()["load_seconds"] is not None
+
+
+def test_failed_component_returns_none_with_error():
+    def broken():
+        raise ImportError("No module named 'missing'")
+
+    component = LazyComponent("broken", broken)
+
+    assert component.get() is None
+    assert component.get_status()["state"] == "failed"
+    assert "missing" in component.get_status()["error"]
+
+
+def test_failed_component_is_retried_after_the_backoff():
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("retrieval service down")
+        return "value"
+
+    component = LazyComponent("flaky", flaky, retry_after=0.1)
+
+    assert component.get() is None
+    assert component.get() is None
+    assert len(attempts) == 1
+    assert component.get_status()["retry_in"] > 0
+
+    time.sleep(0.1)
+    assert component.retry_due
+    assert component.get() == "value"
+    assert component.get_status()["state"] == "loaded"
+
+
+def test_retry_failed_reloads_due_components_in_the_background(monkeypatch):
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("database down")
+        return "value"
+
+    monkeypatch.setattr(lazy_loader, "_components", {})
+    component = lazy_loader.register("flaky", flaky)
+    component.retry_after = 0
+    component.get()
+
+    assert lazy_loader.retry_failed() == ["flaky"]
+    deadline = time.monotonic() + 1
+    while not component.loaded and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert component.loaded
+    assert lazy_loader.retry_failed() == []
+
+
+def test_liveness_answers_while_a_chat_waits_for_the_agents(monkeypatch):
+    """A chat request that is still loading the agents must not block the event loop."""
+    import asyncio
+    import threading
+    import pytest
+    httpx = pytest.importorskip("httpx")
+    backend_service = pytest.importorskip("backend_service")
+
+    release = threading.Event()
+
+    class SlowShakti:
+        def process_query(self, message, agents):
+            return f"answer to {message}"
+
+    def load():
+        release.wait(5)
+        return SlowShakti()
+
+    monkeypatch.setattr(backend_service, "shakti_ai", LazyComponent("shakti_ai", load))
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=backend_service.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            chat = asyncio.create_task(client.post("/api/agents/chat",
+                                                   json={"message": "iron", "agent_type": "maternal"}))
+            await asyncio.sleep(0.1)
+            live = await asyncio.wait_for(client.get("/health/live"), timeout=1)
+            assert not chat.done()
+            release.set()
+            return live, await chat
+
+    live, chat = asyncio.run(scenario())
+
+    assert live.status_code == 200
+    assert chat.json()["response"] == "answer to iron"
+
+
+def test_backend_import_skips_heavy_modules():
+    """Importing the API module must not load models, indexes or streamlit."""
+    check = (
+        "import sys, backend_service; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", check], cwd=project_root,
+                            capture_output=True, text=True)
+    if result.returncode != 0 and "ModuleNotFoundError" in result.stderr:
+        import pytest
+        pytest.skip("backend dependencies not installed")
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ""
+
+
+if __name__ == "__main__":
+    print("⚡ Testing lazy startup")
+    print("=" * 40)
+
+    for test in [test_component_loads_once_and_records_time, test_failed_component_returns_none_with_error,
+                 test_backend_import_skips_heavy_modules]:
+        test()
+        print(f"✅ {test.__name__}")
+
+    print("\n🎉 Lazy startup tests passed!")
@@ -0,0 +1,90 @@
+"""
+Test the ONNX encoder backend against the sentence-transformers model.
+
+The parity checks export a tiny randomly initialized BERT with
+scripts/export_onnx_encoder.py into a temporary directory, so they run
+without downloading a model. They need the export-time extras (torch,
+transformers, sentence-transformers, onnx) and are skipped without them.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from knowledge_base.encoders import mean_pool, l2_normalize
+
+TEXTS = [
+    "Is spotting normal in early pregnancy?",
+    "What does the law say about dowry harassment?",
+    "Breathing exercises for panic attacks",
+]
+
+# Lowest acceptable cosine similarity to the PyTorch embedding
+FP32_TOLERANCE = 0.999
+INT8_TOLERANCE = 0.98
+
+
+@pytest.fixture(scope="module")
+def tiny_export(tmp_path_factory):
+    """A small sentence-transformer and its fp32 and int8 ONNX exports."""
+    for name in ("torch", "transformers", "sentence_transformers", "onnx", "onnxruntime", "tokenizers"):
+        pytest.importorskip(name)
+    import torch
+    from transformers import BertConfig, BertModel, BertTokenizerFast
+    from scripts.export_onnx_encoder import export_model, quantize_model
+
+    root = tmp_path_factory.mktemp("tiny-encoder")
+    words = sorted({word.strip("?").lower() for text in TEXTS for word in text.split()})
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "?"] + words + list("abcdefghijklmnopqrstuvwxyz")
+    (root / "vocab.txt").write_text("\n".join(vocab))
+
+    torch.manual_seed(0)
+    model = BertModel(BertConfig(vocab_size=len(vocab), hidden_size=32, num_hidden_layers=2,
+                                 num_attention_heads=2, intermediate_size=64, max_position_embeddings=64))
+    model_dir, onnx_dir = root / "model", root / "onnx"
+    model.save_pretrained(str(model_dir))
+    BertTokenizerFast(vocab_file=str(root / "vocab.txt")).save_pretrained(str(model_dir))
+
+    onnx_dir.mkdir()
+    export_model(str(model_dir), onnx_dir)
+    quantize_model(onnx_dir)
+    return model_dir, onnx_dir
+
+
+def reference_embeddings(model_dir):
+    from knowledge_base.encoders import SentenceTransformerEncoder
+    return l2_normalize(SentenceTransformerEncoder(str(model_dir)).encode(TEXTS))
+
+
+def test_mean_pool_ignores_padding():
+    """Padding tokens must not contribute to the sentence embedding."""
+    token_embeddings = np.array([[[1.0, 0.0], [3.0, 2.0], [100.0, 100.0]]], dtype='float32')
+    attention_mask = np.array([[1, 1, 0]])
+
+    assert np.allclose(mean_pool(token_embeddings, attention_mask), [[2.0, 1.0]])
+
+
+@pytest.mark.parametrize("quantized, tolerance", [(False, FP32_TOLERANCE), (True, INT8_TOLERANCE)])
+def test_export_matches_sentence_transformers(tiny_export, quantized, tolerance):
+    from knowledge_base.encoders import OnnxEncoder
+    model_dir, onnx_dir = tiny_export
+    embeddings = OnnxEncoder(str(onnx_dir), str(model_dir), quantized=quantized).encode(TEXTS)
+
+    cosines = (embeddings * reference_embeddings(model_dir)).sum(axis=1)
+    assert cosines.min() >= tolerance
+
+
+if __name__ == "__main__":
+    print("🧪 Testing ONNX encoder")
+    print("=" * 40)
+
+    test_mean_pool_ignores_padding()
+    print("✅ test_mean_pool_ignores_padding")
+
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,122 @@
+"""
+Test that forked workers share a preloaded knowledge base copy-on-write.
+
+Builds a synthetic vector store, loads it in a parent process the way
+serve_prefork.py does (memory-mapped index, gc.freeze), forks a worker
+that searches the whole index, and checks how much private memory the
+worker had to allocate. Runs in a fresh interpreter so no thread pools
+exist before the fork. Linux only.
+"""
+
+import os
+import sys
+import json
+import subprocess
+from pathlib import Path
+
+import pytest
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+NUM_VECTORS = 20000
+DIMENSION = 384
+
+WORKER_SCRIPT = r'''
+import gc, json, os, pickle, sys
+import numpy as np
+import faiss
+sys.path.insert(0, sys.argv[1])
+from knowledge_base.vector_store import VectorStore
+
+store_dir, mmap_index = sys.argv[2], sys.argv[3] == "1"
+
+def private_dirty_kb():
+    # Private dirty anonymous memory: pages this process wrote or copied.
+    # File mappings are skipped; a freshly written index file is still
+    # dirty in the page cache but is not a per-process copy.
+    total, anonymous = 0, False
+    with open("/proc/self/smaps") as f:
+        for line in f:
+            fields = line.split()
+            if "-" in fields[0] and not fields[0].endswith(":"):
+                anonymous = len(fields) < 6 or fields[5].startswith("[")
+            elif fields[0] == "Private_Dirty:" and anonymous:
+                total += int(fields[1])
+    return total
+
+store = VectorStore()
+assert store.load(store_dir, mmap_index=mmap_index)
+gc.collect()
+gc.freeze()
+
+read_fd, write_fd = os.pipe()
+pid = os.fork()
+if pid == 0:
+    os.close(read_fd)
+    queries = np.random.RandomState(1).rand(32, store.dimension).astype("float32")
+    faiss.normalize_L2(queries)
+    # Start faiss/BLAS thread pools on a tiny private index first; their
+    # stacks and buffers are a fixed per-worker cost, not a knowledge base copy
+    scratch = faiss.IndexFlatIP(store.dimension)
+    scratch.add(queries)
+    scratch.search(queries[:1], 5)
+    scratch.search(queries, 10)
+    before = private_dirty_kb()
+    results = store.search_by_embedding(queries[:1], top_k=5, min_similarity=-1.0)
+    store.index.search(queries, 10)
+    store.lexical_search("pregnancy nutrition", top_k=5)
+    after = private_dirty_kb()
+    os.write(write_fd, json.dumps({"private_kb": after - before, "results": len(results)}).encode())
+    os._exit(0)
+
+os.close(write_fd)
+os.waitpid(pid, 0)
+print(os.read(read_fd, 4096).decode())
+'''
+
+
+def build_store(store_dir: Path):
+    """Write a vector store with a random index without loading an encoder."""
+    import pickle
+    import numpy as np
+    import faiss
+
+    vectors = np.random.RandomState(0).rand(NUM_VECTORS, DIMENSION).astype('float32')
+    faiss.normalize_L2(vectors)
+    index = faiss.IndexFlatIP(DIMENSION)
+    index.add(vectors)
+
+    store_dir.mkdir(parents=True, exist_ok=True)
+    faiss.write_index(index, str(store_dir / "index.faiss"))
+    chunks = [{'id': f'chunk_{i}', 'text': f'pregnancy nutrition note {i}', 'doc_title': 'Synthetic'}
+              for i in range(NUM_VECTORS)]
+    with open(store_dir / "chunks.pkl", 'wb') as f:
+        pickle.dump(chunks, f)
+    with open(store_dir / "metadata.json", 'w') as f:
+        json.dump({'total_chunks': NUM_VECTORS, 'dimension': DIMENSION, 'version': 'synthetic'}, f)
+
+
+@pytest.mark.skipif(not hasattr(os, "fork") or not Path("/proc/self/smaps").exists(),
+                    reason="needs fork and /proc/self/smaps (Linux)")
+@pytest.mark.parametrize("mmap_index", [True, False])
+def test_forked_worker_does_not_copy_index(tmp_path, mmap_index):
+    pytest.importorskip("faiss")
+    build_store(tmp_path / "store")
+
+    result = subprocess.run(
+        [sys.executable, "-c", WORKER_SCRIPT, str(project_root), str(tmp_path / "store"), "1" if mmap_index else "0"],
+        capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+
+    index_kb = NUM_VECTORS * DIMENSION * 4 // 1024
+    assert report["results"] == 5
+    # Searching the whole index may only dirty a small fraction of its size
+    assert report["private_kb"] < index_kb * 0.1, report
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
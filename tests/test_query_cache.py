@@ -0,0 +1,56 @@
+"""
+Test the exact-match LRU caches used by the knowledge retriever.
+"""
+
+import sys
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from knowledge_base.query_cache import LRUCache, pack_results, unpack_results
+
+
+def test_lru_evicts_least_recently_used():
+    """Reading an entry protects it from the next eviction."""
+    cache = LRUCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get_stats()['evictions'] == 1
+
+
+def test_results_round_trip_through_compact_arrays():
+    """Packed results rebuild the same chunks and scores."""
+    chunks = [{'text': f'chunk {i}', 'doc_title': 'Doc'} for i in range(5)]
+    results = [
+        dict(chunks[3], vector_id=3, similarity=0.75, rrf_score=0.03),
+        dict(chunks[1], vector_id=1, similarity=0.5),
+    ]
+
+    packed = pack_results(results)
+    assert packed.nbytes < 64
+    assert not packed.flags.writeable
+
+    restored = unpack_results(packed, chunks)
+    assert [r['text'] for r in restored] == ['chunk 3', 'chunk 1']
+    assert abs(restored[0]['rrf_score'] - 0.03) < 1e-6
+    assert 'rrf_score' not in restored[1]
+    assert [r['rank'] for r in restored] == [1, 2]
+    assert 'similarity' not in chunks[3]
+
+
+if __name__ == "__main__":
+    print("🔍 Testing retrieval caches")
+    print("=" * 40)
+
+    for test in [test_lru_evicts_least_recently_used, test_results_round_trip_through_compact_arrays]:
+        test()
+        print(f"✅ {test.__name__}")
+
+    print("\n🎉 Retrieval cache tests passed!")
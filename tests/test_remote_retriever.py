@@ -0,0 +1,139 @@
+"""
+Test the retriever's remote path against a stand-in retrieval service:
+agent and version info is refreshed after its TTL, and a service that
+cannot be reached is an error rather than "no agents".
+"""
+
+import sys
+import json
+import threading
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+pytest.importorskip("faiss")
+
+from knowledge_base.retriever import KnowledgeRetriever
+
+
+class StandInService:
+    """Serves /info and /retrieve like knowledge_base/retrieval_service.py; answers 503 while 'down'."""
+
+    def __init__(self):
+        self.versions = {'maaya': 'v1', 'gynika': 'v1'}
+        self.down = False
+        self.retrieve_down = False
+        self.info_requests = 0
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                service.info_requests += 1
+                self.reply({
+                    'model_name': 'stand-in',
+                    'dimension': 2,
+                    'agents': {name: {'version': version, 'chunks': 1, 'warmed_up': True, 'centroid': [1.0, 0.0]}
+                               for name, version in service.versions.items()}
+                })
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers['Content-Length']))
+                if service.retrieve_down:
+                    self.send_error(500)
+                    return
+                self.reply({'results': [{'text': 'Iron prevents anaemia', 'similarity': 0.9}]})
+
+            def reply(self, payload):
+                status, body = (503, b'{}') if service.down else (200, json.dumps(payload).encode())
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def service():
+    service = StandInService()
+    yield service
+    service.close()
+
+
+def test_info_is_cached_within_the_ttl(service):
+    retriever = KnowledgeRetriever(service_url=service.url, service_info_ttl=60)
+
+    assert sorted(retriever.get_available_agents()) == ['gynika', 'maaya']
+    retriever.get_kb_version()
+    retriever.get_agent_centroid('maaya')
+
+    assert service.info_requests == 1
+    assert retriever.retrieve_for_agent('maaya', "iron")[0]['text'] == 'Iron prevents anaemia'
+
+
+def test_rebuilt_index_changes_the_kb_version_after_the_ttl(service):
+    retriever = KnowledgeRetriever(service_url=service.url, service_info_ttl=0)
+    before = retriever.get_kb_version()
+
+    service.versions['maaya'] = 'v2'
+    service.versions['nyaya'] = 'v1'
+
+    assert retriever.get_kb_version() != before
+    assert sorted(retriever.get_available_agents()) == ['gynika', 'maaya', 'nyaya']
+
+
+def test_unreachable_service_raises_instead_of_reporting_no_agents(service):
+    service.down = True
+    retriever = KnowledgeRetriever(service_url=service.url, service_info_ttl=0)
+
+    with pytest.raises(RuntimeError):
+        retriever.get_available_agents()
+    with pytest.raises(RuntimeError):
+        retriever.get_kb_version()
+
+    # Not remembered as empty: the next call asks again
+    service.down = False
+    assert sorted(retriever.get_available_agents()) == ['gynika', 'maaya']
+
+
+def test_failed_refresh_keeps_the_last_known_agents(service):
+    retriever = KnowledgeRetriever(service_url=service.url, service_info_ttl=0)
+    version = retriever.get_kb_version()
+
+    service.down = True
+    assert sorted(retriever.get_available_agents()) == ['gynika', 'maaya']
+    assert retriever.get_kb_version() == version
+    assert service.info_requests == 3
+
+
+def test_warm_up_does_not_mark_agents_whose_query_failed(service):
+    retriever = KnowledgeRetriever(service_url=service.url)
+
+    service.retrieve_down = True
+    retriever.warm_up()
+    assert not any(status['warmed_up'] for status in retriever.get_index_status().values())
+
+    service.retrieve_down = False
+    retriever.warm_up()
+    assert all(status['warmed_up'] for status in retriever.get_index_status().values())
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
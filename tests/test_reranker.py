@@ -0,0 +1,187 @@
+"""
+Test the cross-encoder reranker's latency-budget bypasses and ordering with
+a stand-in CrossEncoder.
+"""
+
+import sys
+import time
+import types
+import threading
+from pathlib import Path
+
+import pytest
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from knowledge_base.reranker import CrossEncoderReranker
+
+
+class FakeCrossEncoder:
+    """Scores a pair by how many query words the text contains; optionally slow."""
+
+    delay = 0.0
+    loaded = threading.Event()
+
+    def __init__(self, model_name, max_length=256, device="cpu"):
+        FakeCrossEncoder.loaded.set()
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        time.sleep(self.delay)
+        return [sum(word in text.lower() for word in query.lower().split()) for query, text in pairs]
+
+
+@pytest.fixture(autouse=True)
+def fake_sentence_transformers(monkeypatch):
+    FakeCrossEncoder.delay = 0.0
+    FakeCrossEncoder.loaded = threading.Event()
+    module = types.ModuleType("sentence_transformers")
+    module.CrossEncoder = FakeCrossEncoder
+    monkeypatch.setitem(sys.modules, "sentence_transformers", module)
+
+
+CANDIDATES = [
+    {'text': "Swelling of the feet is common late in pregnancy."},
+    {'text': "Iron supplements prevent anaemia during pregnancy."},
+    {'text': "Iron rich foods and iron supplements help with anaemia."},
+]
+
+
+def candidates():
+    return [dict(candidate) for candidate in CANDIDATES]
+
+
+def warm(reranker):
+    reranker.warm_up()
+    assert FakeCrossEncoder.loaded.wait(1)
+    deadline = time.monotonic() + 1
+    while not reranker.is_ready() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return reranker
+
+
+def test_cold_model_returns_the_incoming_order_and_starts_loading():
+    reranker = CrossEncoderReranker(budget_ms=1000)
+
+    results = reranker.rerank("iron anaemia", candidates(), top_k=2)
+
+    assert [r['text'] for r in results] == [c['text'] for c in CANDIDATES[:2]]
+    assert 'rerank_score' not in results[0]
+    assert reranker.get_stats()['bypassed_cold'] == 1
+    assert FakeCrossEncoder.loaded.wait(1)
+
+
+def test_top_k_is_ordered_by_score():
+    reranker = warm(CrossEncoderReranker(budget_ms=1000))
+
+    results = reranker.rerank("iron rich anaemia", candidates(), top_k=2)
+
+    assert [r['text'] for r in results] == [CANDIDATES[2]['text'], CANDIDATES[1]['text']]
+    assert [r['rank'] for r in results] == [1, 2]
+    assert results[0]['rerank_score'] >= results[1]['rerank_score']
+    assert reranker.get_stats()['reranked'] == 1
+
+
+def test_batch_over_budget_by_estimate_is_skipped():
+    reranker = warm(CrossEncoderReranker(budget_ms=10))
+    reranker._ms_per_pair = 5.0
+
+    results = reranker.rerank("iron", candidates(), top_k=2)
+
+    assert 'rerank_score' not in results[0]
+    assert reranker.get_stats()['bypassed_over_budget'] == 1
+
+
+def test_batch_that_does_not_finish_in_time_is_abandoned():
+    reranker = warm(CrossEncoderReranker(budget_ms=20))
+    FakeCrossEncoder.delay = 0.2
+
+    results = reranker.rerank("iron", candidates(), top_k=2)
+
+    assert [r['text'] for r in results] == [c['text'] for c in CANDIDATES[:2]]
+    assert reranker.get_stats()['bypassed_over_budget'] == 1
+    # The abandoned batch still teaches the per-pair estimate
+    deadline = time.monotonic() + 1
+    while reranker._ms_per_pair is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert reranker._ms_per_pair > 20
+
+
+def test_busy_worker_is_bypassed():
+    reranker = warm(CrossEncoderReranker(budget_ms=20))
+    FakeCrossEncoder.delay = 0.2
+    reranker.rerank("iron", candidates(), top_k=2)
+
+    # The previous batch is still running on the single worker
+    results = reranker.rerank("anaemia", candidates(), top_k=2)
+
+    assert 'rerank_score' not in results[0]
+    assert reranker.get_stats()['bypassed_busy'] == 1
+
+
+def test_slow_batch_does_not_disable_reranking_for_good():
+    reranker = warm(CrossEncoderReranker(budget_ms=20, probe_every=3))
+    FakeCrossEncoder.delay = 0.2
+    reranker.rerank("iron", candidates(), top_k=2)
+    deadline = time.monotonic() + 1
+    while not reranker.is_ready() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert reranker._ms_per_pair > 20
+
+    FakeCrossEncoder.delay = 0.0
+    results = [reranker.rerank("iron", candidates(), top_k=2) for _ in range(4)]
+
+    assert all('rerank_score' not in r[0] for r in results[:3])
+    assert 'rerank_score' in results[3][0]
+    assert reranker._ms_per_pair < 20
+    assert 'rerank_score' in reranker.rerank("iron", candidates(), top_k=2)[0]
+
+
+def test_warm_up_scores_a_pair_before_the_first_query(monkeypatch):
+    scored = []
+    monkeypatch.setattr(FakeCrossEncoder, "predict",
+                        lambda self, pairs, **kwargs: scored.append(pairs) or [0.0] * len(pairs))
+
+    warm(CrossEncoderReranker(budget_ms=1000))
+
+    assert len(scored) == 1
+
+
+def test_failed_load_is_retried(monkeypatch):
+    failures = [OSError("model download failed")]
+    load = FakeCrossEncoder.__init__
+
+    def flaky(self, *args, **kwargs):
+        if failures:
+            raise failures.pop()
+        load(self, *args, **kwargs)
+
+    monkeypatch.setattr(FakeCrossEncoder, "__init__", flaky)
+    reranker = CrossEncoderReranker(budget_ms=1000)
+    reranker.warm_up()
+    reranker._pending.result(timeout=1)
+    assert not reranker.is_ready()
+
+    assert warm(reranker).is_ready()
+
+
+def test_counters_are_exact_under_concurrency():
+    reranker = CrossEncoderReranker(budget_ms=1000)
+    reranker.warm_up = lambda: None
+
+    def query():
+        for _ in range(500):
+            reranker.rerank("iron", candidates(), top_k=1)
+
+    threads = [threading.Thread(target=query) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert reranker.get_stats()['bypassed_cold'] == 4000
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
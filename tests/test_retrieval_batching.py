@@ -0,0 +1,156 @@
+"""
+Test request coalescing and batched retrieval.
+"""
+
+import os
+import sys
+import asyncio
+import hashlib
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+pytest.importorskip("faiss")
+
+from knowledge_base import encoders
+from knowledge_base.vector_store import VectorStore
+from knowledge_base.retriever import KnowledgeRetriever
+from knowledge_base.retrieval_service import RequestCoalescer
+
+DOCUMENTS = [
+    "Iron supplements prevent anaemia during pregnancy.",
+    "Folic acid before conception lowers the risk of neural tube defects.",
+    "Breastfeeding on demand helps establish milk supply.",
+    "Skin-to-skin contact after birth keeps the baby warm.",
+    "Morning sickness usually eases after the first trimester.",
+    "Swelling of the feet is common late in pregnancy.",
+]
+
+
+class HashingEncoder:
+    """Deterministic bag-of-words encoder that counts its batches."""
+
+    dimension = 64
+
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, texts, batch_size=32, show_progress_bar=False):
+        self.batches.append(len(texts))
+        vectors = np.zeros((len(texts), self.dimension), dtype='float32')
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                bucket = int(hashlib.md5(word.strip('.,').encode()).hexdigest(), 16) % self.dimension
+                vectors[row, bucket] += 1.0
+        return vectors + 1e-3
+
+
+@pytest.fixture
+def retriever(tmp_path):
+    encoder = HashingEncoder()
+    key = (os.getenv('EMBEDDING_BACKEND', 'sentence-transformers').lower(), encoders.DEFAULT_MODEL_NAME)
+    previous = encoders._encoders.get(key)
+    encoders._encoders[key] = encoder
+
+    store = VectorStore()
+    chunks = [{'id': f'chunk_{i}', 'text': text, 'doc_title': 'Care Guide', 'doc_filename': 'care.pdf',
+               'chunk_index': i * 10} for i, text in enumerate(DOCUMENTS)]
+    assert store.build_index(chunks)
+    assert store.save(str(tmp_path / "maaya_vectorstore"))
+
+    knowledge_retriever = KnowledgeRetriever(kb_base_path=str(tmp_path), service_url="")
+    encoder.batches.clear()
+    yield knowledge_retriever, encoder
+
+    if previous is None:
+        del encoders._encoders[key]
+    else:
+        encoders._encoders[key] = previous
+
+
+def test_batch_matches_single_requests_with_one_encode(retriever):
+    knowledge_retriever, encoder = retriever
+    queries = ["iron in pregnancy", "breastfeeding milk supply", "feet swelling"]
+    requests = [{'agent_name': 'maaya', 'query': query, 'top_k': 2, 'min_similarity': 0.0} for query in queries]
+
+    batched = knowledge_retriever.retrieve_batch(requests)
+    assert encoder.batches == [3]
+
+    knowledge_retriever.results_cache.clear()
+    knowledge_retriever.embedding_cache.clear()
+    single = [knowledge_retriever.retrieve_for_agent('maaya', query, top_k=2, min_similarity=0.0) for query in queries]
+
+    assert [[chunk['id'] for chunk in results] for results in batched] == \
+           [[chunk['id'] for chunk in results] for results in single]
+    assert batched[0][0]['id'] == 'chunk_0'
+
+
+def test_unknown_agent_gets_empty_results(retriever):
+    knowledge_retriever, _ = retriever
+    results = knowledge_retriever.retrieve_batch([
+        {'agent_name': 'nyaya', 'query': 'property rights'},
+        {'agent_name': 'maaya', 'query': 'iron pregnancy', 'min_similarity': 0.0},
+    ])
+
+    assert results[0] == []
+    assert results[1]
+
+
+def test_warm_up_marks_only_agents_whose_query_ran(retriever, monkeypatch):
+    knowledge_retriever, encoder = retriever
+
+    def broken(texts, batch_size=32, show_progress_bar=False):
+        raise RuntimeError("encoder failed to load")
+
+    monkeypatch.setattr(encoder, "encode", broken)
+    knowledge_retriever.warm_up()
+    assert knowledge_retriever.get_index_status()['maaya']['warmed_up'] is False
+
+    monkeypatch.undo()
+    knowledge_retriever.warm_up()
+    assert knowledge_retriever.get_index_status()['maaya']['warmed_up'] is True
+
+
+def test_concurrent_requests_are_coalesced():
+    batches = []
+
+    def handler(requests):
+        batches.append(list(requests))
+        return [request * 2 for request in requests]
+
+    async def run():
+        coalescer = RequestCoalescer(handler, max_batch=8, max_wait_ms=20)
+        coalescer.start()
+        results = await asyncio.gather(*(coalescer.submit(i) for i in range(5)))
+        await coalescer.stop()
+        return results, coalescer.get_stats()
+
+    results, stats = asyncio.run(run())
+
+    assert results == [0, 2, 4, 6, 8]
+    assert batches == [[0, 1, 2, 3, 4]]
+    assert stats['batches'] == 1
+
+
+def test_handler_error_reaches_every_request():
+    def handler(requests):
+        raise RuntimeError("index unavailable")
+
+    async def run():
+        coalescer = RequestCoalescer(handler, max_wait_ms=5)
+        coalescer.start()
+        outcomes = await asyncio.gather(coalescer.submit("a"), coalescer.submit("b"), return_exceptions=True)
+        await coalescer.stop()
+        return outcomes
+
+    outcomes = asyncio.run(run())
+    assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
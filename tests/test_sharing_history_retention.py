@@ -0,0 +1,154 @@
+"""
+Test the sharing-history schema migration and retention job. Needs a
+reachable PostgreSQL (DB_* settings); skipped otherwise.
+"""
+
+import io
+import os
+import sys
+from pathlib import Path
+from datetime import datetime, timedelta
+
+import pytest
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+psycopg2 = pytest.importorskip("psycopg2")
+
+from database.settings import DB_CONFIG
+from database.connection_pool import ConnectionPool
+from database.db_config import WishesDatabase
+from database.wishes_bulk import import_table
+from database import sharing_history_retention
+from database.sharing_history_retention import count_expired, purge_history
+
+
+@pytest.fixture
+def schema():
+    try:
+        connection = psycopg2.connect(connect_timeout=3, **DB_CONFIG)
+    except psycopg2.OperationalError:
+        pytest.skip("PostgreSQL not reachable")
+
+    # Work in a throwaway schema so real vault tables are untouched
+    name = f"retention_test_{os.getpid()}"
+    connection.autocommit = True
+    connection.cursor().execute(f"CREATE SCHEMA {name};")
+    connection.autocommit = False
+    connection.cursor().execute(f"SET search_path TO {name};")
+    connection.commit()
+    yield connection, name
+
+    connection.rollback()
+    connection.autocommit = True
+    connection.cursor().execute(f"DROP SCHEMA {name} CASCADE;")
+    connection.close()
+
+
+def vault_for(name):
+    pool = ConnectionPool(dict(DB_CONFIG, options=f"-c search_path={name}"), min_size=0, max_size=2)
+    return WishesDatabase(pool=pool)
+
+
+def test_existing_history_gets_the_owner_column(schema):
+    conn, name = schema
+    cursor = conn.cursor()
+    # Tables as created before sharing history recorded the owner
+    cursor.execute("""
+        CREATE TABLE wishes (
+            id SERIAL PRIMARY KEY, user_id VARCHAR(255) NOT NULL, encrypted_content BYTEA NOT NULL,
+            contact_name VARCHAR(255), contact_email VARCHAR(255), contact_phone VARCHAR(20),
+            contact_relationship VARCHAR(100), sharing_preferences JSONB,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            is_active BOOLEAN DEFAULT TRUE
+        );
+        CREATE TABLE sharing_history (
+            id SERIAL PRIMARY KEY, wish_id INTEGER REFERENCES wishes(id), shared_with VARCHAR(255) NOT NULL,
+            sharing_method VARCHAR(50) NOT NULL, shared_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            status VARCHAR(50) DEFAULT 'sent', notes TEXT
+        );
+        INSERT INTO wishes (user_id, encrypted_content) VALUES ('alice', 'x');
+        INSERT INTO sharing_history (wish_id, shared_with, sharing_method) VALUES (1, 'asha@example.com', 'email');
+    """)
+    conn.commit()
+
+    vault = vault_for(name)
+    assert vault.init_database()
+    assert vault.log_sharing(1, "ravi@example.com", "whatsapp")
+    history = vault.get_sharing_history("alice")
+    vault.close()
+
+    assert sorted(row['shared_with'] for row in history) == ["asha@example.com", "ravi@example.com"]
+    assert {row['user_id'] for row in history} == {"alice"}
+
+
+def add_history(conn, name):
+    """Six shares of one wish, five of them older than a year; returns the cutoff."""
+    vault = vault_for(name)
+    assert vault.init_database()
+    wish_id = vault.save_wish("alice", "share me")
+    vault.close()
+
+    now = datetime.now()
+    cursor = conn.cursor()
+    for days in (800, 700, 600, 500, 400, 10):
+        cursor.execute(
+            "INSERT INTO sharing_history (wish_id, shared_with, sharing_method, shared_at, user_id) "
+            "VALUES (%s, %s, 'email', %s, 'alice');",
+            (wish_id, f"{days}@example.com", now - timedelta(days=days))
+        )
+    conn.commit()
+    return now - timedelta(days=365)
+
+
+def test_old_rows_are_archived_and_removed_in_batches(schema):
+    conn, name = schema
+    cutoff = add_history(conn, name)
+    cursor = conn.cursor()
+    assert count_expired(conn, cutoff) == 5
+
+    archive = io.BytesIO()
+    assert purge_history(conn, cutoff, batch_size=2, archive=archive) == {'rows': 5, 'batches': 3}
+
+    cursor.execute("SELECT shared_with FROM sharing_history;")
+    assert cursor.fetchall() == [("10@example.com",)]
+
+    # The archive restores with the bulk import tool
+    archive.seek(0)
+    assert import_table(conn, archive) == ("sharing_history", 5)
+    cursor.execute("SELECT COUNT(*) FROM sharing_history WHERE user_id = 'alice';")
+    assert cursor.fetchone()[0] == 6
+
+
+
+def test_archive_is_synced_before_each_delete(schema, tmp_path, monkeypatch):
+    conn, name = schema
+    cutoff = add_history(conn, name)
+    synced = []
+
+    def fsync(fileno):
+        # The batch being archived is still in the table when its rows are synced
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM sharing_history;")
+        synced.append(cursor.fetchone()[0])
+
+    monkeypatch.setattr(sharing_history_retention.os, "fsync", fsync)
+    with open(tmp_path / "history.copy", 'xb') as archive:
+        assert purge_history(conn, cutoff, batch_size=2, archive=archive)['batches'] == 3
+
+    assert synced == [6, 4, 2]
+
+
+def test_existing_archive_is_not_overwritten(tmp_path, monkeypatch):
+    archive = tmp_path / "history.copy.gz"
+    archive.write_bytes(b"rows from an earlier run")
+    monkeypatch.setattr(sys, "argv", ["sharing_history_retention.py", "--archive", str(archive)])
+
+    assert sharing_history_retention.main() == 1
+    assert archive.read_bytes() == b"rows from an earlier run"
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,287 @@
+"""
+Test the write-behind sharing-history writers: batching, the fallback file
+when the database is unreachable, and flushing on close. The rejected-row
+tests need a reachable PostgreSQL (DB_* settings) and are skipped otherwise.
+"""
+
+import os
+import sys
+import asyncio
+import multiprocessing
+from pathlib import Path
+
+import pytest
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from database.sharing_history_writer import (
+    SharingHistoryWriter, AsyncSharingHistoryWriter, append_fallback, make_entry, take_fallback
+)
+from database.settings import DB_CONFIG
+
+
+class FlakyStore:
+    """Collects written batches; raises while 'down' or when told to reject them."""
+
+    def __init__(self):
+        self.batches = []
+        self.down = False
+        self.rejected = None
+
+    def write(self, entries):
+        if self.down:
+            raise ConnectionError("database unreachable")
+        if self.rejected is not None:
+            raise self.rejected
+        self.batches.append(list(entries))
+
+    async def write_async(self, entries):
+        self.write(entries)
+
+    @property
+    def rows(self):
+        return [entry for batch in self.batches for entry in batch]
+
+
+def test_rows_are_written_in_one_batch(tmp_path):
+    store = FlakyStore()
+    writer = SharingHistoryWriter(store.write, interval=60, fallback_path=str(tmp_path / "fallback.jsonl"))
+
+    for number in range(10):
+        writer.log(1, f"friend{number}@example.com", "email")
+    assert store.batches == []
+
+    assert writer.flush()
+    writer.close()
+
+    assert len(store.batches) == 1
+    assert [entry[1] for entry in store.rows] == [f"friend{number}@example.com" for number in range(10)]
+    assert writer.get_stats()['written'] == 10
+
+
+def test_full_queue_triggers_an_early_flush(tmp_path):
+    store = FlakyStore()
+    writer = SharingHistoryWriter(store.write, interval=60, max_batch=3,
+                                  fallback_path=str(tmp_path / "fallback.jsonl"))
+
+    for number in range(3):
+        writer.log(1, "asha@example.com", "whatsapp")
+    writer._thread.join(timeout=0.5)
+    writer.close()
+
+    assert len(store.rows) == 3
+
+
+def test_failed_batches_go_to_the_fallback_file_and_are_replayed(tmp_path):
+    store = FlakyStore()
+    fallback = tmp_path / "fallback.jsonl"
+    writer = SharingHistoryWriter(store.write, interval=60, fallback_path=str(fallback))
+
+    store.down = True
+    writer.log(1, "asha@example.com", "email", notes="first")
+    assert not writer.flush()
+    assert fallback.exists()
+
+    store.down = False
+    writer.log(2, "ravi@example.com", "email")
+    assert writer.flush()
+    writer.close()
+
+    assert not fallback.exists()
+    assert sorted((entry[0], entry[4]) for entry in store.rows) == [(1, "first"), (2, None)]
+    assert writer.get_stats()['replayed'] == 1
+
+
+def test_close_flushes_queued_rows(tmp_path):
+    store = FlakyStore()
+    writer = SharingHistoryWriter(store.write, interval=60, fallback_path=str(tmp_path / "fallback.jsonl"))
+
+    writer.log(1, "asha@example.com", "email")
+    writer.close()
+
+    assert len(store.rows) == 1
+    with pytest.raises(RuntimeError):
+        writer.log(1, "asha@example.com", "email")
+
+
+def test_async_writer_batches_and_falls_back(tmp_path):
+    store = FlakyStore()
+    fallback = tmp_path / "fallback.jsonl"
+    writer = AsyncSharingHistoryWriter(store.write_async, interval=60, fallback_path=str(fallback))
+
+    async def run():
+        store.down = True
+        writer.log(1, "asha@example.com", "email")
+        await writer.flush()
+        store.down = False
+        for number in range(4):
+            writer.log(2, f"friend{number}@example.com", "email")
+        await writer.close()
+
+    asyncio.run(run())
+
+    assert [len(batch) for batch in store.batches] == [4, 1]
+    assert take_fallback(str(fallback)) == []
+
+
+def test_async_close_waits_for_the_batch_being_written(tmp_path):
+    store = FlakyStore()
+    fallback = tmp_path / "fallback.jsonl"
+
+    async def slow_write(entries):
+        await asyncio.sleep(0.3)
+        store.write(entries)
+
+    writer = AsyncSharingHistoryWriter(slow_write, interval=0.01, fallback_path=str(fallback))
+
+    async def run():
+        writer.log(1, "asha@example.com", "email")
+        await asyncio.sleep(0.1)
+        await writer.close()
+
+    asyncio.run(run())
+
+    assert len(store.rows) == 1
+    assert writer.get_stats()['pending'] == 0
+
+
+def test_async_close_keeps_a_batch_that_outlives_the_timeout(tmp_path):
+    fallback = tmp_path / "fallback.jsonl"
+
+    async def hung_write(entries):
+        await asyncio.sleep(60)
+
+    writer = AsyncSharingHistoryWriter(hung_write, interval=0.01, fallback_path=str(fallback))
+
+    async def run():
+        writer.log(1, "asha@example.com", "email")
+        await asyncio.sleep(0.1)
+        await writer.close(timeout=0.1)
+
+    asyncio.run(run())
+
+    assert [entry[1] for entry in take_fallback(str(fallback))] == ["asha@example.com"]
+
+
+def test_rejected_batches_are_dropped_not_parked(tmp_path):
+    store = FlakyStore()
+    fallback = tmp_path / "fallback.jsonl"
+    writer = SharingHistoryWriter(store.write, interval=60, fallback_path=str(fallback))
+
+    store.rejected = ValueError("cannot adapt row")
+    writer.log(1, "asha@example.com", "email")
+    assert not writer.flush()
+    writer.close()
+
+    assert not fallback.exists()
+    assert writer.get_stats()['dropped'] == 1
+
+
+def test_replay_drops_rows_that_keep_failing(tmp_path):
+    store = FlakyStore()
+    fallback = tmp_path / "fallback.jsonl"
+    # Parked while the database was down, but rejected once it is back
+    append_fallback(str(fallback), [make_entry(1, "asha" * 100 + "@example.com", "email")])
+
+    def write(entries):
+        if any(len(entry[1]) > 255 for entry in entries):
+            raise ValueError("value too long for type character varying(255)")
+        store.write(entries)
+
+    writer = SharingHistoryWriter(write, interval=60, fallback_path=str(fallback))
+    writer.log(2, "ravi@example.com", "email")
+    writer.close()
+
+    assert [entry[1] for entry in store.rows] == ["ravi@example.com"]
+    assert not fallback.exists()
+    assert writer.get_stats()['dropped'] == 1
+
+
+def append_and_take(path, worker):
+    """Park rows and take the file back, as a worker process replaying its fallback would."""
+    taken = []
+    for number in range(20):
+        append_fallback(path, [make_entry(worker, f"friend{number}@example.com", "email")])
+        taken.extend(take_fallback(path))
+    return [(entry[0], entry[1]) for entry in taken]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="needs fork and fcntl")
+def test_processes_never_take_the_same_rows(tmp_path):
+    path = str(tmp_path / "fallback.jsonl")
+    with multiprocessing.get_context("fork").Pool(4) as workers:
+        results = workers.starmap(append_and_take, [(path, worker) for worker in range(4)])
+    taken = [row for result in results for row in result]
+    taken.extend((entry[0], entry[1]) for entry in take_fallback(path))
+
+    assert sorted(taken) == sorted((worker, f"friend{number}@example.com")
+                                   for worker in range(4) for number in range(20))
+
+
+@pytest.fixture
+def schema():
+    psycopg2 = pytest.importorskip("psycopg2")
+    try:
+        connection = psycopg2.connect(connect_timeout=3, **DB_CONFIG)
+    except psycopg2.OperationalError:
+        pytest.skip("PostgreSQL not reachable")
+
+    # Work in a throwaway schema so real vault tables are untouched
+    name = f"history_writer_test_{os.getpid()}"
+    connection.autocommit = True
+    connection.cursor().execute(f"CREATE SCHEMA {name};")
+    yield name
+
+    connection.cursor().execute(f"DROP SCHEMA {name} CASCADE;")
+    connection.close()
+
+
+def batch_with_an_overlong_row(wish_id):
+    return [
+        (wish_id, "asha@example.com", "email", "sent", None, None, None),
+        (wish_id, "x" * 300 + "@example.com", "email", "sent", None, None, None),
+        (wish_id, "ravi@example.com", "whatsapp", "sent", None, None, None),
+    ]
+
+
+def test_overlong_row_does_not_block_its_batch(schema):
+    from database.connection_pool import ConnectionPool
+    from database.db_config import WishesDatabase
+
+    pool = ConnectionPool(dict(DB_CONFIG, options=f"-c search_path={schema}"), min_size=0, max_size=2)
+    vault = WishesDatabase(pool=pool)
+    assert vault.init_database()
+    wish_id = vault.save_wish("alice", "share me")
+
+    vault.log_sharing_batch(batch_with_an_overlong_row(wish_id))
+    history = vault.get_sharing_history("alice")
+    vault.close()
+
+    assert sorted(row['shared_with'] for row in history) == ["asha@example.com", "ravi@example.com"]
+
+
+def test_async_overlong_row_does_not_block_its_batch(schema):
+    asyncpg = pytest.importorskip("asyncpg")
+    from database.async_wishes_db import AsyncWishesDatabase
+
+    async def run():
+        pool = await asyncpg.create_pool(
+            host=DB_CONFIG['host'], port=int(DB_CONFIG['port']), database=DB_CONFIG['database'],
+            user=DB_CONFIG['user'], password=DB_CONFIG['password'], min_size=0, max_size=2,
+            server_settings={'search_path': schema})
+        db = AsyncWishesDatabase(pool=pool)
+        await db.init_database()
+        wish_id = await db.save_wish("alice", "share me")
+        await db.log_sharing_batch(batch_with_an_overlong_row(wish_id))
+        history = await db.get_sharing_history("alice")
+        await db.close()
+        return history
+
+    history = asyncio.run(run())
+    assert sorted(row['shared_with'] for row in history) == ["asha@example.com", "ravi@example.com"]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,147 @@
+"""
+Test the SMTP session pool and the email service's use of it against a
+local SMTP server.
+"""
+
+import sys
+import smtplib
+import threading
+from pathlib import Path
+
+import pytest
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from smtp_stand_in import LocalSMTPServer
+from utils.smtp_pool import SMTPPool, SMTPPoolTimeoutError, is_disconnect
+from utils.email_service import EmailService
+
+
+@pytest.fixture
+def smtp_server():
+    with LocalSMTPServer() as server:
+        yield server
+
+
+def make_pool(server, **kwargs):
+    kwargs.setdefault('keepalive_interval', 0)
+    return SMTPPool(server.host, server.port, "vault@example.com", server.password, starttls=False, **kwargs)
+
+
+def test_sessions_log_in_once_and_are_reused(smtp_server):
+    pool = make_pool(smtp_server)
+    for i in range(3):
+        pool.sendmail("vault@example.com", f"friend{i}@example.com", f"Subject: {i}\r\n\r\nwish {i}")
+
+    assert len(smtp_server.messages) == 3
+    assert smtp_server.connections == 1
+    assert smtp_server.logins == 1
+    assert pool.get_status()['opened'] == 1
+    assert pool.get_status()['reused'] == 2
+    pool.close()
+
+
+def test_dropped_session_is_replaced_and_the_send_retried(smtp_server):
+    pool = make_pool(smtp_server, health_check_after=60)
+    pool.sendmail("vault@example.com", "friend@example.com", "Subject: 1\r\n\r\nfirst")
+    smtp_server.drop_connections()
+
+    pool.sendmail("vault@example.com", "friend@example.com", "Subject: 2\r\n\r\nsecond")
+
+    assert [message[2].splitlines()[-1] for message in smtp_server.messages] == ["first", "second"]
+    status = pool.get_status()
+    assert status['reconnects'] == 1
+    assert status['opened'] == 2
+    assert smtp_server.logins == 2
+    pool.close()
+
+
+def test_idle_sessions_are_checked_with_noop(smtp_server):
+    pool = make_pool(smtp_server, health_check_after=0)
+    pool.sendmail("vault@example.com", "friend@example.com", "Subject: 1\r\n\r\nfirst")
+    smtp_server.drop_connections()
+
+    pool.sendmail("vault@example.com", "friend@example.com", "Subject: 2\r\n\r\nsecond")
+
+    status = pool.get_status()
+    assert status['failed_checks'] == 1
+    assert status['reconnects'] == 0
+    assert len(smtp_server.messages) == 2
+    pool.close()
+
+
+def test_keepalive_sends_noop_and_closes_long_idle_sessions(smtp_server):
+    pool = make_pool(smtp_server)
+    pool.keepalive_interval = 0.01
+    with pool.session():
+        pass
+
+    pool._idle[0].last_used -= 1
+    pool.keepalive()
+    assert smtp_server.noops == 1
+    assert pool.get_status()['idle'] == 1
+
+    pool.max_idle = 0.5
+    pool._idle[0].last_used -= 1
+    pool.keepalive()
+    assert pool.get_status()['idle'] == 0
+    assert pool.get_status()['discarded'] == 1
+    pool.close()
+
+
+def test_refused_recipient_keeps_the_session(smtp_server):
+    smtp_server.refused.add("nobody@example.com")
+    pool = make_pool(smtp_server)
+
+    with pytest.raises(smtplib.SMTPRecipientsRefused) as excinfo:
+        pool.sendmail("vault@example.com", "nobody@example.com", "Subject: x\r\n\r\nx")
+    assert not is_disconnect(excinfo.value)
+
+    pool.sendmail("vault@example.com", "friend@example.com", "Subject: y\r\n\r\ny")
+    assert pool.get_status()['opened'] == 1
+    assert len(smtp_server.messages) == 1
+    pool.close()
+
+
+def test_checkout_waits_for_a_free_session(smtp_server):
+    pool = make_pool(smtp_server, max_size=1, checkout_timeout=0.1)
+    with pool.session():
+        with pytest.raises(SMTPPoolTimeoutError):
+            pool.sendmail("vault@example.com", "friend@example.com", "x")
+
+    released = threading.Event()
+
+    def hold():
+        with pool.session():
+            released.wait(1)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    threading.Timer(0.05, released.set).start()
+    pool.sendmail("vault@example.com", "friend@example.com", "Subject: z\r\n\r\nz")
+    holder.join()
+    assert pool.get_status()['opened'] == 1
+    pool.close()
+
+
+def test_email_service_shares_one_login(smtp_server, monkeypatch):
+    monkeypatch.setenv('SMTP_USER', "vault@example.com")
+    monkeypatch.setenv('SMTP_PASSWORD', smtp_server.password)
+    monkeypatch.setenv('SMTP_FROM_EMAIL', "vault@example.com")
+    service = EmailService(pool=make_pool(smtp_server))
+
+    assert service.test_connection()
+    assert service.send_wish_share_email("Plant a tree for me", "friend@example.com", "Asha", "Garden")
+    assert service.send_wish_share_email("Read to the children", "sister@example.com", "Asha", "Stories")
+
+    assert smtp_server.logins == 1
+    assert [message[1] for message in smtp_server.messages] == [["friend@example.com"], ["sister@example.com"]]
+    assert "Subject: =?utf-8?" in smtp_server.messages[0][2]
+    assert service.get_pool_status()['sent'] == 2
+    service.close()
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
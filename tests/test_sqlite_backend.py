@@ -0,0 +1,156 @@
+"""
+Test the embedded SQLite backend of the Wishes Vault, sync and async,
+on a temporary database file.
+"""
+
+import sys
+import time
+import asyncio
+import threading
+from pathlib import Path
+
+import pytest
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+pytest.importorskip("psycopg2")
+
+from database import sqlite_backend
+import database.async_wishes_db as async_wishes_db
+from database.connection_pool import ConnectionPool
+from database.db_config import WishesDatabase
+from database.async_wishes_db import AsyncWishesDatabase
+
+
+@pytest.fixture
+def path(tmp_path, monkeypatch):
+    # Write sharing history inline so failures surface in the test
+    monkeypatch.setenv("SHARING_HISTORY_WRITE_BEHIND", "false")
+    path = str(tmp_path / "vault.sqlite3")
+    monkeypatch.setattr(async_wishes_db, "SQLITE_PATH", path)
+    return path
+
+
+@pytest.fixture
+def vault(path):
+    pool = ConnectionPool({'path': path}, max_size=2, connect=sqlite_backend.connect)
+    db = WishesDatabase(pool=pool, backend='sqlite')
+    assert db.init_database()
+    yield db
+    db.close()
+
+
+def test_file_uses_wal_mode(vault, path):
+    with vault.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA journal_mode;")
+        assert cursor.fetchone()[0] == "wal"
+
+
+def test_sync_vault_round_trip(vault):
+    wish_id = vault.save_wish("alice", "keep the garden green", contact_name="Asha",
+                              sharing_preferences={"category": "personal"})
+    for number in range(4):
+        vault.save_wish("alice", f"wish {number}")
+
+    [wish] = vault.get_wishes("alice", limit=10)[-1:]
+    assert wish['content'] == "keep the garden green"
+    assert wish['sharing_preferences'] == {"category": "personal"}
+    assert vault.get_wish_by_id(wish_id, "bob") is None
+
+    first = vault.list_wishes("alice", page_size=3)
+    second = vault.list_wishes("alice", page_size=3, cursor=first['next_cursor'])
+    assert len(first['wishes']) == 3 and second['next_cursor'] is None
+    assert len({w['id'] for w in first['wishes'] + second['wishes']}) == 5
+
+    assert vault.update_wish(wish_id, "alice", content="water the roses")
+    assert vault.get_wish_by_id(wish_id, "alice")['content'] == "water the roses"
+    assert vault.delete_wish(wish_id, "alice")
+    assert len(vault.get_wishes("alice")) == 4
+
+
+def test_sync_sharing_history_skips_invalid_rows(vault):
+    wish_id = vault.save_wish("alice", "share me", contact_name="Asha")
+
+    vault.log_sharing_batch([
+        (wish_id, "asha@example.com", "email", "sent", None, None, None),
+        (9999, "nobody@example.com", "email", "sent", None, None, None),
+    ])
+    history = vault.get_sharing_history("alice")
+
+    # The owner is looked up from the wish; the unknown wish is dropped
+    assert [(row['shared_with'], row['user_id'], row['contact_name']) for row in history] == [
+        ("asha@example.com", "alice", "Asha")
+    ]
+
+
+def test_async_vault_shares_the_file_with_the_sync_vault(vault):
+    wish_id = vault.save_wish("alice", "written by the sync layer")
+
+    async def run():
+        db = AsyncWishesDatabase(backend='sqlite')
+        assert await db.connect()
+        wishes = await db.get_wishes("alice")
+        new_id = await db.save_wish("alice", "written by the async layer")
+        assert await db.log_sharing(new_id, "asha@example.com", "email")
+        assert await db.log_sharing(9999, "nobody@example.com", "email")
+        history = await db.get_sharing_history("alice")
+        page = await db.list_wishes("alice", page_size=1, include_content=True)
+        await db.close()
+        return wishes, history, page
+
+    wishes, history, page = asyncio.run(run())
+
+    assert [wish['content'] for wish in wishes] == ["written by the sync layer"]
+    assert [(row['shared_with'], row['user_id']) for row in history] == [("asha@example.com", "alice")]
+    assert page['next_cursor'] is not None
+    assert vault.get_wish_by_id(page['wishes'][0]['id'], "alice")['content'] == page['wishes'][0]['content']
+
+
+def test_async_queries_run_off_the_event_loop(path):
+    pool = sqlite_backend.AsyncSQLitePool(path)
+    # A query that takes 0.2s, e.g. waiting for another process's write lock
+    pool._conn.db.create_function("slow_thread_id", 0, lambda: time.sleep(0.2) or threading.get_ident())
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                thread_id = await conn.fetchval("SELECT slow_thread_id();")
+        task.cancel()
+        await pool.close()
+        return thread_id, ticks
+
+    thread_id, ticks = asyncio.run(run())
+    assert thread_id != threading.get_ident()
+    # The loop kept running while the query did
+    assert ticks >= 5
+
+
+def test_endpoints_run_on_sqlite(path, monkeypatch):
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+    import backend_service
+
+    monkeypatch.setattr(backend_service, "wishes_db", AsyncWishesDatabase(backend='sqlite'))
+    client = TestClient(backend_service.app)
+
+    for number in range(3):
+        assert client.post("/api/wishes/create", json={"title": f"Wish {number}", "content": "..."}).status_code == 200
+    listed = client.get("/api/wishes/list").json()["wishes"]
+
+    assert sorted(wish["title"] for wish in listed) == ["Wish 0", "Wish 1", "Wish 2"]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
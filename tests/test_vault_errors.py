@@ -0,0 +1,117 @@
+"""
+Test the typed errors of the Wishes Vault data layer and how the API
+presents them.
+"""
+
+import sys
+import sqlite3
+import logging
+import subprocess
+from pathlib import Path
+from contextlib import asynccontextmanager
+
+import pytest
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from database.errors import (
+    VaultError, VaultUnavailableError, VaultQueryError, VaultIntegrityError, vault_error
+)
+from database.connection_pool import ConnectionPool, PoolTimeoutError
+
+
+class DriverError(Exception):
+    def __init__(self, sqlstate):
+        super().__init__(f"SQLSTATE {sqlstate}")
+        self.sqlstate = sqlstate
+
+
+@pytest.mark.parametrize("error, expected", [
+    (ConnectionRefusedError("refused"), VaultUnavailableError),
+    (DriverError("08006"), VaultUnavailableError),
+    (DriverError("57P01"), VaultUnavailableError),
+    (DriverError("23503"), VaultIntegrityError),
+    (DriverError("42P01"), VaultQueryError),
+    (sqlite3.IntegrityError("FOREIGN KEY constraint failed"), VaultIntegrityError),
+    (sqlite3.OperationalError("database is locked"), VaultUnavailableError),
+    (sqlite3.OperationalError("no such table: wishes"), VaultQueryError),
+])
+def test_driver_errors_are_classified(error, expected):
+    wrapped = vault_error(error, "save wish")
+
+    assert type(wrapped) is expected
+    assert wrapped.operation == "save wish"
+
+
+def test_failures_are_logged_with_context(caplog):
+    with caplog.at_level(logging.WARNING, logger="database.errors"):
+        vault_error(ConnectionRefusedError("refused"), "get wishes", user_id="alice")
+
+    [record] = caplog.records
+    assert record.levelno == logging.WARNING
+    assert record.vault_operation == "get wishes"
+    assert record.vault_context == {"user_id": "alice"}
+
+
+def test_data_layer_does_not_import_streamlit():
+    code = "import sys, database.db_config; print('streamlit' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=project_root, capture_output=True, text=True)
+
+    assert result.stdout.strip() == "False", result.stderr
+
+
+def test_sync_vault_raises_when_the_database_is_down():
+    pytest.importorskip("psycopg2")
+    from database.db_config import WishesDatabase
+
+    def refuse(**kwargs):
+        raise ConnectionRefusedError("connection refused")
+
+    vault = WishesDatabase(pool=ConnectionPool({}, min_size=0, connect=refuse), backend='sqlite')
+
+    with pytest.raises(VaultUnavailableError):
+        vault.get_wishes("alice")
+    with pytest.raises(VaultUnavailableError):
+        vault.save_wish("alice", "garden")
+    assert vault.ping() is False
+    assert issubclass(PoolTimeoutError, VaultUnavailableError)
+
+
+class RefusingPool:
+    """An asyncpg-style pool whose database is down."""
+
+    @asynccontextmanager
+    async def acquire(self):
+        raise ConnectionRefusedError("connection refused")
+        yield
+
+    async def close(self):
+        pass
+
+
+def test_api_reports_an_unreachable_database_as_503(monkeypatch, tmp_path):
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+    import backend_service
+    import database.async_wishes_db as async_wishes_db
+    from database.async_wishes_db import AsyncWishesDatabase
+
+    monkeypatch.setattr(backend_service, "wishes_db", AsyncWishesDatabase(pool=RefusingPool()))
+    client = TestClient(backend_service.app)
+
+    for response in (client.get("/api/wishes/list"), client.get("/api/wishes/1"),
+                     client.post("/api/wishes/create", json={"title": "Garden", "content": "..."})):
+        assert response.status_code == 503
+        assert response.headers["Retry-After"]
+
+    # Missing wishes are 404, not 500
+    monkeypatch.setattr(async_wishes_db, "SQLITE_PATH", str(tmp_path / "vault.sqlite3"))
+    monkeypatch.setattr(backend_service, "wishes_db", AsyncWishesDatabase(backend='sqlite'))
+    assert client.put("/api/wishes/999", json={"title": "x"}).status_code == 404
+    assert client.delete("/api/wishes/999").status_code == 404
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
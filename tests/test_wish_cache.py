@@ -0,0 +1,102 @@
+"""
+Test the per-user wish cache, including a round trip through the vault on
+the SQLite backend.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from database.wish_cache import WishCache
+
+
+def test_hits_return_private_copies():
+    cache = WishCache(ttl_seconds=60)
+    cache.put("alice", ("wishes", 1), [{"id": 1, "content": "garden"}], cache.token())
+
+    first = cache.get("alice", ("wishes", 1))
+    first[0]["content"] = "changed by a caller"
+
+    assert cache.get("alice", ("wishes", 1)) == [{"id": 1, "content": "garden"}]
+    assert cache.get("alice", ("wishes", 5)) is None
+    assert cache.get("bob", ("wishes", 1)) is None
+    assert cache.get_stats()["hits"] == 2
+
+
+def test_entries_expire_and_users_are_evicted():
+    cache = WishCache(ttl_seconds=0.05, max_users=2)
+    cache.put("alice", "key", "value", cache.token())
+    time.sleep(0.1)
+    assert cache.get("alice", "key") is None
+    assert cache.get_stats()["expirations"] == 1
+
+    cache.ttl_seconds = 60
+    for user_id in ("alice", "bob", "carol"):
+        cache.put(user_id, "key", user_id, cache.token())
+    assert cache.get("alice", "key") is None
+    assert cache.get("carol", "key") == "carol"
+
+
+def test_invalidation_drops_the_user_and_stale_reads():
+    cache = WishCache(ttl_seconds=60)
+    cache.put("alice", "key", "old", cache.token())
+    cache.put("bob", "key", "bob's", cache.token())
+
+    # A read that started before a write must not be cached after it
+    token = cache.token()
+    cache.invalidate("alice")
+    cache.put("alice", "key", "read before the write", token)
+
+    assert cache.get("alice", "key") is None
+    assert cache.get("bob", "key") == "bob's"
+
+
+@pytest.fixture
+def vault(tmp_path):
+    from database import sqlite_backend
+    from database.connection_pool import ConnectionPool
+    from database.db_config import WishesDatabase
+
+    pool = ConnectionPool({'path': str(tmp_path / "vault.sqlite3")}, min_size=0, max_size=2,
+                          connect=sqlite_backend.connect)
+    db = WishesDatabase(pool=pool, cache=WishCache(ttl_seconds=60), backend='sqlite')
+    assert db.init_database()
+    yield db
+    db.close()
+
+
+def checkouts(db):
+    status = db.get_pool_status()
+    return status["opened"] + status["reused"]
+
+
+def test_reruns_do_not_touch_the_database(vault):
+    wish_id = vault.save_wish("alice", "keep the garden green", contact_name="Asha")
+    assert vault.get_wishes("alice", limit=1)[0]["content"] == "keep the garden green"
+
+    before = checkouts(vault)
+    for _ in range(5):
+        assert vault.init_database()
+        assert vault.get_wishes("alice", limit=1)[0]["contact_name"] == "Asha"
+        assert vault.get_wish_by_id(wish_id, "alice")["content"] == "keep the garden green"
+    # Only the first get_wish_by_id reads from the database
+    assert checkouts(vault) - before == 1
+
+    assert vault.update_wish(wish_id, "alice", content="water the roses")
+    assert vault.get_wishes("alice", limit=1)[0]["content"] == "water the roses"
+    assert vault.get_wish_by_id(wish_id, "alice")["content"] == "water the roses"
+
+    assert vault.delete_wish(wish_id, "alice")
+    assert vault.get_wishes("alice", limit=1) == []
+    assert vault.save_wish("alice", "a new wish")
+    assert vault.get_wishes("alice", limit=1)[0]["content"] == "a new wish"
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
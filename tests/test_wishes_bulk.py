@@ -0,0 +1,133 @@
+"""
+Test bulk wish import/export. The COPY round trip needs a reachable
+PostgreSQL (DB_* settings) and is skipped otherwise.
+"""
+
+import io
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+pytest.importorskip("psycopg2")
+
+import psycopg2
+from cryptography.fernet import Fernet
+from database.settings import DB_CONFIG
+from database.encryption import WishCipher
+from database.wishes_bulk import (
+    _RowSource, _encode_bytea, _decode_bytea, export_table, import_table, reencrypt_rows
+)
+
+
+def test_reencrypt_rows_switches_keys():
+    old, new = Fernet(Fernet.generate_key()), Fernet(Fernet.generate_key())
+    rows = [b"7\tuser\t" + _encode_bytea(old.encrypt(b"my wish")) + b"\t\\N\n"]
+
+    [row] = list(reencrypt_rows(rows, 2, old, new))
+    fields = row.rstrip(b"\n").split(b"\t")
+
+    assert fields[:2] == [b"7", b"user"] and fields[3] == b"\\N"
+    assert new.decrypt(_decode_bytea(fields[2])) == b"my wish"
+    with pytest.raises(ValueError):
+        list(reencrypt_rows(rows, 2, new, old))
+
+
+def test_row_source_reads_in_chunks():
+    source = _RowSource([b"a\tb\n", b"c\td\n"])
+
+    assert source.read(3) == b"a\tb"
+    assert source.read() == b"\nc\td\n"
+    assert source.read(10) == b""
+
+
+@pytest.fixture
+def conn():
+    try:
+        connection = psycopg2.connect(connect_timeout=3, **DB_CONFIG)
+    except psycopg2.OperationalError:
+        pytest.skip("PostgreSQL not reachable")
+
+    # Work in a throwaway schema so real vault tables are untouched
+    schema = f"bulk_test_{os.getpid()}"
+    cursor = connection.cursor()
+    cursor.execute(f"CREATE SCHEMA {schema}; SET search_path TO {schema};")
+    cursor.execute("""
+        CREATE TABLE wishes (
+            id SERIAL PRIMARY KEY, user_id VARCHAR(255) NOT NULL, encrypted_content BYTEA NOT NULL,
+            contact_name VARCHAR(255), contact_email VARCHAR(255), contact_phone VARCHAR(20),
+            contact_relationship VARCHAR(100), sharing_preferences JSONB,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            is_active BOOLEAN DEFAULT TRUE
+        );
+        CREATE TABLE sharing_history (
+            id SERIAL PRIMARY KEY, wish_id INTEGER REFERENCES wishes(id), shared_with VARCHAR(255) NOT NULL,
+            sharing_method VARCHAR(50) NOT NULL, shared_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            status VARCHAR(50) DEFAULT 'sent', notes TEXT, user_id VARCHAR(255)
+        );
+    """)
+    connection.commit()
+    yield connection
+
+    connection.rollback()
+    cursor = connection.cursor()
+    cursor.execute(f"DROP SCHEMA {schema} CASCADE;")
+    connection.commit()
+    connection.close()
+
+
+def test_archive_round_trip(conn):
+    cipher = WishCipher()
+    cursor = conn.cursor()
+    for number, user_id in enumerate(["alice", "alice", "bob"]):
+        cursor.execute(
+            "INSERT INTO wishes (user_id, encrypted_content, contact_name, sharing_preferences) "
+            "VALUES (%s, %s, %s, %s);",
+            (user_id, cipher.encrypt(f"wish\t{number}\nline two"), f"Contact {number}", '{"priority": "high"}')
+        )
+    conn.commit()
+
+    archive_key = Fernet.generate_key()
+    buffer = io.BytesIO()
+    assert export_table(conn, "wishes", buffer, "archive", user_id="alice", archive_key=archive_key) == 2
+    assert b"wish" not in buffer.getvalue().split(b"\n", 1)[1]
+
+    cursor.execute("TRUNCATE wishes CASCADE;")
+    conn.commit()
+    buffer.seek(0)
+    assert import_table(conn, buffer, archive_key=archive_key) == ("wishes", 2)
+
+    cursor.execute("SELECT id, encrypted_content, sharing_preferences FROM wishes ORDER BY id;")
+    rows = cursor.fetchall()
+    assert [cipher.decrypt(row[1]) for row in rows] == ["wish\t0\nline two", "wish\t1\nline two"]
+    assert rows[0][2] == {"priority": "high"}
+
+    # The id sequence continues after the imported rows
+    cursor.execute("INSERT INTO wishes (user_id, encrypted_content) VALUES ('carol', 'x') RETURNING id;")
+    assert cursor.fetchone()[0] == rows[-1][0] + 1
+
+
+def test_failed_import_writes_nothing(conn):
+    cipher = WishCipher()
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO wishes (user_id, encrypted_content) VALUES ('alice', %s);", (cipher.encrypt("x"),))
+    conn.commit()
+
+    buffer = io.BytesIO()
+    export_table(conn, "wishes", buffer)
+    buffer.seek(0)
+
+    # Same ids are still present, so the whole COPY is rolled back
+    with pytest.raises(psycopg2.IntegrityError):
+        import_table(conn, buffer)
+    cursor.execute("SELECT COUNT(*) FROM wishes;")
+    assert cursor.fetchone()[0] == 1
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
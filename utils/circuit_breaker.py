@@ -0,0 +1,105 @@
+"""
+Circuit breaker for calls to flaky external services.
+
+After ``failure_threshold`` consecutive failures the circuit opens and calls
+are refused without touching the service. After ``reset_timeout`` seconds
+one trial call is let through (half-open); its outcome closes or re-opens
+the circuit.
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker."""
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Initialize the circuit breaker.
+
+        Args:
+            name: Name of the protected service, used in logs
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds to wait before allowing a trial call
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.stats = {'successes': 0, 'failures': 0, 'rejected': 0, 'opened': 0}
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """
+        Check whether a call may go through.
+
+        Returns:
+            True if the call should be attempted
+        """
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._trial_in_flight = False
+
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+
+            self.stats['rejected'] += 1
+            return False
+
+    def record_success(self):
+        """Record a successful call, closing the circuit."""
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info(f"Circuit for {self.name} closed")
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+            self.stats['successes'] += 1
+
+    def record_failure(self):
+        """Record a failed call, opening the circuit at the threshold."""
+        with self._lock:
+            self.consecutive_failures += 1
+            self.stats['failures'] += 1
+            self._trial_in_flight = False
+
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.stats['opened'] += 1
+                    logger.warning(f"Circuit for {self.name} opened after {self.consecutive_failures} failures")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def get_state(self) -> Dict[str, Any]:
+        """
+        Get the circuit state.
+
+        Returns:
+            Dictionary with state, failure count, seconds until retry and counters
+        """
+        with self._lock:
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = max(0.0, round(self.reset_timeout - (time.monotonic() - self.opened_at), 1))
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'retry_in_seconds': retry_in,
+                **self.stats
+            }
@@ -0,0 +1,316 @@
+"""
+Durable outbox for wish-sharing emails.
+
+Sharing a wish by email must not wait on the mail provider. enqueue()
+commits the email to a local SQLite file and returns. A worker task on the
+event loop sends due emails with the strict delivery function, which
+raises on failure. Temporary failures are retried with exponential
+backoff: ``base_delay * 2 ** (attempt - 1)``, capped at ``max_delay``, with
+jitter, up to ``max_attempts`` tries. Permanent failures, such as a
+rejected recipient, fail immediately. Each outcome ('sent', 'retrying',
+'failed') is passed to ``on_status``, which is tried again a few times if
+it raises; the API uses it to update sharing_history.status.
+
+Queued messages are encrypted with the vault key, so wish content is never
+written to disk in plain text. Several processes can share the file: one
+UPDATE claims each email. An email claimed by a process that died while
+sending it is claimed again after ``lease_seconds``.
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+import sqlite3
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from database.encryption import WishCipher
+
+try:
+    from utils.smtp_pool import is_permanent_failure
+except ImportError:
+    # Imported as a top-level module from inside utils/
+    from smtp_pool import is_permanent_failure
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTBOX_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                   'database', 'email_outbox.sqlite3')
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS email_outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        payload BLOB NOT NULL,
+        status TEXT NOT NULL DEFAULT 'queued',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at REAL NOT NULL,
+        claimed_at REAL,
+        last_error TEXT,
+        created_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON email_outbox(status, next_attempt_at);
+"""
+
+
+def retry_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Seconds to wait after the given failed attempt: exponential, capped, with jitter in its upper half."""
+    delay = min(max_delay, base_delay * 2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class EmailOutbox:
+    """SQLite-backed email queue with a retrying sender task on the event loop."""
+
+    def __init__(self, deliver: Callable[[Dict[str, Any]], Any],
+                 on_status: Optional[Callable[[Dict[str, Any], str, Optional[str]], Awaitable]] = None,
+                 path: str = DEFAULT_OUTBOX_PATH, cipher: Optional[WishCipher] = None, max_attempts: int = 8,
+                 base_delay: float = 30.0, max_delay: float = 3600.0, poll_interval: float = 5.0,
+                 concurrency: int = 2, lease_seconds: float = 600.0):
+        """
+        Initialize the outbox; call start() on the event loop.
+
+        Args:
+            deliver: Blocking function sending one message; raises if it was not sent
+            on_status: Coroutine function called with (message, status, error) after each attempt
+            path: SQLite file holding the queue
+            cipher: Encryption for queued messages (default: the vault key)
+            max_attempts: Tries before a message is marked failed
+            base_delay: Seconds before the first retry
+            max_delay: Longest wait between retries
+            poll_interval: Seconds between checks for due messages
+            concurrency: Messages sent at once
+            lease_seconds: Seconds after which a claimed, unfinished message is claimed again
+        """
+        self.deliver = deliver
+        self.on_status = on_status
+        self.path = path
+        self.cipher = cipher or WishCipher()
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.concurrency = max(1, concurrency)
+        self.lease_seconds = lease_seconds
+        # on_status is retried briefly, e.g. while the database is restarting
+        self.report_attempts = 3
+        self.report_delay = 1.0
+        self.stats = {'queued': 0, 'sent': 0, 'retried': 0, 'failed': 0}
+        self._db = None
+        self._db_pid = None
+        self._db_lock = threading.Lock()
+        self._loop = None
+        self._wake = None
+        self._run_lock = None
+        self._task = None
+        self._closing = False
+
+    # Storage (blocking; called through asyncio.to_thread)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None or self._db_pid != os.getpid():
+            # Autocommit: every statement below is its own transaction
+            self._db = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL;")
+            self._db.executescript(SCHEMA)
+            self._db_pid = os.getpid()
+        return self._db
+
+    def _insert(self, payload: bytes) -> int:
+        now = time.time()
+        with self._db_lock:
+            cursor = self._connection().execute(
+                "INSERT INTO email_outbox (payload, next_attempt_at, created_at) VALUES (?, ?, ?);",
+                (payload, now, now))
+            return cursor.lastrowid
+
+    def _claim(self, limit: int) -> List[tuple]:
+        """Claim due messages (and expired claims) for this worker, counting the attempt."""
+        now = time.time()
+        with self._db_lock:
+            return self._connection().execute("""
+                UPDATE email_outbox
+                SET status = 'sending', claimed_at = ?, attempts = attempts + 1
+                WHERE id IN (
+                    SELECT id FROM email_outbox
+                    WHERE (status = 'queued' AND next_attempt_at <= ?)
+                       OR (status = 'sending' AND claimed_at <= ?)
+                    ORDER BY next_attempt_at
+                    LIMIT ?
+                )
+                RETURNING id, payload, attempts;
+            """, (now, now, now - self.lease_seconds, limit)).fetchall()
+
+    def _finish(self, job_id: int, status: str, error: Optional[str] = None, next_attempt_at: float = None):
+        with self._db_lock:
+            db = self._connection()
+            if status == 'sent':
+                # Nothing left to do with the message; do not keep its content around
+                db.execute("DELETE FROM email_outbox WHERE id = ?;", (job_id,))
+            else:
+                db.execute("""
+                    UPDATE email_outbox
+                    SET status = ?, last_error = ?, next_attempt_at = COALESCE(?, next_attempt_at), claimed_at = NULL
+                    WHERE id = ?;
+                """, (status, error, next_attempt_at, job_id))
+
+    def _count(self) -> Dict[str, int]:
+        with self._db_lock:
+            rows = self._connection().execute("SELECT status, COUNT(*) FROM email_outbox GROUP BY status;")
+            return dict(rows.fetchall())
+
+    # Worker
+
+    def _bind(self):
+        # Events and tasks belong to one event loop; start over if it has changed
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._wake = asyncio.Event()
+            self._run_lock = asyncio.Lock()
+            self._task = None
+        return loop
+
+    def start(self):
+        """Start the sender task on the running event loop."""
+        loop = self._bind()
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+
+    async def enqueue(self, message: Dict[str, Any]) -> int:
+        """
+        Store a message durably and wake the sender task if it is running.
+
+        Args:
+            message: JSON-serializable message passed to deliver (and on_status) later
+
+        Returns:
+            Outbox id of the message
+        """
+        payload = self.cipher.encrypt(json.dumps(message))
+        job_id = await asyncio.to_thread(self._insert, payload)
+        self.stats['queued'] += 1
+        if self._wake is not None and self._loop is asyncio.get_running_loop():
+            self._wake.set()
+        return job_id
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await self.run_pending()
+            except Exception as e:
+                logger.error(f"Email outbox worker failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def run_pending(self) -> int:
+        """
+        Send every message that is due now.
+
+        Returns:
+            Number of send attempts made
+        """
+        self._bind()
+        attempts = 0
+        async with self._run_lock:
+            while not self._closing:
+                jobs = await asyncio.to_thread(self._claim, self.concurrency)
+                if not jobs:
+                    return attempts
+                await asyncio.gather(*(self._process(*job) for job in jobs))
+                attempts += len(jobs)
+            return attempts
+
+    async def _process(self, job_id: int, payload: bytes, attempt: int):
+        content = self.cipher.decrypt(payload)
+        if content is None:
+            logger.error(f"Email {job_id} in the outbox cannot be decrypted with the vault key")
+            await asyncio.to_thread(self._finish, job_id, 'failed', "cannot be decrypted")
+            self.stats['failed'] += 1
+            return
+        message = json.loads(content)
+
+        try:
+            await asyncio.to_thread(self.deliver, message)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if is_permanent_failure(e) or attempt >= self.max_attempts:
+                logger.error(f"Giving up on email {job_id} after {attempt} attempts: {error}")
+                await asyncio.to_thread(self._finish, job_id, 'failed', error)
+                self.stats['failed'] += 1
+                await self._report(message, 'failed', error)
+            else:
+                delay = retry_delay(attempt, self.base_delay, self.max_delay)
+                logger.warning(f"Email {job_id} failed (attempt {attempt}), retrying in {delay:.0f}s: {error}")
+                await asyncio.to_thread(self._finish, job_id, 'queued', error, time.time() + delay)
+                self.stats['retried'] += 1
+                await self._report(message, 'retrying', error)
+            return
+
+        await asyncio.to_thread(self._finish, job_id, 'sent')
+        self.stats['sent'] += 1
+        await self._report(message, 'sent', None)
+
+    async def _report(self, message: Dict[str, Any], status: str, error: Optional[str]):
+        if self.on_status is None:
+            return
+        for attempt in range(1, self.report_attempts + 1):
+            try:
+                await self.on_status(message, status, error)
+                return
+            except Exception as e:
+                if attempt == self.report_attempts:
+                    logger.error(f"Could not record email status '{status}' after {attempt} attempts: {e}")
+                    return
+                logger.warning(f"Could not record email status '{status}', retrying: {e}")
+                await asyncio.sleep(retry_delay(attempt, self.report_delay, self.report_delay * 4))
+
+    async def close(self, timeout: float = 30.0):
+        """
+        Stop claiming messages and let the ones being sent finish.
+
+        Queued messages stay in the file for the next start. A send still
+        running after ``timeout`` seconds is abandoned and its message is
+        claimed again after lease_seconds, so it may be delivered twice.
+        """
+        if self._task is not None and self._loop is asyncio.get_running_loop():
+            self._closing = True
+            self._wake.set()
+            await asyncio.wait([self._task], timeout=timeout)
+            if not self._task.done():
+                logger.warning(f"Email outbox did not finish within {timeout:.0f}s; abandoning in-flight sends")
+                self._task.cancel()
+                try:
+                    await self._task
+                except asyncio.CancelledError:
+                    pass
+            self._closing = False
+        self._task = None
+
+    async def get_status(self) -> Dict[str, Any]:
+        """Get this process's counters plus the messages in the file by status."""
+        return dict(self.stats, backlog=await asyncio.to_thread(self._count))
+
+
+def outbox_settings_from_env() -> Dict[str, Any]:
+    """
+    Read outbox settings: EMAIL_OUTBOX_PATH, EMAIL_OUTBOX_MAX_ATTEMPTS,
+    EMAIL_OUTBOX_RETRY_SECONDS, EMAIL_OUTBOX_MAX_RETRY_SECONDS,
+    EMAIL_OUTBOX_POLL_SECONDS and EMAIL_OUTBOX_CONCURRENCY.
+
+    Returns:
+        Keyword arguments for EmailOutbox
+    """
+    return {
+        'path': os.getenv('EMAIL_OUTBOX_PATH', DEFAULT_OUTBOX_PATH),
+        'max_attempts': int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', '8')),
+        'base_delay': float(os.getenv('EMAIL_OUTBOX_RETRY_SECONDS', '30')),
+        'max_delay': float(os.getenv('EMAIL_OUTBOX_MAX_RETRY_SECONDS', '3600')),
+        'poll_interval': float(os.getenv('EMAIL_OUTBOX_POLL_SECONDS', '5')),
+        'concurrency': int(os.getenv('EMAIL_OUTBOX_CONCURRENCY', '2'))
+    }
@@ -12,40 +12,76 @@ from email import encoders
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 import os
+import threading
 from dotenv import load_dotenv
 
+try:
+    from utils.smtp_pool import SMTPPool, smtp_pool_from_env
+except ImportError:
+    # Imported as a top-level module from inside utils/
+    from smtp_pool import SMTPPool, smtp_pool_from_env
+
 # Load environment variables
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Credentials copied unchanged from the setup instructions
+PLACEHOLDER_USERS = ("your_email@gmail.com",)
+PLACEHOLDER_PASSWORDS = ("your_app_password", "your_16_char_app_password")
+
+
+class EmailNotConfiguredError(Exception):
+    """Raised when an email is sent without SMTP credentials."""
+
 
 class EmailService:
     """Email service for sending emails via SMTP."""
     
-    def __init__(self):
+    def __init__(self, pool: Optional[SMTPPool] = None):
+        """
+        Initialize the service from the SMTP_* environment variables.
+
+        Args:
+            pool: SMTP session pool (default: created from the environment on first send)
+        """
         self.smtp_host = os.getenv('SMTP_HOST', 'smtp.gmail.com')
         self.smtp_port = int(os.getenv('SMTP_PORT', '587'))
         self.smtp_user = os.getenv('SMTP_USER')
         self.smtp_password = os.getenv('SMTP_PASSWORD')
         self.from_name = os.getenv('SMTP_FROM_NAME', 'SHAKTI-AI Support')
         self.from_email = os.getenv('SMTP_FROM_EMAIL', self.smtp_user)
+        self._pool = pool
+        self._pool_lock = threading.Lock()
+    
+    @property
+    def pool(self) -> SMTPPool:
+        """Logged-in SMTP sessions shared by every send and connection test."""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = smtp_pool_from_env(self.smtp_host, self.smtp_port,
+                                                    self.smtp_user, self.smtp_password)
+        return self._pool
     
     def is_configured(self) -> bool:
-        """Check if SMTP is properly configured."""
-        return bool(self.smtp_user and self.smtp_password)
+        """Check if SMTP is properly configured (placeholder credentials from the examples do not count)."""
+        return bool(self.smtp_user and self.smtp_password
+                    and self.smtp_user not in PLACEHOLDER_USERS
+                    and self.smtp_password not in PLACEHOLDER_PASSWORDS)
     
     def test_connection(self) -> bool:
-        """Test SMTP connection and authentication."""
+        """Test SMTP connection and authentication on a pooled session."""
         try:
             if not self.is_configured():
                 logger.warning("SMTP not configured - missing username or password")
                 return False
             
-            server = smtplib.SMTP(self.smtp_host, self.smtp_port)
-            server.starttls()
-            server.login(self.smtp_user, self.smtp_password)
-            server.quit()
+            with self.pool.session() as server:
+                code, _ = server.noop()
+            if code != 250:
+                logger.error(f"SMTP server answered NOOP with {code}")
+                return False
             logger.info("SMTP connection test successful")
             return True
             
@@ -59,56 +95,61 @@ class EmailService:
             logger.error(f"Connection test failed: {e}")
             return False
     
+    def deliver_wish_share_email(self, wish_content: str, recipient_email: str,
+                                 sender_name: str = "SHAKTI-AI User", wish_title: str = "My Wish"):
+        """
+        Send a wish sharing email, raising if it was not accepted by the SMTP server.
+
+        Raises:
+            EmailNotConfiguredError: SMTP credentials are missing or placeholders
+            smtplib.SMTPException, OSError: The server refused the email or could not be reached
+        """
+        if not self.is_configured():
+            raise EmailNotConfiguredError("SMTP is not configured (set SMTP_USER and SMTP_PASSWORD)")
+        
+        msg = self._create_message(wish_content, recipient_email, sender_name, wish_title)
+        self.pool.sendmail(self.from_email, recipient_email, msg.as_string())
+        logger.info(f"Wish sharing email sent successfully to {recipient_email}")
+    
     def send_wish_share_email(self, wish_content: str, recipient_email: str, 
                             sender_name: str = "SHAKTI-AI User", wish_title: str = "My Wish") -> bool:
-        """Send a wish sharing email."""
+        """
+        Send a wish sharing email.
+        
+        Returns:
+            True only if the SMTP server accepted the email. Without SMTP
+            settings the email is logged instead and False is returned.
+        """
         try:
-            # Check if we have placeholder credentials
-            if (not self.is_configured() or 
-                self.smtp_user == "your_email@gmail.com" or 
-                self.smtp_password == "your_app_password" or
-                self.smtp_password == "your_16_char_app_password"):
-                logger.warning(f"SMTP not properly configured. Email content prepared for {recipient_email}")
-                return self._log_email_content(wish_content, recipient_email, sender_name, wish_title)
-            
-            # Create message
-            msg = MIMEMultipart('alternative')
-            msg['From'] = f"{self.from_name} <{self.from_email}>"
-            msg['To'] = recipient_email
-            msg['Subject'] = f"🌟 {wish_title} - Shared via SHAKTI-AI"
-            
-            # Create both plain text and HTML versions
-            text_body = self._create_text_body(wish_content, sender_name, wish_title)
-            html_body = self._create_html_body(wish_content, sender_name, wish_title)
-            
-            # Attach both versions
-            msg.attach(MIMEText(text_body, 'plain', 'utf-8'))
-            msg.attach(MIMEText(html_body, 'html', 'utf-8'))
-            
-            # Send email
-            server = smtplib.SMTP(self.smtp_host, self.smtp_port)
-            server.starttls()
-            server.login(self.smtp_user, self.smtp_password)
-            
-            text = msg.as_string()
-            server.sendmail(self.from_email, recipient_email, text)
-            server.quit()
-            
-            logger.info(f"Wish sharing email sent successfully to {recipient_email}")
+            self.deliver_wish_share_email(wish_content, recipient_email, sender_name, wish_title)
             return True
-            
+        except EmailNotConfiguredError:
+            logger.warning(f"SMTP not properly configured. Email content prepared for {recipient_email}")
+            self._log_email_content(wish_content, recipient_email, sender_name, wish_title)
+            return False
         except smtplib.SMTPAuthenticationError:
-            logger.warning("SMTP Authentication failed. Running in demo mode.")
-            return self._log_email_content(wish_content, recipient_email, sender_name, wish_title)
+            logger.error("SMTP Authentication failed - check username/password")
+            return False
         except smtplib.SMTPRecipientsRefused:
             logger.error(f"Recipient email rejected: {recipient_email}")
             return False
         except smtplib.SMTPException as e:
-            logger.warning(f"SMTP error occurred, running in demo mode: {e}")
-            return self._log_email_content(wish_content, recipient_email, sender_name, wish_title)
+            logger.error(f"SMTP error while sending to {recipient_email}: {e}")
+            return False
         except Exception as e:
-            logger.warning(f"Email sending failed, running in demo mode: {e}")
-            return self._log_email_content(wish_content, recipient_email, sender_name, wish_title)
+            logger.error(f"Email sending failed: {e}")
+            return False
+    
+    def _create_message(self, wish_content: str, recipient_email: str,
+                        sender_name: str, wish_title: str) -> MIMEMultipart:
+        """Create the wish sharing email with plain text and HTML versions."""
+        msg = MIMEMultipart('alternative')
+        msg['From'] = f"{self.from_name} <{self.from_email}>"
+        msg['To'] = recipient_email
+        msg['Subject'] = f"🌟 {wish_title} - Shared via SHAKTI-AI"
+        msg.attach(MIMEText(self._create_text_body(wish_content, sender_name, wish_title), 'plain', 'utf-8'))
+        msg.attach(MIMEText(self._create_html_body(wish_content, sender_name, wish_title), 'html', 'utf-8'))
+        return msg
     
     def _create_text_body(self, wish_content: str, sender_name: str, wish_title: str) -> str:
         """Create plain text email body."""
@@ -174,13 +215,21 @@ This email was sent through SHAKTI-AI's secure sharing feature.
         """
     
     def _log_email_content(self, wish_content: str, recipient_email: str, 
-                          sender_name: str, wish_title: str) -> bool:
-        """Log email content when SMTP is not configured."""
+                          sender_name: str, wish_title: str):
+        """Log email content when SMTP is not configured (nothing is sent)."""
         logger.info(f"Email prepared for: {recipient_email}")
         logger.info(f"From: {sender_name}")
         logger.info(f"Subject: 🌟 {wish_title} - Shared via SHAKTI-AI")
         logger.info(f"Content: {wish_content}")
-        return True
+    
+    def get_pool_status(self) -> Dict[str, Any]:
+        """Get SMTP session pool statistics (empty before the first send or test)."""
+        return self._pool.get_status() if self._pool is not None else {}
+    
+    def close(self):
+        """Close pooled SMTP sessions."""
+        if self._pool is not None:
+            self._pool.close()
     
     def get_setup_instructions(self) -> Dict[str, Any]:
         """Get setup instructions for different email providers."""
@@ -0,0 +1,177 @@
+"""
+Lazy loading of heavy components for the API process.
+
+Components are registered with a loader function and only loaded on first
+use or during an explicit background warm-up. Each load is timed so the
+service can report where its startup time goes. A component that failed
+to load (e.g. its database or model server was down) is tried again on
+the first use after ``retry_after`` seconds.
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LazyComponent:
+    """A component loaded once, on first use, by its loader function."""
+
+    def __init__(self, name: str, loader: Callable[[], Any], retry_after: Optional[float] = None):
+        """
+        Initialize the component.
+
+        Args:
+            name: Name used in logs and the startup report
+            loader: Function that imports and builds the component
+            retry_after: Seconds after a failed load before the next use loads
+                again (default: LAZY_RETRY_SECONDS env var, 30)
+        """
+        self.name = name
+        self.loader = loader
+        if retry_after is None:
+            retry_after = float(os.getenv('LAZY_RETRY_SECONDS', '30'))
+        self.retry_after = retry_after
+        self.state = "pending"
+        self.error = None
+        self.load_seconds = None
+        self.failed_at = None
+        self._value = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[Any]:
+        """
+        Get the component, loading it first if needed.
+
+        Returns:
+            The loaded component, or None if loading failed (and is not due for a retry)
+        """
+        if self.state == "loaded":
+            return self._value
+
+        with self._lock:
+            if self.retry_due:
+                logger.info(f"Retrying {self.name}, which failed to load: {self.error}")
+                self.state = "pending"
+            if self.state in ("pending", "loading"):
+                self.state = "loading"
+                started = time.perf_counter()
+                try:
+                    self._value = self.loader()
+                    self.state = "loaded"
+                    logger.info(f"Loaded {self.name}")
+                except Exception as e:
+                    self.error = str(e)
+                    self.state = "failed"
+                    self.failed_at = time.monotonic()
+                    logger.error(f"Failed to load {self.name}: {e}")
+                finally:
+                    self.load_seconds = time.perf_counter() - started
+            return self._value
+
+    @property
+    def loaded(self) -> bool:
+        return self.state == "loaded"
+
+    @property
+    def retry_due(self) -> bool:
+        """Whether the component failed and the next use will load it again."""
+        return self.state == "failed" and time.monotonic() - self.failed_at >= self.retry_after
+
+    def get_status(self) -> Dict[str, Any]:
+        """
+        Get the component's load state.
+
+        Returns:
+            Dictionary with state, load time and error
+        """
+        return {
+            "state": self.state,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            "error": self.error,
+            "retry_in": (round(max(0.0, self.failed_at + self.retry_after - time.monotonic()), 1)
+                         if self.state == "failed" else None)
+        }
+
+
+_components: Dict[str, LazyComponent] = {}
+_warm_up = {"state": "not started", "seconds": None}
+
+
+def register(name: str, loader: Callable[[], Any]) -> LazyComponent:
+    """Register a lazily loaded component."""
+    component = LazyComponent(name, loader)
+    _components[name] = component
+    return component
+
+
+def get_component(name: str) -> Optional[LazyComponent]:
+    """Get a registered component by name."""
+    return _components.get(name)
+
+
+def warm_up(names: Optional[List[str]] = None, background: bool = True) -> Optional[threading.Thread]:
+    """
+    Load components ahead of their first use.
+
+    Args:
+        names: Components to load, in order (default: all registered)
+        background: Load on a daemon thread instead of blocking
+
+    Returns:
+        The warm-up thread when running in the background
+    """
+    def run():
+        started = time.perf_counter()
+        _warm_up["state"] = "running"
+        for name in names or list(_components):
+            _components[name].get()
+        _warm_up["seconds"] = time.perf_counter() - started
+        _warm_up["state"] = "finished"
+        logger.info(f"Warm-up finished in {_warm_up['seconds']:.2f}s")
+
+    if not background:
+        run()
+        return None
+
+    thread = threading.Thread(target=run, name="component-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def retry_failed() -> List[str]:
+    """
+    Load again, on a background thread, the failed components whose retry delay has passed.
+
+    Returns:
+        Names of the components being retried
+    """
+    names = [name for name, component in _components.items() if component.retry_due]
+    if names:
+        thread = threading.Thread(target=lambda: [_components[name].get() for name in names],
+                                  name="component-retry", daemon=True)
+        thread.start()
+    return names
+
+
+def startup_report(import_seconds: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Summarize where startup time went.
+
+    Args:
+        import_seconds: Time taken to import the service module
+
+    Returns:
+        Dictionary with import time, warm-up progress and per-component load state
+    """
+    return {
+        "import_seconds": round(import_seconds, 3) if import_seconds is not None else None,
+        "warm_up": {
+            "state": _warm_up["state"],
+            "seconds": round(_warm_up["seconds"], 3) if _warm_up["seconds"] is not None else None
+        },
+        "components": {name: component.get_status() for name, component in _components.items()}
+    }
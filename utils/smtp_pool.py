@@ -0,0 +1,388 @@
+"""
+Pool of authenticated SMTP sessions for the email service.
+
+Opening a session costs a TCP connect, STARTTLS and a login, which takes
+most of the time of sending one email. Providers also throttle accounts
+that log in for every message. The pool keeps up to ``max_size`` logged-in
+sessions and reuses them:
+
+- On checkout, a session idle for ``health_check_after`` seconds is checked
+  with NOOP. Sessions older than ``max_lifetime`` are replaced.
+- A background thread sends NOOP on idle sessions every
+  ``keepalive_interval`` seconds, so the server does not time them out.
+  Sessions idle for longer than ``max_idle`` are closed with QUIT.
+- If a reused session turns out to be dropped during a send, it is
+  discarded and the message is sent again on another session.
+"""
+
+import os
+import time
+import atexit
+import smtplib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+class SMTPPoolTimeoutError(smtplib.SMTPException):
+    """Raised when no SMTP session becomes available in time."""
+
+
+def is_disconnect(error: BaseException) -> bool:
+    """Check whether an error means the SMTP session is gone (as opposed to a rejected message)."""
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        # 421: service not available, the server is closing the channel
+        return error.smtp_code == 421
+    # SMTPException derives from OSError; plain OSErrors are socket failures
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+def is_permanent_failure(error: BaseException) -> bool:
+    """Check whether sending again cannot succeed: the server rejected the message or all its recipients (5xx)."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        # Wrong credentials are fixed by the operator, not by the message
+        return False
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code >= 500
+    return False
+
+
+class _PooledSession:
+    """An SMTP session with the bookkeeping the pool needs."""
+
+    __slots__ = ('smtp', 'created_at', 'last_used', 'uses')
+
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.uses = 0
+
+
+class SMTPPool:
+    """Bounded, thread-safe pool of logged-in SMTP sessions."""
+
+    def __init__(self, host: str, port: int = 587, username: Optional[str] = None,
+                 password: Optional[str] = None, max_size: int = 2, starttls: bool = True,
+                 timeout: float = 10.0, health_check_after: float = 5.0, keepalive_interval: float = 60.0,
+                 max_idle: float = 300.0, max_lifetime: float = 1800.0, checkout_timeout: float = 30.0,
+                 smtp_class=smtplib.SMTP):
+        """
+        Initialize the pool; sessions are opened on demand.
+
+        Args:
+            host: SMTP server host
+            port: SMTP server port
+            username: Login user (None skips AUTH, e.g. for a local relay)
+            password: Login password
+            max_size: Most sessions open at once
+            starttls: Upgrade sessions with STARTTLS before logging in
+            timeout: Socket timeout in seconds for each SMTP command
+            health_check_after: Idle seconds after which a checkout runs NOOP
+            keepalive_interval: Seconds between NOOPs on idle sessions (0 disables the thread)
+            max_idle: Idle seconds after which a session is closed
+            max_lifetime: Seconds after which a session is closed and replaced
+            checkout_timeout: Seconds to wait for a free session
+            smtp_class: Class opening a session (default: smtplib.SMTP)
+        """
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.max_size = max(1, max_size)
+        self.starttls = starttls
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+        self.keepalive_interval = keepalive_interval
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.checkout_timeout = checkout_timeout
+        self._smtp_class = smtp_class
+
+        self._idle = []
+        self._in_use = 0
+        self._pid = os.getpid()
+        self._closed = False
+        self._condition = threading.Condition()
+        self._wake = threading.Event()
+        self._keepalive_thread = None
+        self.stats = {'opened': 0, 'reused': 0, 'discarded': 0, 'failed_checks': 0,
+                      'keepalives': 0, 'reconnects': 0, 'sent': 0, 'timeouts': 0}
+        atexit.register(self.close)
+
+    def _open(self) -> _PooledSession:
+        smtp = self._smtp_class(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+        except BaseException:
+            self._quit(smtp)
+            raise
+        with self._condition:
+            self.stats['opened'] += 1
+        return _PooledSession(smtp)
+
+    @staticmethod
+    def _quit(smtp):
+        try:
+            smtp.quit()
+        except Exception:
+            try:
+                smtp.close()
+            except Exception:
+                pass
+
+    def _discard(self, session: _PooledSession):
+        self._quit(session.smtp)
+        with self._condition:
+            self.stats['discarded'] += 1
+
+    def _noop(self, session: _PooledSession) -> bool:
+        try:
+            code, _ = session.smtp.noop()
+        except (smtplib.SMTPException, OSError):
+            code = None
+        if code != 250:
+            with self._condition:
+                self.stats['failed_checks'] += 1
+            return False
+        return True
+
+    def _is_usable(self, session: _PooledSession) -> bool:
+        """Check age and (after idling) a NOOP round trip."""
+        now = time.monotonic()
+        if self.max_lifetime and now - session.created_at > self.max_lifetime:
+            return False
+        if now - session.last_used >= self.health_check_after:
+            return self._noop(session)
+        return True
+
+    def _check_fork(self):
+        """Drop sessions inherited from a parent process; sockets cannot be shared."""
+        if os.getpid() != self._pid:
+            with self._condition:
+                if os.getpid() != self._pid:
+                    self._pid = os.getpid()
+                    self._idle = []
+                    self._in_use = 0
+                    self._keepalive_thread = None
+
+    def _start_keepalive(self):
+        with self._condition:
+            if self.keepalive_interval <= 0 or self._closed:
+                return
+            if self._keepalive_thread is not None and self._keepalive_thread.is_alive():
+                return
+            self._keepalive_thread = threading.Thread(target=self._run_keepalive, name="smtp-keepalive",
+                                                      daemon=True)
+            self._keepalive_thread.start()
+
+    def _run_keepalive(self):
+        while not self._closed:
+            self._wake.wait(self.keepalive_interval)
+            if self._closed:
+                return
+            self.keepalive()
+
+    def keepalive(self):
+        """Send NOOP on sessions idle for keepalive_interval and close those idle for max_idle."""
+        now = time.monotonic()
+        with self._condition:
+            due = [s for s in self._idle if now - s.last_used >= min(self.keepalive_interval, self.max_idle)]
+            if not due:
+                return
+            self._idle = [s for s in self._idle if s not in due]
+            self._in_use += len(due)
+
+        for session in due:
+            if self.max_idle and now - session.last_used >= self.max_idle:
+                self._discard(session)
+                self._release_slot()
+            elif self._noop(session):
+                with self._condition:
+                    self.stats['keepalives'] += 1
+                    self._in_use -= 1
+                    self._idle.append(session)
+                    self._condition.notify()
+            else:
+                self._discard(session)
+                self._release_slot()
+
+    def _checkout(self, timeout: Optional[float] = None) -> _PooledSession:
+        self._check_fork()
+        self._start_keepalive()
+        timeout = self.checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            with self._condition:
+                if self._closed:
+                    raise RuntimeError("SMTP pool is closed")
+                while not self._idle and self._in_use >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.stats['timeouts'] += 1
+                        raise SMTPPoolTimeoutError(f"No SMTP session available within {timeout}s")
+                    self._condition.wait(remaining)
+                # Most recently used first: it is the least likely to have been dropped
+                session = self._idle.pop() if self._idle else None
+                self._in_use += 1
+
+            if session is None:
+                try:
+                    return self._open()
+                except BaseException:
+                    self._release_slot()
+                    raise
+
+            if self._is_usable(session):
+                with self._condition:
+                    self.stats['reused'] += 1
+                return session
+
+            # Dropped or too old: close it and try the next one
+            self._discard(session)
+            self._release_slot()
+
+    def _release_slot(self):
+        with self._condition:
+            self._in_use -= 1
+            self._condition.notify()
+
+    def _checkin(self, session: _PooledSession, error: Optional[BaseException] = None):
+        """Return a session, closing it if it failed or cannot be reset after a rejected message."""
+        discard = self._closed or (error is not None and is_disconnect(error))
+        if error is not None and not discard:
+            try:
+                # Clear any half-finished transaction before the next sender
+                session.smtp.rset()
+            except (smtplib.SMTPException, OSError):
+                discard = True
+
+        if discard:
+            self._discard(session)
+            self._release_slot()
+            return
+
+        session.uses += 1
+        session.last_used = time.monotonic()
+        with self._condition:
+            self._in_use -= 1
+            self._idle.append(session)
+            self._condition.notify()
+
+    @contextmanager
+    def session(self, timeout: Optional[float] = None):
+        """
+        Check out a logged-in session for a few commands.
+
+        A session that fails during the block is closed rather than reused.
+
+        Args:
+            timeout: Seconds to wait for a free session (default: checkout_timeout)
+
+        Yields:
+            smtplib.SMTP session
+        """
+        session = self._checkout(timeout)
+        try:
+            yield session.smtp
+        except BaseException as e:
+            self._checkin(session, e)
+            raise
+        else:
+            self._checkin(session)
+
+    def sendmail(self, from_addr: str, to_addrs: Union[str, List[str]], msg: str) -> Dict[str, Any]:
+        """
+        Send a message on a pooled session.
+
+        If a reused session was dropped by the server, the message is sent
+        again on another session; a failure on a newly opened session raises.
+
+        Args:
+            from_addr: Envelope sender
+            to_addrs: Envelope recipient(s)
+            msg: Message as a string (e.g. MIMEMultipart.as_string())
+
+        Returns:
+            Refused recipients, as returned by smtplib.SMTP.sendmail
+        """
+        while True:
+            session = self._checkout()
+            try:
+                refused = session.smtp.sendmail(from_addr, to_addrs, msg)
+            except BaseException as e:
+                self._checkin(session, e)
+                if session.uses and is_disconnect(e):
+                    logger.info(f"SMTP session to {self.host} was dropped, reconnecting: {e}")
+                    with self._condition:
+                        self.stats['reconnects'] += 1
+                    continue
+                raise
+            self._checkin(session)
+            with self._condition:
+                self.stats['sent'] += 1
+            return refused
+
+    def close(self):
+        """Close idle sessions with QUIT and refuse further checkouts."""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._condition.notify_all()
+        self._wake.set()
+        for session in idle:
+            self._discard(session)
+
+    def get_status(self) -> Dict[str, Any]:
+        """
+        Get pool size and usage statistics.
+
+        Returns:
+            Dictionary with idle/in-use counts, limits and counters
+        """
+        with self._condition:
+            return dict(
+                self.stats,
+                idle=len(self._idle),
+                in_use=self._in_use,
+                max_size=self.max_size,
+                closed=self._closed
+            )
+
+
+def smtp_pool_from_env(host: str, port: int, username: Optional[str] = None,
+                       password: Optional[str] = None) -> SMTPPool:
+    """
+    Create a pool configured by SMTP_POOL_SIZE, SMTP_STARTTLS, SMTP_TIMEOUT,
+    SMTP_KEEPALIVE_SECONDS and SMTP_POOL_MAX_IDLE.
+
+    Args:
+        host: SMTP server host
+        port: SMTP server port
+        username: Login user
+        password: Login password
+
+    Returns:
+        SMTPPool
+    """
+    return SMTPPool(
+        host, port, username, password,
+        max_size=int(os.getenv('SMTP_POOL_SIZE', '2')),
+        starttls=os.getenv('SMTP_STARTTLS', 'true').lower() in ('1', 'true', 'yes'),
+        timeout=float(os.getenv('SMTP_TIMEOUT', '10')),
+        keepalive_interval=float(os.getenv('SMTP_KEEPALIVE_SECONDS', '60')),
+        max_idle=float(os.getenv('SMTP_POOL_MAX_IDLE', '300'))
+    )